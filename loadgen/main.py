@@ -1,7 +1,9 @@
 import asyncio
 import yaml
-from rabbit_sender import bulk_send_rabbit
-from mongo_sender import bulk_send_mongo
+from rabbit_sender import bulk_send_rabbit, word_bank
+from rate_sender import rate_send_rabbit
+from mongo_sender import bulk_send_mongo, seed_mongo
+from workload import load_scenario, send_scenario_rabbit, write_jsonl
 
 def load_config():
     with open("config.yaml", "r") as f:
@@ -12,11 +14,30 @@ def main():
     cible = config.get("cible").lower()
     count = int(config.get("nb_messages", 1000))
     ratio = float(config.get("update_ratio", 0.7))
+    scenario = config.get("scenario")
+    seed = config.get("seed")
 
-    if cible == "rabbit":
+    if cible == "rabbit" and scenario:
+        workload = load_scenario(config, scenario)
+        asyncio.run(send_scenario_rabbit(workload, count, word_bank, seed))
+    elif cible == "rabbit":
         asyncio.run(bulk_send_rabbit(count, ratio))
+    elif cible == "rate":
+        asyncio.run(rate_send_rabbit(config.get("rate", {}), ratio))
+    elif cible == "file":
+        workload = load_scenario(config, scenario)
+        write_jsonl(config.get("output", "requests.jsonl"), workload, count, word_bank, seed)
     elif cible == "mongo":
         bulk_send_mongo(count)
+    elif cible == "seed":
+        options = config.get("seeding", {})
+        seed_mongo(
+            count,
+            processes=options.get("processes"),
+            batch_size=int(options.get("batch_size", 10000)),
+            checkpoint=options.get("checkpoint"),
+            seed=seed or 0,
+        )
 
 if __name__ == "__main__":
     main()
@@ -1,15 +1,27 @@
+import multiprocessing
+import os
+import time
 from pymongo import MongoClient
 from datetime import datetime, timedelta
 import random
+import numpy as np
+from bson import encode
+from bson.raw_bson import RawBSONDocument
+from pymongo.errors import BulkWriteError
 from nltk.corpus import words
 
+MONGO_URL = "mongodb://localhost:27017/"
+DB_NAME = "text_analysis"
+COLLECTION_NAME = "results"
+DUPLICATE_KEY = 11000
+
 def bulk_send_mongo(count: int):
     """
     Insère X count documents directement dans MongoDB.
     """
     word_bank = words.words()
-    client = MongoClient("mongodb://localhost:27017/")
-    collection = client["text_analysis"]["results"]
+    client = MongoClient(MONGO_URL)
+    collection = client[DB_NAME][COLLECTION_NAME]
     base_time = datetime.now() - timedelta(days=365)
     bulk = []
 
@@ -30,3 +42,100 @@ def bulk_send_mongo(count: int):
     if bulk:
         collection.insert_many(bulk)
         print(f"Inserted final batch: {len(bulk)} docs")
+
+
+# --- Seeding parallèle -------------------------------------------------------
+
+_worker = {}
+
+def _init_seed_worker(word_bank: list, seed: int):
+    # Un client et un pool de texte par processus
+    from workload import TextPool
+
+    rng = np.random.default_rng(seed)
+    _worker["collection"] = MongoClient(MONGO_URL, w=1)[DB_NAME][COLLECTION_NAME]
+    _worker["pool"] = TextPool(word_bank, 4 * 1024 * 1024, rng)
+    _worker["seed"] = seed
+
+def make_batch(first: int, size: int, pool, rng) -> list:
+    """
+    Génère les documents `msg_{first}` à `msg_{first + size - 1}` sous forme
+    de documents BSON bruts.
+    """
+    ids = np.arange(first, first + size)
+    users = rng.integers(1, 2_500_000, size)
+    lengths = rng.integers(5, 200, size)
+    texts = pool.slices(lengths, rng)
+    base_time = np.datetime64(datetime.now() - timedelta(days=365), "s")
+    timestamps = np.datetime_as_string(base_time + ids * 3)
+
+    return [
+        RawBSONDocument(encode({
+            "msg_id": f"msg_{i}",
+            "user_id": f"u_{u}",
+            "text": text,
+            "timestamp": ts,
+        }))
+        for i, u, text, ts in zip(ids.tolist(), users.tolist(), texts, timestamps.tolist())
+    ]
+
+def _seed_batch(args) -> tuple:
+    # Un lot ne dépend que de son numéro : rejoué, il contient les mêmes msg_id
+    batch, first, size = args
+    rng = np.random.default_rng([_worker["seed"], batch])
+    docs = make_batch(first, size, _worker["pool"], rng)
+    try:
+        _worker["collection"].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # Lot déjà inséré en partie avant l'interruption : doublons ignorés
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in errors):
+            raise
+    return batch, len(docs)
+
+def load_checkpoint(path: str) -> set:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {int(line) for line in f if line.strip()}
+
+def seed_mongo(count: int, processes: int = None, batch_size: int = 10000, checkpoint: str = None, seed: int = 0):
+    """
+    Insère `count` documents avec plusieurs processus.
+
+    - Chaque processus génère ses lots par tirages vectorisés et les insère
+      en BSON brut, sans ordre (`ordered=False`), sur sa propre connexion.
+    - Chaque lot terminé est ajouté au fichier `checkpoint` : une relance
+      reprend aux lots manquants.
+    - Le débit (docs/s) est affiché au fil de l'eau.
+    """
+    processes = processes or os.cpu_count()
+    batches = (count + batch_size - 1) // batch_size
+    done = load_checkpoint(checkpoint)
+    pending = [
+        (b, b * batch_size, min(batch_size, count - b * batch_size))
+        for b in range(batches) if b not in done
+    ]
+    print(f"{len(done)} lots déjà insérés, {len(pending)} restants ({processes} processus)")
+
+    word_bank = words.words()
+    inserted = 0
+    start = last_report = time.perf_counter()
+    log = open(checkpoint, "a") if checkpoint else None
+
+    with multiprocessing.Pool(processes, _init_seed_worker, (word_bank, seed)) as pool:
+        for batch, n in pool.imap_unordered(_seed_batch, pending):
+            inserted += n
+            if log:
+                log.write(f"{batch}\n")
+                log.flush()
+
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                print(f"[{inserted}] documents insérés ({inserted / (now - start):,.0f} docs/s)")
+                last_report = now
+
+    if log:
+        log.close()
+    elapsed = time.perf_counter() - start
+    print(f"Terminé : {inserted} documents en {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):,.0f} docs/s)")
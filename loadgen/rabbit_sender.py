@@ -9,6 +9,24 @@ QUEUE_NAME = "incoming_texts"
 
 word_bank = words.words()
 
+def build_message(i: int, update_ratio: float, base_time: datetime, prefix: str = "msg") -> dict:
+    """
+    Construit un message update ou delete aléatoire.
+    """
+    msg_type = "update" if random.random() < update_ratio else "delete"
+    msg = {
+        "msg_id": f"{prefix}_{i}",
+        "type": msg_type,
+    }
+
+    if msg_type == "update":
+        msg.update({
+            "user_id": f"u_{random.randint(1, 2499999)}",
+            "text": " ".join(random.choices(word_bank, k=random.randint(3, 25))),
+            "timestamp": (base_time + timedelta(seconds=i*3)).isoformat(),
+        })
+    return msg
+
 async def bulk_send_rabbit(count: int, update_ratio: float):
     """
     Envoie un nombre X de messages vers RabbitMQ, avec un ratio update/delete.
@@ -18,18 +36,7 @@ async def bulk_send_rabbit(count: int, update_ratio: float):
     channel = await connection.channel()
 
     for i in range(count):
-        msg_type = "update" if random.random() < update_ratio else "delete"
-        msg = {
-            "msg_id": f"msg_{i}",
-            "type": msg_type,
-        }
-
-        if msg_type == "update":
-            msg.update({
-                "user_id": f"u_{random.randint(1, 2499999)}",
-                "text": " ".join(random.choices(word_bank, k=random.randint(3, 25))),
-                "timestamp": (base_time + timedelta(seconds=i*3)).isoformat(),
-            })
+        msg = build_message(i, update_ratio, base_time)
 
         await channel.default_exchange.publish(
             aio_pika.Message(body=json.dumps(msg).encode()),
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import aio_pika
+from rabbit_sender import QUEUE_NAME, RABBITMQ_URL, build_message
+
+OUTPUT_QUEUE = "processed_texts"
+TICK = 0.01
+
+
+def rate_profile(config: dict):
+    """
+    Retourne la fonction débit(t) (msg/s) et la durée totale du profil.
+
+    - constant : `rate` msg/s pendant `duration` secondes.
+    - ramp : de `start_rate` à `end_rate` msg/s, linéairement, sur `duration`.
+    - step : paliers `[[débit, durée], ...]` enchaînés.
+    """
+    profile = config.get("profile", "constant")
+
+    if profile == "constant":
+        rate, duration = float(config["rate"]), float(config["duration"])
+        return (lambda t: rate), duration
+
+    if profile == "ramp":
+        start, end = float(config["start_rate"]), float(config["end_rate"])
+        duration = float(config["duration"])
+        return (lambda t: start + (end - start) * min(t / duration, 1.0)), duration
+
+    if profile == "step":
+        steps = [(float(rate), float(duration)) for rate, duration in config["steps"]]
+
+        def rate_at(t):
+            for rate, duration in steps:
+                if t < duration:
+                    return rate
+                t -= duration
+            return steps[-1][0]
+
+        return rate_at, sum(duration for _, duration in steps)
+
+    raise ValueError(f"Profil inconnu : {profile}")
+
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def fmt_ms(value) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+class LatencyTracker:
+    """
+    Associe les complétions de `processed_texts` aux envois, par msg_id.
+    """
+
+    def __init__(self):
+        self.sent_at = {}
+        self.window = []
+        self.latencies = []
+        self.sent = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.completed = 0
+
+    def on_sent(self, msg_id: str, sent_at: float):
+        self.sent_at[msg_id] = sent_at
+        self.sent += 1
+
+    def on_completed(self, msg_id: str):
+        sent_at = self.sent_at.pop(msg_id, None)
+        if sent_at is None:
+            return  # message d'un autre run
+        latency = time.time() - sent_at
+        self.window.append(latency)
+        self.latencies.append(latency)
+        self.completed += 1
+
+    def pop_window(self) -> list:
+        window, self.window = self.window, []
+        return window
+
+
+async def consume_completions(channel, tracker: LatencyTracker):
+    """
+    Consomme `processed_texts` et enregistre la latence de bout en bout.
+    """
+    queue = await channel.declare_queue(OUTPUT_QUEUE, durable=True)
+    async with queue.iterator(no_ack=True) as queue_iter:
+        async for message in queue_iter:
+            try:
+                tracker.on_completed(json.loads(message.body)["msg_id"])
+            except (ValueError, KeyError):
+                pass
+
+
+async def publish_batch(channel, messages: list, tracker: LatencyTracker):
+    """
+    Publie un lot sans attendre chaque confirm : les confirms du lot sont
+    attendus ensemble.
+    """
+    results = await asyncio.gather(
+        *(
+            channel.default_exchange.publish(message, routing_key=QUEUE_NAME)
+            for message in messages
+        ),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            tracker.failed += 1
+        else:
+            tracker.confirmed += 1
+
+
+async def report(
+    tracker: LatencyTracker, rate_at, duration: float, started: float, interval: float
+):
+    """
+    Affiche le débit et les percentiles de latence de chaque fenêtre.
+    """
+    last_sent, last_completed = 0, 0
+    print(
+        f"{'t(s)':>6} {'cible':>7} {'envoyés/s':>10} {'traités/s':>10} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'en cours':>9}"
+    )
+    while True:
+        await asyncio.sleep(interval)
+        elapsed = time.monotonic() - started
+        window = tracker.pop_window()
+        print(
+            f"{elapsed:>6.0f} {rate_at(elapsed) if elapsed < duration else 0:>7.0f} "
+            f"{(tracker.sent - last_sent) / interval:>10.0f} "
+            f"{(tracker.completed - last_completed) / interval:>10.0f} "
+            f"{fmt_ms(percentile(window, 0.50)):>8} "
+            f"{fmt_ms(percentile(window, 0.95)):>8} "
+            f"{fmt_ms(percentile(window, 0.99)):>8} "
+            f"{len(tracker.sent_at):>9}"
+        )
+        last_sent, last_completed = tracker.sent, tracker.completed
+
+
+async def rate_send_rabbit(config: dict, update_ratio: float):
+    """
+    Envoie des messages à débit imposé (boucle ouverte) et mesure la latence
+    de bout en bout jusqu'à `processed_texts`.
+
+    Le débit d'envoi ne dépend pas de la vitesse du worker : quand il sature,
+    la latence et le nombre de messages en cours augmentent.
+    """
+    rate_at, duration = rate_profile(config)
+    channel_count = int(config.get("channels", 4))
+    interval = float(config.get("report_interval", 5))
+    drain_timeout = float(config.get("drain_timeout", 30))
+    run_id = uuid.uuid4().hex[:8]
+    base_time = datetime.now() - timedelta(days=5)
+
+    connection = await aio_pika.connect_robust(RABBITMQ_URL)
+    channels = [
+        await connection.channel(publisher_confirms=True) for _ in range(channel_count)
+    ]
+    consumer_channel = await connection.channel()
+    tracker = LatencyTracker()
+    consumer = asyncio.create_task(consume_completions(consumer_channel, tracker))
+
+    started = time.monotonic()
+    reporter = asyncio.create_task(
+        report(tracker, rate_at, duration, started, interval)
+    )
+    confirms = set()
+    target = 0.0
+    last = started
+    index = 0
+
+    print(f"Run {run_id} : profil {config.get('profile', 'constant')}, {duration:.0f}s")
+    while True:
+        now = time.monotonic()
+        if now - started >= duration:
+            break
+        # Nombre de messages dus depuis le dernier tick, d'après le débit cible
+        target += rate_at(now - started) * (now - last)
+        last = now
+
+        batches = [[] for _ in channels]
+        while index < int(target):
+            msg = build_message(index, update_ratio, base_time, prefix=run_id)
+            sent_at = time.time()
+            message = aio_pika.Message(
+                body=json.dumps(msg).encode(),
+                content_type="application/json",
+                headers={"x-sent-at": sent_at},
+            )
+            tracker.on_sent(msg["msg_id"], sent_at)
+            batches[index % channel_count].append(message)
+            index += 1
+
+        for channel, batch in zip(channels, batches):
+            if batch:
+                task = asyncio.create_task(publish_batch(channel, batch, tracker))
+                confirms.add(task)
+                task.add_done_callback(confirms.discard)
+
+        await asyncio.sleep(TICK)
+
+    await asyncio.gather(*confirms)
+    print(f"Envoi terminé : {tracker.sent} messages, {tracker.failed} échecs")
+
+    deadline = time.monotonic() + drain_timeout
+    while tracker.sent_at and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+    reporter.cancel()
+    consumer.cancel()
+    await connection.close()
+
+    print(
+        f"Traités : {tracker.completed}/{tracker.sent}, "
+        f"p50={fmt_ms(percentile(tracker.latencies, 0.50))} ms "
+        f"p95={fmt_ms(percentile(tracker.latencies, 0.95))} ms "
+        f"p99={fmt_ms(percentile(tracker.latencies, 0.99))} ms"
+    )
@@ -0,0 +1,239 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import aio_pika
+import numpy as np
+from rabbit_sender import QUEUE_NAME, RABBITMQ_URL
+
+CHUNK_SIZE = 100_000
+POOL_CHARS = 4 * 1024 * 1024
+DUPLICATE_POOL = 1000
+
+DEFAULTS = {
+    "keys": 1_000_000,  # nombre de msg_id distincts
+    "key_skew": 0.0,  # exposant de Zipf (0 : uniforme)
+    "users": 2_500_000,
+    "user_skew": 0.0,
+    "update_ratio": 0.75,
+    "text_min_chars": 20,  # longueur minimale (caractères)
+    "text_alpha": 1.5,  # queue de Pareto : plus petit = plus lourde
+    "text_max_chars": 200_000,
+    "duplicate_rate": 0.0,  # part de textes repris d'un pool commun
+    "malformed_rate": 0.0,
+    "rate": 500,  # débit moyen hors rafale (msg/s)
+    "burst_factor": 1.0,  # multiplicateur du débit pendant une rafale
+    "burst_every": 60,  # période des rafales (s)
+    "burst_duration": 5,  # durée d'une rafale (s)
+}
+
+
+def load_scenario(config: dict, name: str = None) -> dict:
+    """
+    Retourne le scénario `name` de `config.yaml`, complété par les défauts.
+
+    Sans nom, retourne les défauts avec le `update_ratio` de la config.
+    """
+    if not name:
+        return {**DEFAULTS, "update_ratio": config.get("update_ratio", 0.75)}
+
+    scenarios = config.get("scenarios", {})
+    if name not in scenarios:
+        raise ValueError(f"Scénario inconnu : {name} (disponibles : {list(scenarios)})")
+    return {**DEFAULTS, **(scenarios[name] or {})}
+
+
+def zipf_sampler(n: int, skew: float, rng):
+    """
+    Tire des rangs dans [0, n) selon une loi de Zipf bornée d'exposant `skew`.
+
+    Les rangs sont permutés pour que les clés chaudes soient dispersées.
+    """
+    if skew <= 0:
+        return lambda size: rng.integers(0, n, size)
+
+    cdf = np.cumsum(np.arange(1, n + 1, dtype=np.float64) ** -skew)
+    cdf /= cdf[-1]
+    permutation = rng.permutation(n)
+    return lambda size: permutation[np.searchsorted(cdf, rng.random(size))]
+
+
+class TextPool:
+    """
+    Grand texte aléatoire dont chaque message reçoit une tranche.
+
+    Une tranche ne coûte qu'une copie de chaîne : aucun tirage de mot par
+    message, quelle que soit sa longueur.
+    """
+
+    def __init__(self, words: list, size: int, rng):
+        words = np.array(words, dtype=object)
+        count = max(1, size // 6)
+        self.text = " ".join(words[rng.integers(0, len(words), count)])
+        self.starts = (
+            np.flatnonzero(
+                np.frombuffer(self.text.encode(), dtype=np.uint8) == ord(" ")
+            )
+            + 1
+        )
+
+    def slices(self, lengths, rng) -> list:
+        limit = len(self.text) - lengths
+        starts = self.starts[rng.integers(0, len(self.starts), len(lengths))]
+        starts = np.minimum(starts, np.maximum(limit, 0))
+        text = self.text
+        return [text[s : s + n] for s, n in zip(starts.tolist(), lengths.tolist())]
+
+
+def arrival_offsets(count: int, scenario: dict, rng, origin: float = 0.0):
+    """
+    Instants d'arrivée (s) d'un processus de Poisson dont le débit est
+    multiplié par `burst_factor` pendant `burst_duration` toutes les
+    `burst_every` secondes.
+
+    Les arrivées d'un processus de débit 1 sont projetées par l'inverse de
+    l'intensité cumulée, linéaire par morceaux : tout reste vectorisé.
+    `origin` est l'intensité cumulée atteinte par le bloc précédent.
+
+    Returns:
+        tuple: `(offsets, origin)` pour enchaîner le bloc suivant.
+    """
+    rate, factor = float(scenario["rate"]), float(scenario["burst_factor"])
+    every, burst = float(scenario["burst_every"]), float(scenario["burst_duration"])
+    unit = origin + np.cumsum(rng.exponential(1.0, count))
+
+    per_period = rate * (burst * factor + (every - burst))
+    periods = int(unit[-1] // per_period) + 2
+    period_starts = np.arange(periods) * every
+    times = np.column_stack([period_starts, period_starts + burst]).ravel()
+    intensity = np.column_stack(
+        [
+            np.arange(periods) * per_period,
+            np.arange(periods) * per_period + rate * burst * factor,
+        ]
+    ).ravel()
+    return np.interp(unit, intensity, times), unit[-1]
+
+
+def malformed(body: str, kind: int) -> str:
+    if kind == 0:
+        return body[: len(body) // 2]  # JSON tronqué
+    if kind == 1:
+        return body.replace('"msg_id"', '"id"', 1)  # msg_id manquant
+    if kind == 2:
+        return "[" + body + "]"  # pas un objet
+    return body.replace('"type":"', '"type":"unknown_', 1)
+
+
+def generate(scenario: dict, count: int, words: list, seed: int = None):
+    """
+    Génère le flux du scénario par blocs de `CHUNK_SIZE` messages.
+
+    Yields:
+        tuple: `(offsets, bodies)`, instants d'arrivée (s) et corps JSON.
+    """
+    rng = np.random.default_rng(seed)
+    keys = zipf_sampler(int(scenario["keys"]), float(scenario["key_skew"]), rng)
+    users = zipf_sampler(int(scenario["users"]), float(scenario["user_skew"]), rng)
+    max_chars = int(scenario["text_max_chars"])
+    pool = TextPool(words, max(POOL_CHARS, 2 * max_chars), rng)
+    duplicates = pool.slices(
+        rng.integers(20, 2000, DUPLICATE_POOL).astype(np.int64), rng
+    )
+    base_time = np.datetime64(datetime.now() - timedelta(days=5), "us")
+    clock = 0.0
+
+    for first in range(0, count, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, count - first)
+        offsets, clock = arrival_offsets(size, scenario, rng, clock)
+
+        msg_ids = keys(size)
+        user_ids = users(size) + 1
+        is_update = rng.random(size) < float(scenario["update_ratio"])
+        lengths = np.minimum(
+            (rng.pareto(float(scenario["text_alpha"]), size) + 1)
+            * int(scenario["text_min_chars"]),
+            max_chars,
+        ).astype(np.int64)
+        texts = pool.slices(lengths, rng)
+        duplicate = rng.random(size) < float(scenario["duplicate_rate"])
+        picks = rng.integers(0, DUPLICATE_POOL, size)
+        timestamps = np.datetime_as_string(
+            base_time + (offsets * 1e6).astype("timedelta64[us]")
+        )
+        broken = rng.random(size) < float(scenario["malformed_rate"])
+        kinds = rng.integers(0, 4, size)
+
+        # Seul l'assemblage des corps reste en Python, sur des listes natives
+        bodies = []
+        for msg_id, user_id, update, text, dup, pick, ts, bad, kind in zip(
+            msg_ids.tolist(),
+            user_ids.tolist(),
+            is_update.tolist(),
+            texts,
+            duplicate.tolist(),
+            picks.tolist(),
+            timestamps.tolist(),
+            broken.tolist(),
+            kinds.tolist(),
+        ):
+            if update:
+                text = duplicates[pick] if dup else text
+                body = (
+                    f'{{"msg_id":"msg_{msg_id}","type":"update",'
+                    f'"user_id":"u_{user_id}","text":"{text}","timestamp":"{ts}"}}'
+                )
+            else:
+                body = f'{{"msg_id":"msg_{msg_id}","type":"delete"}}'
+            if bad:
+                body = malformed(body, kind)
+            bodies.append(body)
+
+        yield offsets, bodies
+
+
+def write_jsonl(path: str, scenario: dict, count: int, words: list, seed=None):
+    """
+    Écrit le flux du scénario dans un fichier JSONL, un message par ligne.
+    """
+    start = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as f:
+        for _, bodies in generate(scenario, count, words, seed):
+            f.write("\n".join(bodies))
+            f.write("\n")
+    elapsed = time.perf_counter() - start
+    print(f"{count} messages écrits dans {path} ({count / elapsed:,.0f} msg/s)")
+
+
+async def send_scenario_rabbit(scenario: dict, count: int, words: list, seed=None):
+    """
+    Rejoue le flux du scénario vers RabbitMQ en respectant les instants
+    d'arrivée (rafales comprises).
+    """
+    connection = await aio_pika.connect_robust(RABBITMQ_URL)
+    channel = await connection.channel(publisher_confirms=True)
+    started = time.monotonic()
+    sent = 0
+
+    for offsets, bodies in generate(scenario, count, words, seed):
+        pending = []
+        for offset, body in zip(offsets.tolist(), bodies):
+            delay = offset - (time.monotonic() - started)
+            # Confirms attendus par lot, à chaque pause ou tous les 1000 messages
+            if delay > 0.005 or len(pending) >= 1000:
+                await asyncio.gather(*pending)
+                pending = []
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            pending.append(
+                asyncio.ensure_future(
+                    channel.default_exchange.publish(
+                        aio_pika.Message(body=body.encode()), routing_key=QUEUE_NAME
+                    )
+                )
+            )
+            sent += 1
+        await asyncio.gather(*pending)
+        print(f"[{sent}] messages envoyés...")
+
+    await connection.close()
@@ -0,0 +1,361 @@
+import re
+import unicodedata
+import zlib
+from typing import List, Optional
+
+import numpy as np
+from app.analysis.lexicon import SENTIMENT_LEXICON, STOPWORDS
+
+ANALYZER_VERSION = "1"
+
+MAX_TOKEN_LENGTH = 40
+KEYWORD_COUNT = 5
+MIN_KEYWORD_LENGTH = 3
+SENTIMENT_ALPHA = 15.0
+
+TOKEN_PATTERN = re.compile(rf"\w{{1,{MAX_TOKEN_LENGTH}}}")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes a text before analysis.
+
+    - Unicode NFC normalization.
+    - Collapses whitespace runs into single spaces and strips both ends.
+
+    Args:
+        text (str): Raw text.
+
+    Returns:
+        str: Normalized text.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def token_id(token: str) -> int:
+    """
+    Returns the stable 32-bit hashed ID of a token.
+
+    Unlike `hash()`, the ID does not depend on PYTHONHASHSEED and is
+    therefore identical in every process.
+
+    Args:
+        token (str): Token.
+
+    Returns:
+        int: CRC32 of the UTF-8 encoded token.
+    """
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def _hash_tokens(tokens) -> np.ndarray:
+    return np.fromiter(
+        (token_id(t) for t in tokens), dtype=np.uint32, count=len(tokens)
+    )
+
+
+class AnalysisEngine:
+    """
+    Deterministic, vectorized text analyzer.
+
+    Texts are analysed in batches: all tokens of the batch are gathered into
+    one NumPy array, mapped to hashed token IDs, and every per-text statistic
+    is computed with array operations.
+
+    Each analysis returns:
+        token_count (int): Number of tokens.
+        char_count (int): Number of characters of the normalized text.
+        sentiment (float): Lexicon-based sentiment in [-1, 1].
+        score (int): Sentiment mapped to [0, 100].
+        keywords (list): Most frequent non-stopword tokens.
+        language (str): Guessed language code, or "unknown".
+    """
+
+    def __init__(self, lexicon: dict = None, stopwords: dict = None):
+        """
+        Builds the lookup tables.
+
+        Args:
+            lexicon (dict, optional): Token -> sentiment weight.
+                Defaults to `SENTIMENT_LEXICON`.
+            stopwords (dict, optional): Language code -> stopwords.
+                Defaults to `STOPWORDS`.
+        """
+        lexicon = SENTIMENT_LEXICON if lexicon is None else lexicon
+        stopwords = STOPWORDS if stopwords is None else stopwords
+
+        ids = _hash_tokens(list(lexicon))
+        order = np.argsort(ids)
+        self._lexicon_ids = ids[order]
+        self._lexicon_weights = np.fromiter(lexicon.values(), dtype=np.float64)[order]
+
+        self.languages = tuple(sorted(stopwords))
+        sets = [set(stopwords[lang]) for lang in self.languages]
+        words = sorted(set().union(*sets))
+        ids = _hash_tokens(words)
+        order = np.argsort(ids)
+        membership = np.array(
+            [[w in ws for ws in sets] for w in words], dtype=bool
+        ).reshape(len(words), len(self.languages))
+        self._stopword_ids = ids[order]
+        self._stopword_languages = membership[order]
+
+    @staticmethod
+    def _lookup(table: np.ndarray, ids: np.ndarray):
+        positions = np.searchsorted(table, ids)
+        if not len(table):
+            return np.zeros(len(ids), dtype=bool), positions
+        positions[positions == len(table)] = 0
+        return table[positions] == ids, positions
+
+    def analyze(self, text: Optional[str]) -> dict:
+        """
+        Analyses a single text.
+
+        Args:
+            text (str, optional): Text to analyse.
+
+        Returns:
+            dict: Analysis of the text.
+        """
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts: List[Optional[str]]) -> List[dict]:
+        """
+        Analyses a batch of texts.
+
+        Args:
+            texts (list): Texts to analyse; `None`, empty or whitespace-only
+                entries yield an empty analysis.
+
+        Returns:
+            list: One analysis dict per text, in order.
+        """
+        count = len(texts)
+        normalized = [normalize_text(t) if t else "" for t in texts]
+        tokens = [TOKEN_PATTERN.findall(t.lower()) for t in normalized]
+        token_counts = np.fromiter(map(len, tokens), dtype=np.int64, count=count)
+        total = int(token_counts.sum())
+
+        sentiment_sums = np.zeros(count)
+        stopword_hits = np.zeros((count, len(self.languages)))
+        keywords = [[] for _ in range(count)]
+
+        if total:
+            flat = np.array([t for ts in tokens for t in ts])
+            vocabulary, inverse = np.unique(flat, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            text_index = np.repeat(np.arange(count), token_counts)
+            vocabulary_ids = _hash_tokens(vocabulary)
+
+            # Sentiment : recherche vectorisée dans le lexique
+            found, positions = self._lookup(self._lexicon_ids, vocabulary_ids)
+            weights = np.where(found, self._lexicon_weights[positions], 0.0)
+            sentiment_sums = np.bincount(
+                text_index, weights=weights[inverse], minlength=count
+            )
+
+            # Langue : occurrences de stopwords par langue
+            is_stopword, positions = self._lookup(self._stopword_ids, vocabulary_ids)
+            languages = self._stopword_languages[positions] & is_stopword[:, None]
+            for column in range(len(self.languages)):
+                stopword_hits[:, column] = np.bincount(
+                    text_index,
+                    weights=languages[inverse, column],
+                    minlength=count,
+                )
+
+            candidates = (
+                ~is_stopword
+                & (np.char.str_len(vocabulary) >= MIN_KEYWORD_LENGTH)
+                & ~np.char.isdigit(vocabulary)
+            )
+            self._extract_keywords(
+                vocabulary, inverse, text_index, candidates, keywords
+            )
+
+        results = []
+        for i in range(count):
+            if not normalized[i]:
+                results.append(self._empty())
+                continue
+            results.append(
+                self._finish(
+                    int(token_counts[i]),
+                    len(normalized[i]),
+                    sentiment_sums[i],
+                    stopword_hits[i],
+                    keywords[i],
+                )
+            )
+        return results
+
+    def analyze_partial(self, text: str) -> dict:
+        """
+        Analyses one chunk of a text split on whitespace.
+
+        The partial keeps what `merge_partials` needs to rebuild the analysis
+        of the whole text exactly: additive counts, the sentiment weights in
+        token order (float sums depend on the order) and the count and first
+        position of every keyword candidate.
+
+        Args:
+            text (str): Chunk, cut on whitespace.
+
+        Returns:
+            dict: Partial analysis of the chunk.
+        """
+        normalized = normalize_text(text)
+        tokens = TOKEN_PATTERN.findall(normalized.lower())
+        partial = {
+            "token_count": len(tokens),
+            "char_count": len(normalized),
+            "weights": np.zeros(0),
+            "stopword_hits": np.zeros(len(self.languages)),
+            "candidates": {},
+        }
+        if not tokens:
+            return partial
+
+        vocabulary, first, inverse = np.unique(
+            np.array(tokens), return_index=True, return_inverse=True
+        )
+        inverse = inverse.reshape(-1)
+        vocabulary_ids = _hash_tokens(vocabulary)
+
+        found, positions = self._lookup(self._lexicon_ids, vocabulary_ids)
+        hits = found[inverse]
+        partial["weights"] = self._lexicon_weights[positions[inverse[hits]]]
+
+        is_stopword, positions = self._lookup(self._stopword_ids, vocabulary_ids)
+        languages = self._stopword_languages[positions] & is_stopword[:, None]
+        partial["stopword_hits"] = languages[inverse].sum(axis=0).astype(np.float64)
+
+        candidates = (
+            ~is_stopword
+            & (np.char.str_len(vocabulary) >= MIN_KEYWORD_LENGTH)
+            & ~np.char.isdigit(vocabulary)
+        )
+        counts = np.bincount(inverse, minlength=len(vocabulary))
+        partial["candidates"] = {
+            str(word): (int(count), int(position))
+            for word, count, position in zip(
+                vocabulary[candidates], counts[candidates], first[candidates]
+            )
+        }
+        return partial
+
+    def merge_partials(self, partials: List[dict]) -> dict:
+        """
+        Merges the partial analyses of consecutive chunks, in text order.
+
+        The result is identical to `analyze()` on the whole text.
+
+        Args:
+            partials (list): Outputs of `analyze_partial`, in chunk order.
+
+        Returns:
+            dict: Analysis of the whole text.
+        """
+        token_count, char_count, non_empty = 0, 0, 0
+        stopword_hits = np.zeros(len(self.languages))
+        candidates = {}
+        for partial in partials:
+            for word, (count, position) in partial["candidates"].items():
+                position += token_count
+                if word in candidates:
+                    total, first = candidates[word]
+                    candidates[word] = (total + count, first)
+                else:
+                    candidates[word] = (count, position)
+            token_count += partial["token_count"]
+            char_count += partial["char_count"]
+            non_empty += partial["char_count"] > 0
+            stopword_hits += partial["stopword_hits"]
+
+        if not non_empty:
+            return self._empty()
+        # Les textes normalisés des morceaux sont rejoints par une espace
+        char_count += max(0, non_empty - 1)
+        weights = np.concatenate([partial["weights"] for partial in partials])
+        # Même sommation séquentielle que `analyze_batch`
+        sentiment_sum = np.bincount(
+            np.zeros(len(weights), dtype=np.int64), weights=weights, minlength=1
+        )[0]
+        ranked = sorted(candidates.items(), key=lambda item: (-item[1][0], item[1][1]))
+        keywords = [word for word, _ in ranked[:KEYWORD_COUNT]]
+        return self._finish(
+            token_count, char_count, sentiment_sum, stopword_hits, keywords
+        )
+
+    def _finish(self, token_count, char_count, sentiment_sum, hits, keywords) -> dict:
+        sentiment = float(sentiment_sum / np.sqrt(sentiment_sum**2 + SENTIMENT_ALPHA))
+        return {
+            "token_count": token_count,
+            "char_count": char_count,
+            "sentiment": round(sentiment, 4),
+            "score": int(round((sentiment + 1) * 50)),
+            "keywords": keywords,
+            "language": (
+                self.languages[int(hits.argmax())] if hits.max() > 0 else "unknown"
+            ),
+        }
+
+    @staticmethod
+    def _extract_keywords(vocabulary, inverse, text_index, candidates, keywords):
+        mask = candidates[inverse]
+        if not mask.any():
+            return
+
+        # Clé (texte, mot) : compte et première occurrence en une seule passe
+        keys = text_index[mask] * len(vocabulary) + inverse[mask]
+        unique_keys, first, counts = np.unique(
+            keys, return_index=True, return_counts=True
+        )
+        owners = unique_keys // len(vocabulary)
+        order = np.lexsort((first, -counts, owners))
+        owners = owners[order]
+        starts = np.searchsorted(owners, owners, side="left")
+        keep = order[np.arange(len(order)) - starts < KEYWORD_COUNT]
+
+        for key in unique_keys[keep]:
+            keywords[int(key // len(vocabulary))].append(
+                str(vocabulary[key % len(vocabulary)])
+            )
+
+    @staticmethod
+    def _empty() -> dict:
+        return {
+            "token_count": 0,
+            "char_count": 0,
+            "sentiment": None,
+            "score": None,
+            "keywords": [],
+            "language": None,
+        }
+
+
+_engine = None
+
+
+def init_worker():
+    """
+    Loads the analysis engine once in the current process.
+
+    Used as the executor initializer so that the lexicon and lookup tables
+    are built once per worker process instead of once per message.
+    """
+    global _engine
+    _engine = AnalysisEngine()
+
+
+def get_engine() -> AnalysisEngine:
+    """
+    Returns the engine of the current process, loading it if needed.
+
+    Returns:
+        AnalysisEngine: The process-wide engine.
+    """
+    if _engine is None:
+        init_worker()
+    return _engine
@@ -0,0 +1,137 @@
+"""
+Static data of the analysis engine: sentiment lexicon and stopwords.
+
+Scores follow a -3 (very negative) to +3 (very positive) scale.
+"""
+
+SENTIMENT_LEXICON = {
+    # Anglais - positif
+    "good": 1.9,
+    "great": 3.1,
+    "excellent": 2.7,
+    "amazing": 2.8,
+    "awesome": 3.1,
+    "wonderful": 2.7,
+    "fantastic": 2.6,
+    "perfect": 2.7,
+    "love": 3.2,
+    "loved": 2.9,
+    "like": 1.3,
+    "liked": 1.5,
+    "nice": 1.8,
+    "happy": 2.7,
+    "glad": 2.0,
+    "best": 3.2,
+    "better": 1.9,
+    "enjoy": 2.2,
+    "enjoyed": 2.3,
+    "pleasant": 2.3,
+    "beautiful": 2.9,
+    "brilliant": 2.8,
+    "helpful": 1.8,
+    "useful": 1.9,
+    "fast": 1.1,
+    "easy": 1.9,
+    "clean": 1.7,
+    "recommend": 1.5,
+    "thanks": 1.9,
+    "thank": 1.5,
+    "success": 2.7,
+    "successful": 2.8,
+    "win": 2.8,
+    "fun": 2.3,
+    "friendly": 2.2,
+    "reliable": 1.8,
+    "satisfied": 1.8,
+    "impressive": 2.3,
+    "positive": 2.3,
+    "smooth": 1.4,
+    # Anglais - négatif
+    "bad": -2.5,
+    "worse": -2.1,
+    "worst": -3.1,
+    "terrible": -2.1,
+    "awful": -2.0,
+    "horrible": -2.5,
+    "hate": -2.7,
+    "hated": -3.2,
+    "poor": -2.1,
+    "sad": -2.1,
+    "angry": -2.3,
+    "broken": -2.1,
+    "bug": -1.0,
+    "bugs": -1.1,
+    "crash": -1.6,
+    "crashed": -1.7,
+    "slow": -1.0,
+    "fail": -2.5,
+    "failed": -2.3,
+    "failure": -2.3,
+    "error": -1.7,
+    "errors": -1.4,
+    "problem": -1.7,
+    "problems": -1.7,
+    "useless": -1.8,
+    "annoying": -1.7,
+    "disappointed": -1.9,
+    "disappointing": -2.2,
+    "wrong": -2.1,
+    "ugly": -2.3,
+    "boring": -1.3,
+    "difficult": -1.5,
+    "expensive": -0.8,
+    "negative": -2.7,
+    "never": -0.5,
+    "refund": -1.0,
+    "waste": -1.8,
+    "lost": -1.3,
+    "unhappy": -1.8,
+    "unreliable": -1.9,
+    # Français
+    "bon": 1.9,
+    "bien": 1.6,
+    "super": 2.9,
+    "excellente": 2.7,
+    "parfait": 2.7,
+    "génial": 3.0,
+    "merci": 1.9,
+    "aime": 2.5,
+    "adore": 3.0,
+    "content": 2.0,
+    "heureux": 2.7,
+    "rapide": 1.1,
+    "facile": 1.9,
+    "mauvais": -2.5,
+    "nul": -2.4,
+    "déteste": -2.9,
+    "lent": -1.0,
+    "erreur": -1.7,
+    "problème": -1.7,
+    "panne": -1.9,
+    "triste": -2.1,
+    "déçu": -1.9,
+    "cher": -0.8,
+    "inutile": -1.8,
+}
+
+STOPWORDS = {
+    "en": (
+        "the and is are was were of to in that it with for on this be as at by have "
+        "has not but from or they you we he she his her their an a will would there "
+        "what which been my our your i"
+    ).split(),
+    "fr": (
+        "le la les des du de et est sont un une dans pour pas que qui sur avec ce "
+        "cette il elle nous vous ils au aux par mais ou je tu mon ma mes son sa ses "
+        "leur était été être ne très"
+    ).split(),
+    "es": (
+        "el los las y es son una en para que por con del al lo como pero su sus yo "
+        "ella nosotros está este esta muy fue ser hay sin sobre también cuando porque "
+        "mi"
+    ).split(),
+    "de": (
+        "der die das und ist sind ein eine zu mit für auf nicht auch es sie wir ich "
+        "den dem von im sich aber wie oder war wurde sein noch nach bei aus wenn sehr"
+    ).split(),
+}
@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from app.analysis.engine import ANALYZER_VERSION, normalize_text
+from core.logging_wrapper import LoggerFactory
+from core.metrics import registry
+
+logger = LoggerFactory.get_logger(__name__)
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_PATH = os.getenv("CACHE_PATH")
+
+# Champs produits par le moteur d'analyse, seuls mis en cache
+ANALYSIS_FIELDS = (
+    "token_count",
+    "char_count",
+    "sentiment",
+    "score",
+    "keywords",
+    "language",
+)
+
+
+def cache_key(text: str) -> str:
+    """
+    Returns the content address of a text.
+
+    The digest covers the normalized text and the analyzer version, so a new
+    analyzer never reads results computed by an older one.
+
+    Args:
+        text (str): Raw text.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    payload = f"{ANALYZER_VERSION}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class LRUTier:
+    """
+    In-memory LRU tier bounded by the approximate size of its entries.
+
+    Attributes:
+        max_bytes (int): Size budget of the tier.
+        size (int): Current approximate size in bytes.
+        evictions (int): Number of entries evicted so far.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initializes an empty tier.
+
+        Args:
+            max_bytes (int): Size budget of the tier, in bytes.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Returns an entry and marks it as most recently used.
+
+        Args:
+            key (str): Entry key.
+
+        Returns:
+            dict: The cached value, or None.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, value: dict, size: int):
+        """
+        Stores an entry, evicting the least recently used ones if needed.
+
+        Args:
+            key (str): Entry key.
+            value (dict): Value to cache.
+            size (int): Approximate size of the entry, in bytes.
+        """
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous[1]
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+
+class SqliteTier:
+    """
+    Persistent tier stored in a local SQLite file.
+
+    Calls are blocking and meant to run in a thread.
+
+    Attributes:
+        path (str): Path of the SQLite file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens (or creates) the cache file.
+
+        Args:
+            path (str): Path of the SQLite file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS analysis (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the serialized value of a key, or None.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM analysis WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str):
+        """
+        Stores the serialized value of a key.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO analysis (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+            self._connection.commit()
+
+    def close(self):
+        """
+        Closes the SQLite connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+class AnalysisCache:
+    """
+    Content-addressed cache of analysis results.
+
+    - Memory tier: bounded LRU, checked first.
+    - Disk tier (optional): SQLite file surviving restarts, accessed from a
+      thread so that the event loop never blocks on it.
+
+    Attributes:
+        hits (int): Lookups answered by the memory tier.
+        disk_hits (int): Lookups answered by the disk tier.
+        misses (int): Lookups answered by no tier.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, path: str = None):
+        """
+        Initializes the cache.
+
+        Args:
+            max_bytes (int): Size budget of the memory tier, in bytes.
+            path (str, optional): SQLite file of the disk tier. No disk tier if None.
+        """
+        self.memory = LRUTier(max_bytes)
+        self.disk = SqliteTier(path) if path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, text: str) -> Optional[dict]:
+        """
+        Looks up the analysis of a text.
+
+        Args:
+            text (str): Raw text.
+
+        Returns:
+            dict: Cached analysis fields, or None on a miss.
+        """
+        key = cache_key(text)
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.disk is not None:
+            raw = await asyncio.to_thread(self.disk.get, key)
+            if raw is not None:
+                value = json.loads(raw)
+                self.memory.put(key, value, len(key) + len(raw))
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def put(self, text: str, analysis: dict):
+        """
+        Stores the analysis of a text in every tier.
+
+        Args:
+            text (str): Raw text.
+            analysis (dict): Analysis fields to cache.
+        """
+        key = cache_key(text)
+        raw = json.dumps(analysis)
+        self.memory.put(key, analysis, len(key) + len(raw))
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put, key, raw)
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hits, misses, evictions, entries and size of the memory tier.
+        """
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.memory.evictions,
+            "entries": len(self.memory),
+            "bytes": self.memory.size,
+        }
+
+    def close(self):
+        """
+        Closes the disk tier, if any.
+        """
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+
+analysis_cache = AnalysisCache(path=CACHE_PATH) if CACHE_ENABLED else None
+
+if analysis_cache is not None:
+    for _name in ("hits", "disk_hits", "misses", "evictions"):
+        registry.counter(
+            f"worker_cache_{_name}_total",
+            f"Analysis cache {_name.replace('_', ' ')}.",
+            fn=lambda name=_name: analysis_cache.stats()[name],
+        )
+    registry.gauge(
+        "worker_cache_bytes",
+        "Approximate size of the memory tier of the analysis cache.",
+        fn=lambda: analysis_cache.memory.size,
+    )
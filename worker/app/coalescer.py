@@ -0,0 +1,114 @@
+import asyncio
+
+from app.models.message_data import MessageData
+from core.logging_wrapper import LoggerFactory
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+class _KeyState:
+    __slots__ = ("task", "data", "queued")
+
+    def __init__(self):
+        self.task = None
+        self.data = None
+        self.queued = None
+
+
+class KeyedCoalescer:
+    """
+    Serializes and collapses the operations submitted for the same key.
+
+    For a given key, at most one operation runs and at most one waits:
+
+    - A new operation replaces the waiting one, which is reported as
+      superseded without running.
+    - A `delete` cancels a running `update` instead of letting it finish an
+      analysis that would be deleted; the delete runs once the update task
+      has stopped.
+    - Operations on different keys run in parallel.
+
+    Each key therefore ends in the state of its last submitted operation.
+
+    Attributes:
+        superseded (int): Operations dropped before running.
+        cancelled (int): Running operations cancelled by a later delete.
+    """
+
+    def __init__(self, runner):
+        """
+        Initializes the coalescer.
+
+        Args:
+            runner (callable): Coroutine function running one `MessageData`.
+        """
+        self._runner = runner
+        self._keys = {}
+        self.superseded = 0
+        self.cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    async def submit(self, key: str, data: MessageData) -> bool:
+        """
+        Runs an operation once the previous operations of its key are done.
+
+        Args:
+            key (str): Coalescing key, usually the `msg_id`.
+            data (MessageData): Operation to run.
+
+        Returns:
+            bool: True if the operation ran, False if it was superseded or
+            cancelled by a later operation on the same key.
+
+        Raises:
+            Exception: Any error raised by the runner for this operation.
+        """
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = _KeyState()
+            task = self._start(key, state, data)
+        else:
+            if state.queued is not None:
+                _, turn = state.queued
+                if not turn.done():
+                    turn.set_result(None)
+                    self.superseded += 1
+
+            if self._cancels(data, state.data) and not state.task.done():
+                state.task.cancel()
+                self.cancelled += 1
+
+            turn = asyncio.get_running_loop().create_future()
+            state.queued = (data, turn)
+            task = await turn
+            if task is None:
+                return False
+
+        await asyncio.wait({task})
+        if task.cancelled():
+            return False
+        task.result()
+        return True
+
+    @staticmethod
+    def _cancels(new: MessageData, running: MessageData) -> bool:
+        return new.type == "delete" and running.type == "update"
+
+    def _start(self, key: str, state: _KeyState, data: MessageData) -> asyncio.Task:
+        task = asyncio.create_task(self._runner(data))
+        state.task = task
+        state.data = data
+        task.add_done_callback(lambda _: self._on_done(key, state))
+        return task
+
+    def _on_done(self, key: str, state: _KeyState):
+        queued, state.queued = state.queued, None
+        if queued is not None:
+            data, turn = queued
+            if not turn.done():
+                turn.set_result(self._start(key, state, data))
+                return
+
+        del self._keys[key]
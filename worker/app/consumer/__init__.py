@@ -0,0 +1,52 @@
+from app.consumer.amqp import AMQP_URL, MAX_RETRIES, QUEUE_NAME, AmqpSource
+from app.consumer.file import FileRecord, FileSource
+from app.consumer.handler import (
+    MESSAGE_SOURCE,
+    active_tasks,
+    close_source,
+    coalescer,
+    completed_messages,
+    consume_messages,
+    create_source,
+    delete_lane,
+    get_source,
+    handle_message,
+    pending_keys,
+    semaphore,
+    set_prefetch,
+    update_lane,
+)
+from app.consumer.lanes import LANES_ENABLED, UPDATE_QUEUE, Lane
+from app.consumer.shards import SHARD_COUNT, SHARDS_ENABLED, shard_of, shard_queue
+from app.consumer.sources import MessageSource
+
+__all__ = [
+    "AMQP_URL",
+    "LANES_ENABLED",
+    "MAX_RETRIES",
+    "MESSAGE_SOURCE",
+    "QUEUE_NAME",
+    "SHARD_COUNT",
+    "SHARDS_ENABLED",
+    "UPDATE_QUEUE",
+    "AmqpSource",
+    "FileRecord",
+    "FileSource",
+    "Lane",
+    "MessageSource",
+    "active_tasks",
+    "close_source",
+    "coalescer",
+    "completed_messages",
+    "consume_messages",
+    "create_source",
+    "delete_lane",
+    "get_source",
+    "handle_message",
+    "pending_keys",
+    "semaphore",
+    "set_prefetch",
+    "shard_of",
+    "shard_queue",
+    "update_lane",
+]
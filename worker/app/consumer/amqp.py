@@ -0,0 +1,215 @@
+import asyncio
+import os
+import time
+
+import aio_pika
+from app.consumer.lanes import ROUTED_AT_HEADER
+from app.consumer.shards import SINGLE_ACTIVE_CONSUMER
+from app.consumer.sources import DEAD_LETTERED, RETRIED, MessageSource
+from app.publisher import PUBLISH_BATCH_DELAY, PUBLISH_BATCH_SIZE
+from app.retry import declare_retry_queues, retry_tier, schedule_retry
+from core.batching import MicroBatcher
+from core.logging_wrapper import LoggerFactory
+
+logger = LoggerFactory.get_logger(__name__)
+
+MAX_RETRIES = int(os.getenv("MAX_RETRIES"))
+AMQP_URL = os.getenv("AMQP_URL")
+QUEUE_NAME = os.getenv("QUEUE_NAME")
+
+
+class AmqpSource(MessageSource):
+    """
+    RabbitMQ input queue.
+
+    - Declares the input queue, the dead-letter queue and the retry delay
+      queues once, when opened.
+    - Bounds the unacked deliveries with `basic.qos`.
+    - A failed delivery is parked in the delay queue of its retry tier, or
+      dead-lettered once MAX_RETRIES is reached.
+    - The input queue routes; a lane queue (`lane` set) or a shard queue
+      (`shard` set) does not.
+    - A shard queue is declared with a single active consumer: replicas
+      claiming the same shard stand by, so its messages are consumed by one
+      replica at a time, in order.
+    - An `exclusive` source is the only consumer of its queue: the broker
+      refuses a second one, e.g. a second shard router.
+    - Routed copies are published in delivery order on a dedicated channel,
+      one confirm batch at a time: RabbitMQ only keeps the order of the
+      messages of a same channel. A failed copy is requeued, and so is every
+      later routed delivery until a requeued one comes back, so that no
+      message overtakes it.
+
+    Attributes:
+        url (str): AMQP connection URL.
+        queue_name (str): Input queue.
+        lane (str): Lane fed by this queue, None for the main input queue.
+        shard (int): Shard held by this queue, None for the main input queue.
+        exclusive (bool): Consume the queue as its only consumer.
+        prefetch (int): Initial prefetch count.
+    """
+
+    name = "amqp"
+
+    def __init__(
+        self,
+        url: str = AMQP_URL,
+        queue_name: str = QUEUE_NAME,
+        lane: str = None,
+        shard: int = None,
+        exclusive: bool = False,
+    ):
+        self.url = url
+        self.queue_name = queue_name
+        self.lane = lane
+        self.shard = shard
+        self.exclusive = exclusive
+        self.routes = lane is None and shard is None
+        self.prefetch = 1
+        self.channel = None
+        self._connection = None
+        self._queue = None
+        self._route_channel = None
+        self._route_lock = asyncio.Lock()
+        self._router = MicroBatcher(
+            self._publish_routed, PUBLISH_BATCH_SIZE, PUBLISH_BATCH_DELAY
+        )
+        self._held = False
+
+    async def open(self):
+        self._connection = await aio_pika.connect_robust(self.url)
+        channel = await self._connection.channel()
+        await channel.set_qos(prefetch_count=self.prefetch)
+        self.channel = channel
+
+        dlx = await channel.declare_exchange(
+            "dlx", aio_pika.ExchangeType.DIRECT, durable=True
+        )
+        dlq = await channel.declare_queue("failed_texts", durable=True)
+        await dlq.bind(dlx, routing_key="failed_texts")
+
+        arguments = {
+            "x-dead-letter-exchange": "dlx",
+            "x-dead-letter-routing-key": "failed_texts",
+        }
+        if self.shard is not None:
+            arguments[SINGLE_ACTIVE_CONSUMER] = True
+        self._queue = await channel.declare_queue(
+            self.queue_name, durable=True, arguments=arguments
+        )
+        await declare_retry_queues(channel)
+        logger.info(f"En écoute sur la file '{self.queue_name}'")
+
+    async def __aiter__(self):
+        options = {"exclusive": True} if self.exclusive else {}
+        async with self._queue.iterator(**options) as queue_iter:
+            async for message in queue_iter:
+                yield message
+
+    async def ack(self, message: aio_pika.IncomingMessage):
+        await message.ack()
+
+    async def fail(self, message: aio_pika.IncomingMessage, error: Exception):
+        """
+        Schedules the retry of a failed message, or dead-letters it.
+
+        The message is only acked once its copy is confirmed in its delay queue;
+        if that publication fails, it is requeued as is.
+
+        Args:
+            message (aio_pika.IncomingMessage): The failed message.
+            error (Exception): The processing error.
+        """
+        retries = int(message.headers.get("x-retries", 0)) + 1
+        if retries >= MAX_RETRIES:
+            await message.nack(requeue=False)
+            DEAD_LETTERED.inc()
+            logger.warning(f"Message abandonné après {retries} tentatives : {error}")
+        elif await schedule_retry(message, retries):
+            await message.ack()
+            RETRIED.inc()
+            logger.warning(f"Retry {retries} dans {retry_tier(retries):g}s : {error}")
+        else:
+            await message.nack(requeue=True)
+
+    async def route(self, message: aio_pika.IncomingMessage, queue_name: str):
+        """
+        Moves a message to another queue, acking it once the copy is confirmed.
+
+        The copy keeps the headers, retry count included, and records the
+        routing time for the latency of its lane. Copies are published in
+        the order of the calls.
+
+        Args:
+            message (aio_pika.IncomingMessage): The message to move.
+            queue_name (str): Destination queue.
+
+        Raises:
+            Exception: If the copy was not confirmed, or routing is held
+                after an earlier failure; the message is requeued.
+        """
+        copy = aio_pika.Message(
+            body=message.body,
+            content_type="application/json",
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            headers={**message.headers, ROUTED_AT_HEADER: time.time()},
+        )
+        try:
+            await self._router.submit((message, copy, queue_name))
+        except Exception:
+            await message.nack(requeue=True)
+            raise
+        await message.ack()
+
+    async def _publish_routed(self, batch: list) -> list:
+        # Un lot à la fois, sur un seul canal : les copies gardent leur ordre
+        async with self._route_lock:
+            results = [None] * len(batch)
+            published = []
+            for index, (message, copy, queue_name) in enumerate(batch):
+                if self._held and not message.redelivered:
+                    results[index] = RuntimeError("Routage suspendu après un échec")
+                    continue
+                # Le premier message remis en file revient en tête : l'ordre reprend
+                self._held = False
+                published.append(index)
+
+            if published:
+                channel = await self._get_route_channel()
+                outcomes = await asyncio.gather(
+                    *(
+                        channel.default_exchange.publish(
+                            batch[index][1], routing_key=batch[index][2]
+                        )
+                        for index in published
+                    ),
+                    return_exceptions=True,
+                )
+                for index, outcome in zip(published, outcomes):
+                    results[index] = outcome
+                    if isinstance(outcome, Exception) and not self._held:
+                        self._held = True
+                        logger.warning(f"Routage suspendu jusqu'au retour : {outcome}")
+            return results
+
+    async def _get_route_channel(self):
+        if self._route_channel is None or self._route_channel.is_closed:
+            if self._connection is None:
+                self._connection = await aio_pika.connect_robust(self.url)
+            self._route_channel = await self._connection.channel(
+                publisher_confirms=True
+            )
+        return self._route_channel
+
+    async def set_prefetch(self, count: int):
+        self.prefetch = count
+        if self.channel is not None and not self.channel.is_closed:
+            await self.channel.set_qos(prefetch_count=count)
+
+    async def close(self):
+        await self._router.close()
+        if self._connection is not None:
+            await self._connection.close()
+        self._connection = None
+        self.channel = None
+        self._route_channel = None
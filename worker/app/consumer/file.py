@@ -0,0 +1,174 @@
+import heapq
+import mmap
+import os
+import time
+
+from app.consumer.sources import FAILED, MessageSource
+from core.concurrency import AdjustableSemaphore
+from core.logging_wrapper import LoggerFactory
+
+logger = LoggerFactory.get_logger(__name__)
+
+SOURCE_FILE = os.getenv("SOURCE_FILE", "requests.jsonl")
+SOURCE_CHECKPOINT = os.getenv("SOURCE_CHECKPOINT")
+SOURCE_MAX_INFLIGHT = int(os.getenv("SOURCE_MAX_INFLIGHT", "1000"))
+SOURCE_CHUNK_BYTES = int(os.getenv("SOURCE_CHUNK_BYTES", str(4 * 1024 * 1024)))
+CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "1"))
+
+
+class FileRecord:
+    """
+    One line of a JSONL file.
+
+    Attributes:
+        body (bytes): Raw JSON message.
+        offset (int): Byte offset of the line.
+        end (int): Byte offset of the next line.
+    """
+
+    __slots__ = ("body", "offset", "end")
+
+    def __init__(self, body: bytes, offset: int, end: int):
+        self.body = body
+        self.offset = offset
+        self.end = end
+
+
+class FileSource(MessageSource):
+    """
+    JSONL file replayed as a message stream, without any broker.
+
+    - The file is memory-mapped and split into lines one chunk at a time.
+    - At most `max_inflight` lines are being processed at once: reading
+      waits for completions, so memory stays bounded whatever the file size.
+    - The checkpoint holds the offset before which every line is settled;
+      lines complete out of order, so it is the smallest offset still in
+      flight. Reopening the source resumes from it, so an interrupted replay
+      reprocesses at most the lines that were in flight.
+    - A failed line is logged and counted, then settled: the replay goes on.
+
+    Attributes:
+        path (str): JSONL file.
+        checkpoint_path (str): File holding the resume offset.
+        offset (int): Current checkpoint offset.
+    """
+
+    name = "file"
+
+    def __init__(
+        self,
+        path: str = SOURCE_FILE,
+        checkpoint_path: str = SOURCE_CHECKPOINT,
+        max_inflight: int = SOURCE_MAX_INFLIGHT,
+        chunk_bytes: int = SOURCE_CHUNK_BYTES,
+        checkpoint_interval: float = CHECKPOINT_INTERVAL,
+    ):
+        """
+        Initializes the source without opening the file.
+
+        Args:
+            path (str): JSONL file.
+            checkpoint_path (str, optional): Resume offset file.
+                Defaults to `<path>.offset`.
+            max_inflight (int): Maximum number of lines in flight.
+            chunk_bytes (int): Bytes split into lines at once.
+            checkpoint_interval (float): Minimum seconds between two writes
+                of the checkpoint.
+        """
+        self.path = path
+        self.checkpoint_path = checkpoint_path or f"{path}.offset"
+        self.offset = 0
+        self._chunk_bytes = chunk_bytes
+        self._interval = checkpoint_interval
+        self._limiter = AdjustableSemaphore(max_inflight)
+        self._inflight = []
+        self._settled = set()
+        self._position = 0
+        self._saved_at = 0.0
+        self._file = None
+        self._map = None
+
+    async def open(self):
+        self.offset = self._position = self._load_checkpoint()
+        self._file = open(self.path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        logger.info(
+            f"Relecture de '{self.path}' à partir de l'octet {self.offset}/{size}"
+        )
+
+    async def __aiter__(self):
+        if self._map is None:
+            return
+
+        data, size = self._map, len(self._map)
+        position = self.offset
+        while position < size:
+            chunk_end = min(position + self._chunk_bytes, size)
+            if chunk_end < size:
+                # Le bloc s'arrête à la dernière fin de ligne qu'il contient
+                newline = data.rfind(b"\n", position, chunk_end)
+                if newline < 0:
+                    # Ligne plus longue qu'un bloc : le bloc s'étend jusqu'à sa fin
+                    newline = data.find(b"\n", chunk_end)
+                chunk_end = newline + 1 if newline >= 0 else size
+
+            for line in data[position:chunk_end].splitlines(keepends=True):
+                end = position + len(line)
+                body = line.strip()
+                if body:
+                    await self._limiter.acquire()
+                    heapq.heappush(self._inflight, position)
+                    self._position = end
+                    yield FileRecord(body, position, end)
+                position = end
+            self._position = position
+
+        self._advance()
+
+    async def ack(self, record: FileRecord):
+        self._settle(record)
+
+    async def fail(self, record: FileRecord, error: Exception):
+        FAILED.inc()
+        logger.error(f"Ligne en échec (octet {record.offset}) : {error}")
+        self._settle(record)
+
+    async def close(self):
+        self._advance(force=True)
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._map = self._file = None
+        logger.info(f"Relecture arrêtée à l'octet {self.offset}")
+
+    def _settle(self, record: FileRecord):
+        self._settled.add(record.offset)
+        self._limiter.release()
+        self._advance()
+
+    def _advance(self, force: bool = False):
+        # Retire du tas les lignes terminées : son minimum est le point de reprise
+        while self._inflight and self._inflight[0] in self._settled:
+            self._settled.discard(heapq.heappop(self._inflight))
+        self.offset = self._inflight[0] if self._inflight else self._position
+
+        now = time.monotonic()
+        if force or now - self._saved_at >= self._interval:
+            self._save_checkpoint()
+            self._saved_at = now
+
+    def _load_checkpoint(self) -> int:
+        try:
+            with open(self.checkpoint_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _save_checkpoint(self):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(self.offset))
+        os.replace(tmp_path, self.checkpoint_path)
@@ -0,0 +1,329 @@
+import asyncio
+import os
+import time
+
+from app.coalescer import KeyedCoalescer
+from app.consumer.amqp import AmqpSource
+from app.consumer.file import FileSource
+from app.consumer.lanes import (
+    DELETE,
+    DELETE_CONCURRENCY,
+    DELETE_SLO,
+    LANES_ENABLED,
+    LANES_OVERFLOW,
+    ROUTED_AT_HEADER,
+    UPDATE,
+    UPDATE_BACKLOG,
+    UPDATE_QUEUE,
+    UPDATE_SLO,
+    Lane,
+    PendingKeys,
+)
+from app.consumer.shards import (
+    SHARD_CLAIM,
+    SHARD_ROUTED,
+    SHARD_ROUTER,
+    SHARDS_ENABLED,
+    parse_claim,
+    shard_of,
+    shard_queue,
+)
+from app.consumer.sources import (
+    COALESCED,
+    DEAD_LETTERED,
+    FAILED,
+    PROCESSED,
+    RETRIED,
+    ROUTED,
+    MessageSource,
+)
+from app.models.decoder import decode_message
+from app.processing import process_message
+from core.concurrency import AdjustableSemaphore
+from core.logging_wrapper import LoggerFactory
+from core.metrics import registry, stage_histogram
+
+logger = LoggerFactory.get_logger(__name__)
+
+MESSAGE_SOURCE = os.getenv("MESSAGE_SOURCE", "amqp")
+MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS"))
+
+SOURCES = {AmqpSource.name: AmqpSource, FileSource.name: FileSource}
+
+semaphore = AdjustableSemaphore(MAX_CONCURRENT_TASKS)
+active_tasks = set()
+coalescer = KeyedCoalescer(process_message)
+source = None
+update_source = None
+shard_sources = []
+
+# Les updates gardent le budget réglé par le contrôleur ; les deletes ont le leur
+update_lane = Lane(UPDATE, semaphore, UPDATE_SLO, UPDATE_BACKLOG)
+delete_lane = Lane(
+    DELETE,
+    AdjustableSemaphore(DELETE_CONCURRENCY) if LANES_ENABLED else semaphore,
+    DELETE_SLO,
+)
+pending_keys = PendingKeys()
+
+DECODE_SECONDS = stage_histogram("decode")
+SEMAPHORE_WAIT_SECONDS = stage_histogram("semaphore_wait")
+ACK_SECONDS = stage_histogram("ack")
+
+registry.gauge(
+    "worker_active_tasks", "Deliveries being handled.", fn=lambda: len(active_tasks)
+)
+registry.gauge(
+    "worker_semaphore_in_use",
+    "Concurrency permits currently held.",
+    fn=lambda: semaphore.in_use,
+)
+registry.gauge(
+    "worker_concurrency_limit",
+    "Current concurrency and prefetch limit.",
+    fn=lambda: semaphore.limit,
+)
+registry.gauge(
+    "worker_pending_routed_keys",
+    "msg_id routed to the update queue and not yet received back.",
+    fn=lambda: len(pending_keys),
+)
+registry.gauge(
+    "worker_coalescer_keys",
+    "msg_id with a running operation.",
+    fn=lambda: len(coalescer),
+)
+
+
+def create_source(name: str = MESSAGE_SOURCE) -> MessageSource:
+    """
+    Creates the message source selected by name.
+
+    Args:
+        name (str): One of `SOURCES` ("amqp" or "file").
+
+    Returns:
+        MessageSource: The unopened source.
+
+    Raises:
+        ValueError: If the source name is unknown.
+    """
+    if name not in SOURCES:
+        raise ValueError(f"Source de messages inconnue : {name}")
+    return SOURCES[name]()
+
+
+def get_source() -> MessageSource:
+    """
+    Returns the message source of the worker, created on first use.
+    """
+    global source
+    if source is None:
+        source = create_source()
+    return source
+
+
+def completed_messages() -> float:
+    """
+    Returns the number of deliveries handled so far, whatever their outcome.
+    """
+    return (
+        PROCESSED.value
+        + COALESCED.value
+        + RETRIED.value
+        + DEAD_LETTERED.value
+        + FAILED.value
+    )
+
+
+async def set_prefetch(count: int):
+    """
+    Changes the number of deliveries the message sources hand out in advance.
+
+    With the lanes, the input queue keeps room for the delete lane on top
+    of `count`: a delete is received, and runs at once, while the updates
+    ahead of it wait for the update lane. With the overflow update queue,
+    that queue receives `count` and the input queue also keeps room for the
+    update backlog. With shards, the claimed shard queues share the budget
+    of both lanes.
+
+    Args:
+        count (int): New prefetch count of the update lane.
+    """
+    if shard_sources:
+        share = -(-(count + DELETE_CONCURRENCY) // len(shard_sources))
+        for each in shard_sources:
+            await each.set_prefetch(share)
+        await get_source().set_prefetch(count + UPDATE_BACKLOG + DELETE_CONCURRENCY)
+        return
+    if update_source is None:
+        await get_source().set_prefetch(
+            count + DELETE_CONCURRENCY if LANES_ENABLED else count
+        )
+        return
+    await get_source().set_prefetch(count + UPDATE_BACKLOG + DELETE_CONCURRENCY)
+    await update_source.set_prefetch(count)
+
+
+async def _dispatch(message_source: MessageSource):
+    async for delivery in message_source:
+        task = asyncio.create_task(handle_message(delivery, message_source))
+        active_tasks.add(task)
+        task.add_done_callback(active_tasks.discard)
+
+
+async def consume_messages(message_source: MessageSource = None):
+    """
+    Asynchronously consumes the deliveries of a message source.
+
+    - Makes it the worker source and, when it routes and the lane overflow
+      is enabled, adds the update queue as a second source.
+    - With shards enabled, consumes the claimed shard queues instead, and
+      the input queue only if this replica is the shard router, as its
+      exclusive consumer.
+    - Opens the sources with a prefetch matching the concurrency limits.
+    - Launches an asynchronous task for each delivery.
+    - Returns once the source is exhausted, after its last deliveries are
+      settled. A broker queue never is: consumption stops on cancellation.
+
+    Args:
+        message_source (MessageSource, optional): Source to consume.
+            Defaults to the worker source.
+    """
+    global source, update_source, shard_sources
+
+    source = message_source or get_source()
+    sources = [source]
+    if SHARDS_ENABLED and source.routes:
+        shard_sources = shard_sources or [
+            AmqpSource(queue_name=shard_queue(shard), shard=shard)
+            for shard in parse_claim(SHARD_CLAIM)
+        ]
+        sources = ([source] if SHARD_ROUTER else []) + shard_sources
+        # Le broker refuse un second routeur au lieu de le laisser désordonner
+        source.exclusive = SHARD_ROUTER
+        claimed = [each.shard for each in shard_sources]
+        logger.info(f"Shards réclamés : {claimed} (routeur : {SHARD_ROUTER})")
+    elif LANES_ENABLED and LANES_OVERFLOW and source.routes:
+        update_source = update_source or AmqpSource(
+            queue_name=UPDATE_QUEUE, lane=UPDATE
+        )
+        sources.append(update_source)
+
+    await set_prefetch(semaphore.limit)
+    for each in sources:
+        await each.open()
+    logger.info(
+        f"Consommation de la source '{source.name}' avec {semaphore.limit} "
+        f"workers (updates) et {delete_lane.semaphore.limit} (deletes)"
+    )
+
+    await asyncio.gather(*(_dispatch(each) for each in sources))
+    await asyncio.gather(*active_tasks, return_exceptions=True)
+    logger.info(f"Source '{source.name}' épuisée")
+
+
+def _must_route(data, lane: Lane, message_source: MessageSource) -> bool:
+    if not (LANES_ENABLED and LANES_OVERFLOW and message_source.routes):
+        return False
+    # Un message suit un update routé de même clé, sinon il le doublerait
+    if data.msg_id in pending_keys:
+        return True
+    return lane is update_lane and lane.backlogged
+
+
+async def _route(delivery, queue_name: str, message_source: MessageSource) -> bool:
+    try:
+        await message_source.route(delivery, queue_name)
+    except Exception as e:
+        # Remis en file par la source, pas en file de retry : il garde son rang
+        logger.warning(f"Routage vers '{queue_name}' échoué : {e}")
+        return False
+    return True
+
+
+async def handle_message(delivery, message_source: MessageSource = None):
+    """
+    Handles a single delivery by processing it based on its type.
+
+    - With shards enabled, a delivery of the input queue is only moved to
+      the shard queue of its `msg_id`.
+    - Decodes the delivery body into a `MessageData` object and classifies
+      it into the update or delete lane, each with its own concurrency
+      budget and latency SLO: deletes never wait behind analyses.
+    - With the lane overflow enabled, routes an update to the update queue
+      when the update lane and its in-memory backlog are full, and a message
+      whose key has a routed update in flight after it. Otherwise the
+      updates wait for the update lane, bounded by the prefetch.
+    - A delete whose key has an update waiting in the update lane waits
+      behind it, in the same lane.
+    - Sends the message to `process_message()` through the coalescer, which
+      runs the operations of a same `msg_id` one after the other and drops
+      the superseded ones. A superseded message is acked as well.
+    - On failure, hands the delivery back to its source, which retries,
+      dead-letters or logs it. A delivery that could not be routed has
+      already been requeued by its source, in its place.
+
+    Args:
+        delivery: The delivery yielded by the source, such as an
+            `aio_pika.IncomingMessage`.
+        message_source (MessageSource, optional): Source of the delivery.
+            Defaults to the worker source.
+    """
+    message_source = message_source or get_source()
+    headers = getattr(delivery, "headers", None) or {}
+    received = headers.get(ROUTED_AT_HEADER) or time.time()
+    try:
+        with DECODE_SECONDS.time():
+            data = decode_message(delivery.body)
+    except Exception as e:
+        await message_source.fail(delivery, e)
+        return
+
+    if SHARDS_ENABLED and message_source.routes:
+        if await _route(delivery, shard_queue(shard_of(data.msg_id)), message_source):
+            SHARD_ROUTED.inc()
+        return
+
+    if data.type == DELETE and data.msg_id not in update_lane.queued_keys:
+        lane = delete_lane
+    else:
+        lane = update_lane
+
+    if _must_route(data, lane, message_source):
+        pending_keys.add(data.msg_id)
+        if await _route(delivery, UPDATE_QUEUE, message_source):
+            ROUTED.inc()
+        else:
+            pending_keys.discard(data.msg_id)
+        return
+
+    wait_start = time.perf_counter()
+    async with lane.slot(data.msg_id):
+        SEMAPHORE_WAIT_SECONDS.observe(time.perf_counter() - wait_start)
+        try:
+            if message_source.lane == UPDATE:
+                # Le coalescer ordonne désormais cette clé : plus de détour
+                pending_keys.discard(data.msg_id)
+            logger.info(f"[REÇU] {data.msg_id} ({data.type})")
+            if await coalescer.submit(data.msg_id, data):
+                PROCESSED.inc()
+            else:
+                COALESCED.inc()
+                logger.info(f"[FUSIONNÉ] {data.msg_id} ({data.type})")
+        except Exception as e:
+            await message_source.fail(delivery, e)
+            return
+
+        with ACK_SECONDS.time():
+            await message_source.ack(delivery)
+    lane.observe(received)
+
+
+async def close_source():
+    """
+    Releases the worker sources, once their deliveries are settled.
+    """
+    for each in (source, update_source, *shard_sources):
+        if each is not None:
+            await each.close()
@@ -0,0 +1,126 @@
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from core.concurrency import AdjustableSemaphore
+from core.metrics import registry
+
+UPDATE = "update"
+DELETE = "delete"
+
+LANES_ENABLED = os.getenv("LANES_ENABLED", "true").lower() == "true"
+# Débordement des updates vers une file dédiée : un aller-retour broker de plus
+LANES_OVERFLOW = os.getenv("LANES_OVERFLOW", "false").lower() == "true"
+UPDATE_QUEUE = os.getenv("UPDATE_QUEUE", f"{os.getenv('QUEUE_NAME')}.updates")
+DELETE_CONCURRENCY = int(os.getenv("DELETE_CONCURRENCY", "128"))
+UPDATE_BACKLOG = int(os.getenv("UPDATE_BACKLOG", "100"))
+UPDATE_SLO = float(os.getenv("UPDATE_SLO", "5"))
+DELETE_SLO = float(os.getenv("DELETE_SLO", "0.05"))
+
+# En-tête posé au routage vers la file des updates (epoch, secondes)
+ROUTED_AT_HEADER = "x-routed-at"
+
+
+class Lane:
+    """
+    One class of messages, with its own concurrency budget and latency SLO.
+
+    Attributes:
+        name (str): Lane name, "update" or "delete".
+        semaphore (AdjustableSemaphore): Concurrency budget of the lane.
+        slo (float): Latency objective, in seconds.
+        backlog (int): Messages allowed to wait for a permit in memory.
+        queued_keys (PendingKeys): `msg_id` waiting for a permit.
+    """
+
+    def __init__(
+        self, name: str, semaphore: AdjustableSemaphore, slo: float, backlog: int = 0
+    ):
+        self.name = name
+        self.semaphore = semaphore
+        self.slo = slo
+        self.backlog = backlog
+        self.queued_keys = PendingKeys()
+        self._latency = registry.histogram(
+            "worker_lane_latency_seconds",
+            "Latency from reception to ack, by lane.",
+            lane=name,
+        )
+        self._breaches = registry.counter(
+            "worker_lane_slo_breaches_total",
+            "Messages handled slower than the SLO of their lane.",
+            lane=name,
+        )
+        registry.gauge(
+            "worker_lane_slo_seconds", "Latency objective of the lane.", lane=name
+        ).set(slo)
+        registry.gauge(
+            "worker_lane_in_use",
+            "Concurrency permits held, by lane.",
+            fn=lambda: semaphore.in_use,
+            lane=name,
+        )
+
+    @property
+    def backlogged(self) -> bool:
+        """True when the permits and the in-memory backlog are all taken."""
+        semaphore = self.semaphore
+        return semaphore.in_use + semaphore.waiting >= semaphore.limit + self.backlog
+
+    @asynccontextmanager
+    async def slot(self, key: str):
+        """
+        Holds a permit of the lane; `key` is in `queued_keys` while it waits.
+
+        Args:
+            key (str): `msg_id` of the message.
+        """
+        self.queued_keys.add(key)
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued_keys.discard(key)
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+    def observe(self, since: float):
+        """
+        Records the latency of a message handled in this lane.
+
+        Args:
+            since (float): Reception time of the message (`time.time()`).
+        """
+        latency = time.time() - since
+        self._latency.observe(latency)
+        if latency > self.slo:
+            self._breaches.inc()
+
+
+class PendingKeys:
+    """
+    `msg_id` routed to the update queue and not yet handed to the coalescer.
+
+    A later message on such a key must follow it through the update queue:
+    taking the fast lane would let it overtake the routed update.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._counts
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, key: str):
+        self._counts[key] += 1
+
+    def discard(self, key: str):
+        if key in self._counts:
+            self._counts[key] -= 1
+            if self._counts[key] <= 0:
+                del self._counts[key]
@@ -0,0 +1,112 @@
+import hashlib
+import os
+
+from core.metrics import registry
+
+SHARDS_ENABLED = os.getenv("SHARDS_ENABLED", "false").lower() == "true"
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "16"))
+SHARD_QUEUE_PREFIX = os.getenv("SHARD_QUEUE_PREFIX", f"{os.getenv('QUEUE_NAME')}.shard")
+SHARD_CLAIM = os.getenv("SHARD_CLAIM", "all")
+# Un seul routeur : deux routeurs recopieraient deux messages d'une clé dans le désordre
+SHARD_ROUTER = os.getenv("SHARD_ROUTER", "false").lower() == "true"
+
+# Une file de shard n'a qu'un consommateur actif, les autres attendent en secours
+SINGLE_ACTIVE_CONSUMER = "x-single-active-consumer"
+
+SHARD_ROUTED = registry.counter(
+    "worker_shard_routed_total",
+    "Messages moved from the input queue to their shard queue.",
+)
+
+
+def shard_of(key: str, count: int = SHARD_COUNT) -> int:
+    """
+    Returns the shard of a key, by jump consistent hashing.
+
+    The shard only depends on the key and the shard count, never on the
+    process. Going from `n` to `n + 1` shards moves `1 / (n + 1)` of the
+    keys, all of them to the new shard.
+
+    Args:
+        key (str): Message key (`msg_id`).
+        count (int): Number of shards.
+
+    Returns:
+        int: Shard index in `[0, count)`.
+    """
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    state = int.from_bytes(digest, "little")
+    bucket, candidate = -1, 0
+    while candidate < count:
+        bucket = candidate
+        state = (state * 2862933555777941757 + 1) % 2**64
+        candidate = int((bucket + 1) * (2**31 / ((state >> 33) + 1)))
+    return max(bucket, 0)
+
+
+def shard_queue(index: int) -> str:
+    """
+    Returns the queue name of a shard.
+    """
+    return f"{SHARD_QUEUE_PREFIX}.{index}"
+
+
+def parse_claim(value: str, count: int = SHARD_COUNT) -> list:
+    """
+    Parses the shards claimed by a replica.
+
+    - `all`: every shard.
+    - `0-3,8`: indexes and inclusive ranges.
+    - `1/4`: every fourth shard starting at 1, i.e. the part of replica 1
+      out of 4.
+
+    Args:
+        value (str): SHARD_CLAIM setting.
+        count (int): Number of shards.
+
+    Returns:
+        list: Sorted shard indexes.
+
+    Raises:
+        ValueError: If a shard is out of range or the setting is malformed.
+    """
+    value = (value or "all").strip()
+    if value == "all":
+        return list(range(count))
+
+    if "/" in value:
+        index, replicas = (int(part) for part in value.split("/"))
+        if not 0 <= index < replicas:
+            raise ValueError(f"Part de shards invalide : {value}")
+        return list(range(index, count, replicas))
+
+    shards = set()
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        first, _, last = item.partition("-")
+        shards.update(range(int(first), int(last or first) + 1))
+    invalid = sorted(shard for shard in shards if not 0 <= shard < count)
+    if invalid:
+        raise ValueError(f"Shards hors de [0, {count}) : {invalid}")
+    return sorted(shards)
+
+
+def child_claim(index: int, processes: int, value: str = SHARD_CLAIM) -> str:
+    """
+    Returns the part of a replica's claim held by one of its processes.
+
+    The claimed shards are dealt out to the processes, so that each process
+    is the active consumer of its own shards instead of every process
+    claiming them all and all but one standing by. A process left without
+    shard claims them all, as a standby.
+
+    Args:
+        index (int): Process index.
+        processes (int): Number of processes of the replica.
+        value (str): SHARD_CLAIM setting of the replica.
+
+    Returns:
+        str: SHARD_CLAIM setting of the process.
+    """
+    shards = parse_claim(value)
+    own = shards[index :: max(1, processes)] or shards
+    return ",".join(map(str, own))
@@ -0,0 +1,99 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator
+
+from core.metrics import registry
+
+
+def _outcome_counter(outcome: str):
+    return registry.counter(
+        "worker_messages_total", "Messages handled, by outcome.", outcome=outcome
+    )
+
+
+PROCESSED = _outcome_counter("processed")
+COALESCED = _outcome_counter("coalesced")
+RETRIED = _outcome_counter("retried")
+DEAD_LETTERED = _outcome_counter("dead_lettered")
+FAILED = _outcome_counter("failed")
+ROUTED = _outcome_counter("routed")
+
+
+class MessageSource(ABC):
+    """
+    Source of raw messages for the consumer.
+
+    A source yields opaque deliveries exposing the raw JSON `body`, and
+    settles them through `ack` or `fail`: how a failure is handled (retry,
+    dead-letter, error log) belongs to the source.
+
+    A source that `routes` can also hand a delivery over to another queue,
+    such as the update lane queue or a shard queue.
+
+    Attributes:
+        lane (str): Lane of every delivery of this source, or None when the
+            deliveries are classified by type.
+        shard (int): Shard of every delivery of this source, or None.
+    """
+
+    name = "source"
+    lane = None
+    shard = None
+    routes = False
+
+    @abstractmethod
+    async def open(self):
+        """
+        Connects to, or opens, the underlying source.
+        """
+
+    @abstractmethod
+    def __aiter__(self) -> AsyncIterator[Any]:
+        """
+        Yields the deliveries until the source is exhausted or cancelled.
+        """
+
+    @abstractmethod
+    async def ack(self, delivery: Any):
+        """
+        Settles a delivery whose processing succeeded.
+
+        Args:
+            delivery: Delivery yielded by this source.
+        """
+
+    @abstractmethod
+    async def fail(self, delivery: Any, error: Exception):
+        """
+        Settles a delivery whose processing failed.
+
+        Args:
+            delivery: Delivery yielded by this source.
+            error (Exception): The processing error.
+        """
+
+    async def route(self, delivery: Any, queue_name: str):
+        """
+        Moves a delivery to another queue, then settles it.
+
+        Args:
+            delivery: Delivery yielded by this source.
+            queue_name (str): Destination queue.
+
+        Raises:
+            Exception: If the copy was not confirmed; the delivery is then
+                requeued by the source.
+        """
+        raise NotImplementedError
+
+    async def set_prefetch(self, count: int):
+        """
+        Changes the number of deliveries the source hands out in advance.
+
+        Args:
+            count (int): New prefetch count.
+        """
+
+    async def close(self):
+        """
+        Releases the source.
+        """
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from app.consumer import completed_messages, semaphore, set_prefetch
+from app.executors import get_executor, pool_size
+from app.processing import ANALYSIS_BATCH_SIZE, executor_backlog
+from core.concurrency import AdjustableSemaphore
+from core.logging_wrapper import LoggerFactory
+from core.metrics import Histogram, quantile, stage_histogram
+
+logger = LoggerFactory.get_logger(__name__)
+
+CONTROLLER_ENABLED = os.getenv("CONTROLLER_ENABLED", "true").lower() == "true"
+CONTROL_INTERVAL = float(os.getenv("CONTROL_INTERVAL", "5"))
+MIN_CONCURRENCY = int(os.getenv("MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "512"))
+LATENCY_TARGET = float(os.getenv("LATENCY_TARGET", "0.5"))
+BACKLOG_TARGET = int(os.getenv("BACKLOG_TARGET", "0"))
+INCREASE_STEP = int(os.getenv("INCREASE_STEP", "2"))
+DECREASE_FACTOR = float(os.getenv("DECREASE_FACTOR", "0.7"))
+
+
+class ConcurrencyController:
+    """
+    AIMD controller of the consumer concurrency and prefetch window.
+
+    At every tick it looks at the last window of activity:
+
+    - Multiplicative decrease when the p95 latency of the I/O stages (Mongo
+      write, publish) exceeds `latency_target`, or when the executor backlog
+      exceeds `backlog_target`: work is waiting in memory, not progressing.
+    - Additive increase when the limit is saturated, the signals are healthy
+      and the completion rate did not drop after the previous increase.
+    - Otherwise the limit is kept.
+
+    The new limit is applied to the semaphore and re-issued as `basic.qos`.
+
+    Attributes:
+        limiter (AdjustableSemaphore): Semaphore bounding the in-flight messages.
+        completion_rate (float): Completions per second over the last window.
+        latency (float): p95 I/O latency over the last window, in seconds.
+    """
+
+    def __init__(
+        self,
+        limiter: AdjustableSemaphore,
+        apply_prefetch: Callable[[int], Awaitable[None]],
+        latency_histograms: List[Histogram],
+        backlog_fn: Callable[[], int],
+        completions_fn: Callable[[], float],
+        backlog_target: int,
+        latency_target: float = LATENCY_TARGET,
+        min_limit: int = MIN_CONCURRENCY,
+        max_limit: int = MAX_CONCURRENCY,
+        increase_step: int = INCREASE_STEP,
+        decrease_factor: float = DECREASE_FACTOR,
+        interval: float = CONTROL_INTERVAL,
+    ):
+        """
+        Initializes the controller.
+
+        Args:
+            limiter (AdjustableSemaphore): Semaphore bounding the in-flight messages.
+            apply_prefetch (callable): Coroutine function re-issuing `basic.qos`.
+            latency_histograms (list): Histograms of the latency-sensitive stages.
+            backlog_fn (callable): Returns the current executor backlog.
+            completions_fn (callable): Returns the total number of completions.
+            backlog_target (int): Executor backlog above which the limit decreases.
+            latency_target (float): p95 latency (seconds) above which the limit decreases.
+            min_limit (int): Lower bound of the limit.
+            max_limit (int): Upper bound of the limit.
+            increase_step (int): Additive increase.
+            decrease_factor (float): Multiplicative decrease, in ]0, 1[.
+            interval (float): Seconds between two ticks.
+        """
+        self.limiter = limiter
+        self.latency_target = latency_target
+        self.backlog_target = backlog_target
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.interval = interval
+        self.completion_rate = 0.0
+        self.latency: Optional[float] = None
+
+        self._apply_prefetch = apply_prefetch
+        self._histograms = latency_histograms
+        self._backlog_fn = backlog_fn
+        self._completions_fn = completions_fn
+        self._snapshots = [h.snapshot()[0] for h in latency_histograms]
+        self._completions = completions_fn()
+        self._last_tick = time.monotonic()
+        self._last_increase_rate: Optional[float] = None
+
+    def decide(
+        self,
+        limit: int,
+        latency: Optional[float],
+        backlog: int,
+        saturated: bool,
+        completion_rate: float,
+    ) -> int:
+        """
+        Computes the next limit from the observed signals.
+
+        Args:
+            limit (int): Current limit.
+            latency (float, optional): p95 I/O latency, None without samples.
+            backlog (int): Executor backlog.
+            saturated (bool): True if the current limit is fully used.
+            completion_rate (float): Completions per second.
+
+        Returns:
+            int: Next limit, within `[min_limit, max_limit]`.
+        """
+        overloaded = (latency is not None and latency > self.latency_target) or (
+            self.backlog_target and backlog > self.backlog_target
+        )
+        if overloaded:
+            self._last_increase_rate = None
+            return max(self.min_limit, int(limit * self.decrease_factor))
+
+        if not saturated:
+            return limit
+
+        # Le dernier incrément n'a rien apporté : on se stabilise
+        if (
+            self._last_increase_rate is not None
+            and completion_rate < self._last_increase_rate
+        ):
+            self._last_increase_rate = None
+            return limit
+
+        self._last_increase_rate = completion_rate
+        return min(self.max_limit, limit + self.increase_step)
+
+    def _window(self):
+        now = time.monotonic()
+        elapsed = max(now - self._last_tick, 1e-9)
+        self._last_tick = now
+
+        completions = self._completions_fn()
+        rate = (completions - self._completions) / elapsed
+        self._completions = completions
+
+        latencies = []
+        for index, histogram in enumerate(self._histograms):
+            counts = histogram.snapshot()[0]
+            delta = [a - b for a, b in zip(counts, self._snapshots[index])]
+            self._snapshots[index] = counts
+            value = quantile(histogram.buckets, delta, 0.95)
+            if value is not None:
+                latencies.append(value)
+
+        return (max(latencies) if latencies else None), rate
+
+    async def tick(self):
+        """
+        Runs one control step.
+        """
+        self.latency, self.completion_rate = self._window()
+        limit = self.limiter.limit
+        saturated = self.limiter.in_use >= limit or self.limiter.waiting > 0
+        new_limit = self.decide(
+            limit, self.latency, self._backlog_fn(), saturated, self.completion_rate
+        )
+
+        if new_limit != limit:
+            self.limiter.set_limit(new_limit)
+            await self._apply_prefetch(new_limit)
+            logger.info(
+                f"Concurrence ajustée : {limit} -> {new_limit} "
+                f"(p95={self.latency}, débit={self.completion_rate:.1f}/s)"
+            )
+
+    async def run(self):
+        """
+        Runs the control loop until cancelled.
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Erreur du contrôleur de concurrence : {e}")
+
+
+def build_controller() -> ConcurrencyController:
+    """
+    Builds the controller of the worker consumer.
+
+    The backlog target defaults to two full chunks per executor process.
+
+    Returns:
+        ConcurrencyController: Controller bound to the consumer semaphore.
+    """
+    backlog_target = (
+        BACKLOG_TARGET or 2 * pool_size(get_executor()) * ANALYSIS_BATCH_SIZE
+    )
+    return ConcurrencyController(
+        semaphore,
+        set_prefetch,
+        [stage_histogram("mongo_write"), stage_histogram("publish")],
+        executor_backlog,
+        completed_messages,
+        backlog_target,
+    )
@@ -0,0 +1,221 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker
+from typing import Optional
+
+from app.analysis.engine import init_worker
+from core.logging_wrapper import LoggerFactory
+
+logger = LoggerFactory.get_logger(__name__)
+
+PROCESS = "process"
+THREAD = "thread"
+INLINE = "inline"
+PREFORK = "prefork"
+BACKENDS = (PROCESS, THREAD, INLINE, PREFORK)
+
+EXECUTOR_BACKEND = os.getenv("EXECUTOR_BACKEND", PROCESS).lower()
+# 0 : dimensionné d'après le quota CPU du conteneur
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", "0"))
+MAX_TASKS_PER_CHILD = int(os.getenv("MAX_TASKS_PER_CHILD", "1000"))
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_quota() -> Optional[float]:
+    cpu_max = _read(CGROUP_V2_CPU_MAX)
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    quota, period = _read(CGROUP_V1_QUOTA), _read(CGROUP_V1_PERIOD)
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cpu_limit() -> int:
+    """
+    Returns the number of CPUs this process may actually use.
+
+    The CPU affinity is capped by the cgroup quota (v2 `cpu.max` or v1
+    `cpu.cfs_quota_us`), rounded up, so that a container limited to 2 CPUs on
+    a 32-core host does not start 32 analysis processes.
+
+    Returns:
+        int: Usable CPUs, at least 1.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = _cgroup_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+class InlineExecutor(Executor):
+    """
+    Executor running each call synchronously in the calling thread.
+
+    Meant for tests and benchmarks: no pickling, no process, and the call
+    blocks the event loop for its whole duration.
+    """
+
+    def __init__(self, initializer=None):
+        if initializer is not None:
+            initializer()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def _warm_up(delay: float) -> int:
+    # Occupe le processus assez longtemps pour que chaque tâche en lance un
+    time.sleep(delay)
+    return os.getpid()
+
+
+def create_executor(
+    backend: str = EXECUTOR_BACKEND,
+    workers: int = EXECUTOR_WORKERS,
+    max_tasks_per_child: int = MAX_TASKS_PER_CHILD,
+) -> Executor:
+    """
+    Creates the executor of the CPU-bound analysis stages.
+
+    - "process": process pool, the default.
+    - "thread": thread pool, for analyzers releasing the GIL.
+    - "inline": runs the calls in the event loop thread.
+    - "prefork": process pool recycling each process after
+      `max_tasks_per_child` chunks, to bound its memory. Use `warm_up` to
+      start its processes ahead of the first messages.
+
+    Args:
+        backend (str): One of `BACKENDS`.
+        workers (int): Pool size; 0 sizes it from the CPU limit.
+        max_tasks_per_child (int): Chunks run by a prefork process before
+            it is replaced.
+
+    Returns:
+        Executor: The new executor, every worker loading the analysis engine.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    workers = workers or cpu_limit()
+
+    if backend in (PROCESS, PREFORK):
+        # Processus enfants rattachés au suivi de ressources du parent : la
+        # mémoire partagée qu'ils ouvrent reste à la charge du parent
+        resource_tracker.ensure_running()
+
+    if backend == PROCESS:
+        return ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+    if backend == THREAD:
+        return ThreadPoolExecutor(max_workers=workers, initializer=init_worker)
+    if backend == INLINE:
+        return InlineExecutor(initializer=init_worker)
+    if backend == PREFORK:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            max_tasks_per_child=max(1, max_tasks_per_child),
+        )
+    raise ValueError(f"Backend d'exécution inconnu : {backend} (attendu : {BACKENDS})")
+
+
+def pool_size(pool: Executor) -> int:
+    """
+    Returns the number of calls an executor can run in parallel.
+
+    Args:
+        pool (Executor): Executor.
+
+    Returns:
+        int: Parallel calls, 1 for the inline executor.
+    """
+    return getattr(pool, "_max_workers", 1)
+
+
+async def warm_up(pool: Executor, delay: float = 0.05):
+    """
+    Starts every worker of a pool before the first real call.
+
+    Each worker loads the analysis engine in its initializer, so the first
+    messages do not pay for the process start and the table build.
+
+    Args:
+        pool (Executor): Executor to warm up.
+        delay (float): Time each warm-up call keeps its worker busy.
+    """
+    if isinstance(pool, InlineExecutor):
+        return
+    loop = asyncio.get_running_loop()
+    pids = await asyncio.gather(
+        *(loop.run_in_executor(pool, _warm_up, delay) for _ in range(pool_size(pool)))
+    )
+    logger.info(f"Exécuteur préchauffé : {len(set(pids))} processus distincts")
+
+
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Executor:
+    """
+    Returns the executor of the current worker, creating it on first use.
+
+    The executor is created inside the running worker rather than at import,
+    so importing the processing modules starts nothing.
+
+    Returns:
+        Executor: The configured executor.
+    """
+    global _executor
+    if _executor is None:
+        _executor = create_executor()
+        logger.info(
+            f"Exécuteur '{EXECUTOR_BACKEND}' créé ({pool_size(_executor)} workers)"
+        )
+    return _executor
+
+
+async def start_executor():
+    """
+    Creates the executor of the worker and warms up a prefork pool.
+    """
+    pool = get_executor()
+    if EXECUTOR_BACKEND == PREFORK:
+        await warm_up(pool)
+
+
+def shutdown_executor():
+    """
+    Waits for the running calls, then stops the executor.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import math
+import os
+import struct
+
+from app.models.message_data import MessageData
+from app.storage import find_stored
+from core.logging_wrapper import LoggerFactory
+from core.metrics import registry
+
+logger = LoggerFactory.get_logger(__name__)
+
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+IDEMPOTENCY_CAPACITY = int(os.getenv("IDEMPOTENCY_CAPACITY", "1000000"))
+IDEMPOTENCY_ERROR_RATE = float(os.getenv("IDEMPOTENCY_ERROR_RATE", "0.001"))
+IDEMPOTENCY_SNAPSHOT = os.getenv("IDEMPOTENCY_SNAPSHOT")
+
+SNAPSHOT_MAGIC = b"BLM1"
+SNAPSHOT_HEADER = struct.Struct("<4sQIQ")
+
+
+def _check_counter(result: str):
+    return registry.counter(
+        "worker_idempotency_checks_total",
+        "Idempotency checks of the updates, by result.",
+        result=result,
+    )
+
+
+CHECK_MISSES = _check_counter("miss")
+CHECK_DUPLICATES = _check_counter("duplicate")
+CHECK_FALSE_POSITIVES = _check_counter("false_positive")
+
+
+def content_digest(data: MessageData) -> str:
+    """
+    Returns the digest of the content of an update.
+
+    Two deliveries of the same update share it; any change of the text,
+    the user, the timestamp or an extra field gives another digest.
+
+    Args:
+        data (MessageData): Message data.
+
+    Returns:
+        str: Hex BLAKE2b-128 digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        f"{data.type}\0{data.user_id}\0{data.timestamp}\0{data.text}".encode("utf-8")
+    )
+    extra = data.get_extra()
+    if extra:
+        digest.update(json.dumps(extra, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    The bit positions are derived by double hashing from one BLAKE2b digest.
+
+    Attributes:
+        bits (int): Size of the bit array.
+        hashes (int): Number of bit positions per item.
+        count (int): Number of items added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        Initializes an empty filter sized for `capacity` items.
+
+        Args:
+            capacity (int): Expected number of items.
+            error_rate (float): False positive rate at full capacity.
+        """
+        self.capacity = max(1, capacity)
+        self.bits = max(
+            8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        array = self._array
+        return all(array[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str):
+        array = self._array
+        for p in self._positions(item):
+            array[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    @property
+    def full(self) -> bool:
+        """True once the filter holds its capacity."""
+        return self.count >= self.capacity
+
+    def dump(self) -> bytes:
+        """
+        Returns the filter as bytes, for `BloomFilter.load`.
+        """
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, self.bits, self.hashes, self.count
+        )
+        return header + bytes(self._array)
+
+    def load(self, payload: bytes) -> bool:
+        """
+        Restores a dumped filter of the same size.
+
+        Args:
+            payload (bytes): Output of `dump()`.
+
+        Returns:
+            bool: False if the payload does not match this filter.
+        """
+        magic, bits, hashes, count = SNAPSHOT_HEADER.unpack_from(payload)
+        array = payload[SNAPSHOT_HEADER.size :]
+        if (magic, bits, hashes, len(array)) != (
+            SNAPSHOT_MAGIC,
+            self.bits,
+            self.hashes,
+            len(self._array),
+        ):
+            return False
+        self._array = bytearray(array)
+        self.count = count
+        return True
+
+
+class IdempotencyGuard:
+    """
+    Recognizes the updates already stored, before any analysis.
+
+    - An update is identified by its `msg_id` and its content digest.
+    - Committed updates are added to an in-memory Bloom filter. A miss
+      proves the update is new, with no I/O.
+    - A hit is confirmed by looking the digest up in the stored document:
+      a false positive costs one indexed `find_one`, never a lost update.
+    - The filter has two generations: once the current one is full, it
+      becomes the previous one and a fresh one starts, so the memory stays
+      bounded and the most recent updates are always remembered.
+
+    Attributes:
+        path (str): Snapshot file, or None.
+    """
+
+    def __init__(
+        self,
+        capacity: int = IDEMPOTENCY_CAPACITY,
+        error_rate: float = IDEMPOTENCY_ERROR_RATE,
+        path: str = IDEMPOTENCY_SNAPSHOT,
+    ):
+        """
+        Initializes empty filters.
+
+        Args:
+            capacity (int): Items per generation.
+            error_rate (float): False positive rate of a full generation.
+            path (str, optional): Snapshot file, loaded by `load()` and
+                written by `save()`.
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.path = path
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous = BloomFilter(capacity, error_rate)
+
+    @staticmethod
+    def key(msg_id: str, digest: str) -> str:
+        return f"{msg_id}\0{digest}"
+
+    def seen(self, msg_id: str, digest: str) -> bool:
+        """
+        Returns True if the update may have been committed already.
+        """
+        key = self.key(msg_id, digest)
+        return key in self.current or key in self.previous
+
+    def add(self, msg_id: str, digest: str):
+        """
+        Records a committed update.
+        """
+        if self.current.full:
+            self.previous = self.current
+            self.current = BloomFilter(self.capacity, self.error_rate)
+        self.current.add(self.key(msg_id, digest))
+
+    async def is_duplicate(self, msg_id: str, digest: str) -> bool:
+        """
+        Returns True if this exact update is already stored.
+
+        Args:
+            msg_id (str): Message ID.
+            digest (str): Content digest of the update.
+
+        Returns:
+            bool: True only if the stored document carries the digest.
+        """
+        if not self.seen(msg_id, digest):
+            CHECK_MISSES.inc()
+            return False
+
+        try:
+            stored = await find_stored(msg_id, digest)
+        except Exception as e:
+            logger.warning(f"Vérification d'idempotence impossible ({msg_id}) : {e}")
+            return False
+
+        if stored:
+            CHECK_DUPLICATES.inc()
+        else:
+            CHECK_FALSE_POSITIVES.inc()
+        return stored
+
+    def save(self):
+        """
+        Writes both generations to the snapshot file, atomically.
+        """
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for bloom in (self.current, self.previous):
+                payload = bloom.dump()
+                f.write(struct.pack("<Q", len(payload)))
+                f.write(payload)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Filtre d'idempotence sauvegardé ({self.current.count} entrées)")
+
+    def load(self):
+        """
+        Reloads the snapshot file, if any and if its sizing matches.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        blooms, offset = [], 0
+        for _ in range(2):
+            (size,) = struct.unpack_from("<Q", data, offset)
+            bloom = BloomFilter(self.capacity, self.error_rate)
+            if not bloom.load(data[offset + 8 : offset + 8 + size]):
+                logger.warning("Snapshot d'idempotence ignoré : dimensions différentes")
+                return
+            blooms.append(bloom)
+            offset += 8 + size
+
+        self.current, self.previous = blooms
+        logger.info(f"Filtre d'idempotence rechargé ({self.current.count} entrées)")
+
+
+def _snapshot_path() -> str:
+    # Un fichier par processus enfant : chacun a son propre filtre
+    index = os.getenv("WORKER_INDEX")
+    if IDEMPOTENCY_SNAPSHOT and index is not None:
+        return f"{IDEMPOTENCY_SNAPSHOT}.{index}"
+    return IDEMPOTENCY_SNAPSHOT
+
+
+idempotency_guard = (
+    IdempotencyGuard(path=_snapshot_path()) if IDEMPOTENCY_ENABLED else None
+)
@@ -1,14 +1,33 @@
 import asyncio
+import os
 import signal
 
-from app.consumer import active_tasks, consume_messages
+from app.cache import analysis_cache
+from app.consumer import (
+    MESSAGE_SOURCE,
+    FileSource,
+    active_tasks,
+    close_source,
+    consume_messages,
+)
+from app.controller import CONTROLLER_ENABLED, build_controller
+from app.executors import shutdown_executor, start_executor
+from app.idempotency import idempotency_guard
+from app.publisher import PUBLISH_ENABLED, publisher
+from app.storage import close_storage
+from app.storage_init import init_storage, init_user_stats
+from app.supervisor import STATS_INTERVAL, WORKER_PROCESSES, Supervisor, push_stats
 from core.logging_wrapper import LoggerFactory
+from core.metrics import registry, start_metrics_server
 
 LoggerFactory._configure()
 logger = LoggerFactory.get_logger(__name__)
 
 shutdown_event = asyncio.Event()
 
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
 
 def setup_signal_handlers():
     """
@@ -21,36 +40,112 @@ def setup_signal_handlers():
         loop.add_signal_handler(sig, shutdown_event.set)
 
 
-async def main():
+async def main(stats_queue=None):
     """
     Main entry point of the asynchronous worker.
 
-    - Starts consuming messages.
-    - Waits for a shutdown signal.
+    - Opens the publisher connection and creates the analysis executor.
+    - Creates and verifies the indexes of the results and user statistics
+      collections, and reloads the idempotency filter snapshot.
+    - Serves the metrics endpoint, or pushes the metrics to the supervisor
+      when running as a child.
+    - Starts consuming messages and the concurrency controller.
+    - Waits for a shutdown signal, or for the end of a file source.
     - Cancels the consumption task.
     - Waits for any remaining active tasks to complete.
+    - Stops the executor, flushes the pending MongoDB writes and user
+      statistics, closes the publisher and the cache, and snapshots the
+      idempotency filter.
+
+    Args:
+        stats_queue (multiprocessing.Queue, optional): Supervisor stats queue.
     """
     logger.info("Démarrage du worker...")
     setup_signal_handlers()
+    if PUBLISH_ENABLED:
+        await publisher.start()
+    await start_executor()
+    await init_storage()
+    await init_user_stats()
+    if idempotency_guard is not None:
+        idempotency_guard.load()
+    metrics_server = None
+    if METRICS_PORT:
+        metrics_server = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+        logger.info(f"Métriques exposées sur le port {METRICS_PORT} (/metrics)")
+    stats_task = None
+    if stats_queue is not None:
+        stats_task = asyncio.create_task(
+            push_stats(stats_queue, registry.collect, STATS_INTERVAL)
+        )
     consumer_task = asyncio.create_task(consume_messages())
+    controller_task = None
+    if CONTROLLER_ENABLED:
+        controller_task = asyncio.create_task(build_controller().run())
 
-    await shutdown_event.wait()
-    logger.info("Signal reçu. Arrêt demandé..")
+    shutdown_task = asyncio.create_task(shutdown_event.wait())
+    await asyncio.wait(
+        {shutdown_task, consumer_task}, return_when=asyncio.FIRST_COMPLETED
+    )
+    if shutdown_task.done():
+        logger.info("Signal reçu. Arrêt demandé..")
+    else:
+        shutdown_task.cancel()
+        logger.info("Source épuisée. Arrêt..")
 
+    if controller_task is not None:
+        controller_task.cancel()
     consumer_task.cancel()
     try:
         await consumer_task
     except asyncio.CancelledError:
         logger.info("Consommation annulée..")
+    except Exception as e:
+        logger.error(f"Consommation interrompue : {e}")
 
     logger.info("En attente des tâches restantes..")
 
     await asyncio.gather(*active_tasks, return_exceptions=True)
+    await close_source()
+    shutdown_executor()
+    await close_storage()
+    await publisher.close()
+    if analysis_cache is not None:
+        analysis_cache.close()
+    if idempotency_guard is not None:
+        idempotency_guard.save()
+    if metrics_server is not None:
+        metrics_server.close()
+    if stats_task is not None:
+        stats_task.cancel()
+        stats_queue.put((int(os.getenv("WORKER_INDEX", "0")), registry.collect()))
     logger.info("Arrêt terminé.")
 
 
-if __name__ == "__main__":
+def run_worker(stats_queue=None):
+    """
+    Runs one worker process until its shutdown signal.
+
+    Args:
+        stats_queue (multiprocessing.Queue, optional): Supervisor stats queue.
+    """
     try:
-        asyncio.run(main())
+        asyncio.run(main(stats_queue))
     except KeyboardInterrupt:
         logger.warning("Interruption via CTRL+C")
+    finally:
+        # Un processus enfant sort sans passer par atexit
+        LoggerFactory.shutdown()
+
+
+if __name__ == "__main__":
+    if WORKER_PROCESSES > 1 and MESSAGE_SOURCE == FileSource.name:
+        # Chaque enfant rejouerait tout le fichier, sur le même checkpoint
+        raise SystemExit("MESSAGE_SOURCE=file exige WORKER_PROCESSES=1")
+    if WORKER_PROCESSES > 1:
+        try:
+            asyncio.run(Supervisor(run_worker).run())
+        except KeyboardInterrupt:
+            logger.warning("Interruption via CTRL+C")
+    else:
+        run_worker()
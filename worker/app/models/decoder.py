@@ -0,0 +1,56 @@
+import json
+
+from app.models.message_data import MessageData
+
+try:
+    import msgspec
+
+    _msgspec_decode = msgspec.json.Decoder().decode
+
+    def _loads(body: bytes):
+        try:
+            return _msgspec_decode(body)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    DECODER_BACKEND = "msgspec"
+except ImportError:
+    try:
+        import orjson
+
+        _loads = orjson.loads
+        DECODER_BACKEND = "orjson"
+    except ImportError:
+        _loads = json.loads
+        DECODER_BACKEND = "json"
+
+
+def decode_message(body: bytes) -> MessageData:
+    """
+    Decodes a raw message body into a `MessageData`.
+
+    Uses the fastest available JSON decoder (msgspec, then orjson, then the
+    standard library) and reads the bytes directly, without an intermediate
+    `str`.
+
+    The body is decoded into a plain dict, not a typed schema such as a
+    `msgspec.Struct`: a schema drops the unknown fields, which `MessageData`
+    keeps as extras for the stored and published results, and rejects the
+    `msg_id` types the worker accepts today. `MessageData` then reads the
+    known fields straight into its slots.
+
+    Args:
+        body (bytes): Raw JSON body.
+
+    Returns:
+        MessageData: Decoded message.
+
+    Raises:
+        ValueError: If the body is not valid JSON.
+        TypeError: If the body is not a JSON object.
+        KeyError: If 'msg_id' or 'type' are missing.
+    """
+    raw = _loads(body)
+    if not isinstance(raw, dict):
+        raise TypeError(f"Message body must be a JSON object, not {type(raw).__name__}")
+    return MessageData(raw)
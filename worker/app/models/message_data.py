@@ -1,3 +1,6 @@
+_KNOWN_KEYS = frozenset(("msg_id", "user_id", "text", "type", "timestamp"))
+
+
 class MessageData:
     """
     Represents a structured message to be processed by the worker.
@@ -29,9 +32,8 @@ class MessageData:
         self.type = raw_dict["type"]
         self.timestamp = raw_dict.get("timestamp")
 
-        # Capture des champs non attendus
-        known_keys = {"msg_id", "user_id", "text", "type", "timestamp"}
-        self._extra = {k: v for k, v in raw_dict.items() if k not in known_keys}
+        # Capture des champs non attendus, dans leur ordre d'arrivée
+        self._extra = {k: v for k, v in raw_dict.items() if k not in _KNOWN_KEYS}
 
     def to_dict(self, include_extra: bool = True) -> dict:
         """
@@ -1,44 +1,136 @@
 import asyncio
+import os
 import random
+import re
 import time
-from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
+from app.analysis.engine import get_engine
+from app.cache import ANALYSIS_FIELDS, analysis_cache
+from app.executors import get_executor, pool_size
+from app.idempotency import content_digest, idempotency_guard
 from app.models.message_data import MessageData
 from app.publisher import publish_result
 from app.storage import delete_result, store_result
+from core.batching import MicroBatcher
 from core.logging_wrapper import LoggerFactory
+from core.metrics import registry, stage_histogram
 
 logger = LoggerFactory.get_logger(__name__)
-executor = ProcessPoolExecutor(max_workers=4)
 
+ANALYSIS_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", "16"))
+ANALYSIS_BATCH_DELAY = float(os.getenv("ANALYSIS_BATCH_DELAY", "0.005"))
+# Textes analysés en morceaux parallèles au-delà de ce nombre de caractères (0 : jamais)
+ANALYSIS_SPLIT_THRESHOLD = int(os.getenv("ANALYSIS_SPLIT_THRESHOLD", "65536"))
+ANALYSIS_SPLIT_CHUNK = int(os.getenv("ANALYSIS_SPLIT_CHUNK", "16384"))
 
-def heavy_analysis(data: MessageData) -> dict:
+# Découpe sur un blanc ASCII : jamais au milieu d'un token ni d'un caractère UTF-8
+SPLIT_PATTERN = re.compile(rb"[ \t\n\r\f\v]")
+
+# Champs retirés du document stocké / seuls champs publiés
+NOT_STORED_FIELDS = ("type", "status", "duration")
+PUBLISHED_FIELDS = ("msg_id", "type", "status")
+
+EXECUTOR_QUEUE_SECONDS = stage_histogram("executor_queue")
+EXECUTOR_RUN_SECONDS = stage_histogram("executor_run")
+
+
+IO_BOUND = "io"
+CPU_BOUND = "cpu"
+
+
+class Stage:
+    """
+    One step of the analysis pipeline.
+
+    Attributes:
+        name (str): Stage name, used in logs.
+        func (callable): Stage function, called with the `MessageData` and
+            returning a dict merged into the result. I/O-bound stages are
+            coroutine functions awaited on the event loop; CPU-bound stages are
+            plain picklable functions dispatched to the executor.
+        kind (str): `IO_BOUND` or `CPU_BOUND`.
+        batched (bool): For CPU-bound stages, True if `func` takes a list of
+            messages and returns a list of dicts, so a whole chunk is handled
+            in one call.
+        split (callable): For CPU-bound stages, optional coroutine function
+            `(data, pool)` used instead of `func` for texts of at least
+            `ANALYSIS_SPLIT_THRESHOLD` characters, spreading one text over
+            the pool.
     """
-    Simulates an intensive business task (IO + CPU).
 
-    - Adds a random delay between 2 and 15 seconds.
-    - Performs a hash computation on the text.
-    - Returns an enriched dictionary.
+    __slots__ = ("name", "func", "kind", "batched", "split")
+
+    def __init__(self, name: str, func, kind: str, batched: bool = False, split=None):
+        """
+        Initializes a stage.
+
+        Args:
+            name (str): Stage name.
+            func (callable): Stage function.
+            kind (str): `IO_BOUND` or `CPU_BOUND`.
+            batched (bool): True if `func` handles a list of messages.
+            split (callable, optional): Coroutine function for large texts.
+
+        Raises:
+            ValueError: If `kind` is not a known stage kind.
+        """
+        if kind not in (IO_BOUND, CPU_BOUND):
+            raise ValueError(f"Unknown stage kind: {kind}")
+        self.name = name
+        self.func = func
+        self.kind = kind
+        self.batched = batched
+        self.split = split
+
+
+async def simulate_io_wait(data: MessageData) -> dict:
+    """
+    Simulates the I/O-bound part of the business task.
+
+    - Waits a random delay between 2 and 15 seconds without blocking the loop.
 
     Args:
         data (MessageData): Message data.
 
     Returns:
-        dict: Enriched result including duration, score, etc.
+        dict: The simulated `duration`.
     """
-    # Simule tache métier avec un délai IO-bound entre 2 et 15 secondes
+    # Simule l'attente IO-bound (appel externe) entre 2 et 15 secondes
     duration = random.randint(2, 15)
-    time.sleep(duration)
+    await asyncio.sleep(duration)
+    return {"duration": duration}
 
-    # Charge CPU légère
-    _ = sum(i * i for i in range(10_000))
 
-    # Scoring factice
-    if data.text:
-        score = hash(data.text) % 100
-    else:
-        score = None
+def analyze_messages(items: list) -> list:
+    """
+    Runs the CPU-bound part of the business task on a chunk of messages.
+
+    - Analyses every text of the chunk in one vectorized engine call.
+    - Returns one enriched dictionary per message.
+
+    Args:
+        items (list): `MessageData` objects.
 
+    Returns:
+        list: Enriched results including score, sentiment, keywords, etc.
+    """
+    analyses = get_engine().analyze_batch([data.text for data in items])
+
+    return [build_result(data, analysis) for data, analysis in zip(items, analyses)]
+
+
+def build_result(data: MessageData, analysis: dict) -> dict:
+    """
+    Builds the enriched result of a message from its analysis.
+
+    Args:
+        data (MessageData): Message data.
+        analysis (dict): Analysis fields of the text.
+
+    Returns:
+        dict: Message fields, analysis fields, status and extra fields.
+    """
     result = {
         "msg_id": data.msg_id,
         "user_id": data.user_id,
@@ -46,19 +138,385 @@ def heavy_analysis(data: MessageData) -> dict:
         "type": data.type,
         "timestamp": data.timestamp,
         "status": "done",
-        "duration": duration,
-        "score": score,
     }
-
+    result.update(analysis)
     result.update(data.get_extra())
     return result
 
 
+def heavy_analysis(data: MessageData) -> dict:
+    """
+    Runs the CPU-bound part of the business task on a single message.
+
+    Args:
+        data (MessageData): Message data.
+
+    Returns:
+        dict: Enriched result including score, sentiment, keywords, etc.
+    """
+    return analyze_messages([data])[0]
+
+
+def split_offsets(payload: bytes, parts: int) -> list:
+    """
+    Cuts an encoded text into about `parts` ranges of similar size.
+
+    Each cut is moved forward to the next ASCII whitespace, so no token and
+    no UTF-8 sequence is ever split.
+
+    Args:
+        payload (bytes): UTF-8 encoded text.
+        parts (int): Wanted number of ranges.
+
+    Returns:
+        list: `(start, end)` byte ranges covering the whole payload, in order.
+    """
+    size = len(payload)
+    step = max(1, -(-size // max(1, parts)))
+    ranges, start = [], 0
+    while start < size:
+        match = SPLIT_PATTERN.search(payload, min(size, start + step))
+        end = match.start() if match else size
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def analyze_shared(name: str, start: int, end: int) -> dict:
+    """
+    Analyses one range of a text held in shared memory.
+
+    Runs in a worker process: only the segment name and the range are
+    pickled, not the text.
+
+    Args:
+        name (str): Shared memory segment holding the UTF-8 text.
+        start (int): First byte of the range.
+        end (int): End of the range (excluded).
+
+    Returns:
+        dict: Partial analysis of the range (see `AnalysisEngine.analyze_partial`).
+    """
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        text = bytes(segment.buf[start:end]).decode("utf-8")
+    finally:
+        segment.close()
+    return get_engine().analyze_partial(text)
+
+
+async def analyze_split(data: MessageData, pool) -> dict:
+    """
+    Analyses one large text in parallel chunks across the pool.
+
+    - The text is encoded once into a shared memory segment.
+    - It is cut on whitespace into one range per worker, each at least
+      `ANALYSIS_SPLIT_CHUNK` bytes, analysed concurrently.
+    - The partial analyses are merged in text order: the result is
+      identical to analysing the text in one piece.
+    - With a single worker, the text is analysed whole.
+
+    Args:
+        data (MessageData): Message data.
+        pool (Executor): Executor running the chunks.
+
+    Returns:
+        dict: Enriched result including score, sentiment, keywords, etc.
+    """
+    payload = data.text.encode("utf-8")
+    parts = min(pool_size(pool), len(payload) // max(1, ANALYSIS_SPLIT_CHUNK))
+    loop = asyncio.get_running_loop()
+    if parts < 2:
+        # Un seul worker ou texte trop court : rien à paralléliser
+        return await loop.run_in_executor(pool, heavy_analysis, data)
+
+    ranges = split_offsets(payload, parts)
+    segment = shared_memory.SharedMemory(create=True, size=max(1, len(payload)))
+    try:
+        segment.buf[: len(payload)] = payload
+        partials = await asyncio.gather(
+            *(
+                loop.run_in_executor(pool, analyze_shared, segment.name, start, end)
+                for start, end in ranges
+            )
+        )
+    finally:
+        segment.close()
+        segment.unlink()
+
+    analysis = get_engine().merge_partials(partials)
+    logger.debug(f"Texte analysé en {len(ranges)} morceaux : {data.msg_id}")
+    return build_result(data, analysis)
+
+
+def run_chunk(func, items: list, batched: bool = False) -> list:
+    """
+    Applies a CPU-bound stage to a chunk of messages inside one worker process.
+
+    Errors are returned in place of the result so that one failing message
+    does not fail the rest of its chunk: if a batched stage fails on the
+    whole chunk, it is retried message by message.
+
+    Args:
+        func (callable): Stage function.
+        items (list): `MessageData` objects of the chunk.
+        batched (bool): True if `func` handles a list of messages.
+
+    Returns:
+        list: One result dict (or exception) per message, in order.
+    """
+    if batched:
+        try:
+            return func(items)
+        except Exception as e:
+            if len(items) == 1:
+                return [e]
+            return [run_chunk(func, [data], batched)[0] for data in items]
+
+    results = []
+    for data in items:
+        try:
+            results.append(func(data))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def run_timed_chunk(func, items: list, batched: bool = False) -> tuple:
+    """
+    Runs `run_chunk` and reports when and how long it ran in the worker process.
+
+    Args:
+        func (callable): Stage function.
+        items (list): `MessageData` objects of the chunk.
+        batched (bool): True if `func` handles a list of messages.
+
+    Returns:
+        tuple: `(started_at, duration, results)`, times in seconds.
+    """
+    started_at = time.time()
+    results = run_chunk(func, items, batched)
+    return started_at, time.time() - started_at, results
+
+
+class BatchDispatcher:
+    """
+    Sends the calls of a CPU-bound stage to the executor in chunks.
+
+    Concurrent calls are grouped into chunks of at most `max_size` messages,
+    closed after `max_delay` seconds, and each chunk costs one executor call:
+    one pickling round trip instead of one per message. Results are then
+    dispatched back to the awaiting tasks.
+
+    Attributes:
+        func (callable): Stage function run in the executor.
+        pool (Executor): Executor receiving the chunks.
+        backlog (int): Messages waiting for, or inside, the executor.
+    """
+
+    def __init__(
+        self,
+        func,
+        pool,
+        batched: bool = False,
+        max_size: int = ANALYSIS_BATCH_SIZE,
+        max_delay: float = ANALYSIS_BATCH_DELAY,
+    ):
+        """
+        Initializes the dispatcher.
+
+        Args:
+            func (callable): Picklable stage function.
+            pool (Executor): Executor receiving the chunks.
+            batched (bool): True if `func` handles a list of messages.
+            max_size (int): Maximum number of messages per chunk.
+            max_delay (float): Maximum time (seconds) a message waits for its chunk.
+        """
+        self.func = func
+        self.pool = pool
+        self.batched = batched
+        self.backlog = 0
+        self._batcher = MicroBatcher(self._flush, max_size, max_delay)
+
+    async def submit(self, data: MessageData) -> dict:
+        """
+        Runs the stage on one message as part of a chunk.
+
+        Args:
+            data (MessageData): Message data.
+
+        Returns:
+            dict: Output of the stage for this message.
+        """
+        self.backlog += 1
+        try:
+            return await self._batcher.submit(data)
+        finally:
+            self.backlog -= 1
+
+    async def _flush(self, items: list) -> list:
+        loop = asyncio.get_running_loop()
+        dispatched_at = time.time()
+        started_at, duration, results = await loop.run_in_executor(
+            self.pool, run_timed_chunk, self.func, items, self.batched
+        )
+        EXECUTOR_QUEUE_SECONDS.observe(max(0.0, started_at - dispatched_at))
+        EXECUTOR_RUN_SECONDS.observe(duration)
+        return results
+
+
+_dispatchers = {}
+
+
+def executor_backlog() -> int:
+    """
+    Returns the number of messages waiting for, or inside, the executor.
+    """
+    return sum(d.backlog for d in _dispatchers.values())
+
+
+registry.gauge(
+    "worker_executor_backlog",
+    "Messages waiting for, or inside, the analysis executor.",
+    fn=executor_backlog,
+)
+
+
+def get_dispatcher(stage: Stage, pool=None) -> BatchDispatcher:
+    """
+    Returns the shared dispatcher of a CPU-bound stage and executor.
+
+    Args:
+        stage (Stage): CPU-bound stage.
+        pool (Executor, optional): Executor. Defaults to the worker executor.
+
+    Returns:
+        BatchDispatcher: Dispatcher for this pair.
+    """
+    pool = pool or get_executor()
+    key = (stage.func, stage.batched, pool)
+    if key not in _dispatchers:
+        _dispatchers[key] = BatchDispatcher(stage.func, pool, stage.batched)
+    return _dispatchers[key]
+
+
+ANALYSIS_PIPELINE = (
+    Stage("io_wait", simulate_io_wait, IO_BOUND),
+    Stage("analysis", analyze_messages, CPU_BOUND, batched=True, split=analyze_split),
+)
+
+
+def _is_large(text) -> bool:
+    return bool(text) and 0 < ANALYSIS_SPLIT_THRESHOLD <= len(text)
+
+
+async def run_pipeline(data: MessageData, stages=None, pool=None) -> dict:
+    """
+    Runs the analysis stages in order and merges their outputs.
+
+    I/O-bound stages are awaited on the event loop, so their waits overlap
+    across messages; CPU-bound stages are sent to the executor in chunks
+    through a `BatchDispatcher`, so the pool only ever does CPU work. A text
+    of at least `ANALYSIS_SPLIT_THRESHOLD` characters goes to the `split`
+    function of the stage instead, when it has one.
+
+    Args:
+        data (MessageData): Message data.
+        stages (tuple, optional): Stages to run. Defaults to `ANALYSIS_PIPELINE`.
+        pool (Executor, optional): Executor for CPU-bound stages.
+            Defaults to the worker executor.
+
+    Returns:
+        dict: Merged outputs of every stage.
+    """
+    result = {}
+    for stage in stages or ANALYSIS_PIPELINE:
+        if stage.kind == IO_BOUND:
+            output = await stage.func(data)
+        elif stage.split is not None and _is_large(data.text):
+            output = await stage.split(data, pool or get_executor())
+        else:
+            output = await get_dispatcher(stage, pool).submit(data)
+        result.update(output)
+    return result
+
+
+CACHE_ERRORS = registry.counter(
+    "worker_cache_errors_total",
+    "Analysis cache lookups or stores that failed and were bypassed.",
+)
+
+
+async def analyze(data: MessageData) -> dict:
+    """
+    Returns the enriched result of an update message.
+
+    The analysis cache is checked before anything is sent to the executor;
+    on a miss the pipeline runs and its analysis fields are cached. A cache
+    error is logged and counted, never raised: the message is analyzed as
+    on a miss.
+
+    Args:
+        data (MessageData): Message data.
+
+    Returns:
+        dict: Enriched result.
+    """
+    if analysis_cache is None or not data.text:
+        return await run_pipeline(data)
+
+    try:
+        cached = await analysis_cache.get(data.text)
+    except Exception as e:
+        CACHE_ERRORS.inc()
+        logger.warning(f"Lecture du cache d'analyse échouée ({data.msg_id}) : {e}")
+        cached = None
+    if cached is not None:
+        return build_result(data, cached)
+
+    result = await run_pipeline(data)
+    # Un champ extra peut masquer un champ d'analyse : on ne le met pas en cache
+    if not data.get_extra().keys() & set(ANALYSIS_FIELDS):
+        try:
+            await analysis_cache.put(
+                data.text, {k: result[k] for k in ANALYSIS_FIELDS if k in result}
+            )
+        except Exception as e:
+            CACHE_ERRORS.inc()
+            logger.warning(f"Écriture du cache d'analyse échouée ({data.msg_id}) : {e}")
+    return result
+
+
+async def commit_update(result: dict, digest: str = None):
+    """
+    Stores the result of an update and publishes its completion.
+
+    Args:
+        result (dict): Enriched result of the update.
+        digest (str, optional): Content digest, stored with the result and
+            recorded by the idempotency guard once stored.
+    """
+    store_payload = dict(result)
+    for key in NOT_STORED_FIELDS:
+        store_payload.pop(key, None)
+    if digest is not None:
+        store_payload["content_digest"] = digest
+    publish_payload = {k: result[k] for k in PUBLISHED_FIELDS if k in result}
+
+    await store_result(store_payload)
+    if digest is not None:
+        idempotency_guard.add(result["msg_id"], digest)
+    await publish_result(publish_payload)
+
+
 async def process_message(data: MessageData):
     """
     Handles the processing of a message based on its type.
 
-    - "update": processing, storage, publishing.
+    - "update": processing, storage, publishing. Once the analysis is done,
+      a cancellation waits for storage and publishing to complete. An
+      update already stored (redelivery, retry of a completed message) is
+      only published again, without any analysis.
     - "delete": delete from MongoDB.
     - otherwise: log a warning.
 
@@ -66,17 +524,28 @@ async def process_message(data: MessageData):
         data (MessageData): Structured message to process.
     """
     if data.type == "update":
-        loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(executor, heavy_analysis, data)
-        store_payload = {
-            k: v for k, v in result.items() if k not in {"type", "status", "duration"}
-        }
-        publish_payload = {
-            k: v for k, v in result.items() if k in {"msg_id", "type", "status"}
-        }
-
-        await store_result(store_payload)
-        await publish_result(publish_payload)
+        # Sans garde, ni empreinte à calculer ni à stocker
+        digest = content_digest(data) if idempotency_guard is not None else None
+        if digest is not None and await idempotency_guard.is_duplicate(
+            data.msg_id, digest
+        ):
+            # Déjà stocké : seule la publication a pu manquer
+            await publish_result(
+                {"msg_id": data.msg_id, "type": "update", "status": "done"}
+            )
+            logger.info(f"Doublon ignoré : {data.msg_id}")
+            return
+
+        result = await analyze(data)
+
+        # Stockage + publication ne sont jamais interrompus à mi-chemin :
+        # une annulation attend leur fin avant d'être propagée
+        commit = asyncio.ensure_future(commit_update(result, digest))
+        try:
+            await asyncio.shield(commit)
+        except asyncio.CancelledError:
+            await commit
+            raise
         logger.info(f"Message traité : {data.msg_id} (update)")
     elif data.type == "delete":
         await delete_result(data.msg_id)
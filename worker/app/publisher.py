@@ -1,68 +1,198 @@
+import asyncio
 import json
 import os
+from itertools import cycle
 
 import aio_pika
+from core.batching import MicroBatcher
 from core.logging_wrapper import LoggerFactory
+from core.metrics import stage_histogram
 
 logger = LoggerFactory.get_logger(__name__)
 
 AMQP_URL = os.getenv("AMQP_URL")
 OUTPUT_QUEUE = os.getenv("OUTPUT_QUEUE")
+PUBLISHER_CHANNELS = int(os.getenv("PUBLISHER_CHANNELS", "4"))
+PUBLISH_BATCH_SIZE = int(os.getenv("PUBLISH_BATCH_SIZE", "100"))
+PUBLISH_BATCH_DELAY = float(os.getenv("PUBLISH_BATCH_DELAY", "0.005"))
+PUBLISH_ENABLED = os.getenv("PUBLISH_ENABLED", "true").lower() == "true"
+
+PUBLISH_SECONDS = stage_histogram("publish")
+
+
+class ResultPublisher:
+    """
+    Publishes messages over one long-lived connection and a pool of channels.
+
+    - Opens the connection and the channels once, with publisher confirms.
+    - Declares the output queue once at startup.
+    - Groups publications into batches: every message of a batch is sent on
+      the same channel without waiting, then the broker confirms are awaited
+      together.
+
+    Attributes:
+        url (str): AMQP connection URL.
+        channel_count (int): Number of channels in the pool.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        channel_count: int = PUBLISHER_CHANNELS,
+        batch_size: int = PUBLISH_BATCH_SIZE,
+        batch_delay: float = PUBLISH_BATCH_DELAY,
+    ):
+        """
+        Initializes the publisher without connecting.
+
+        Args:
+            url (str): AMQP connection URL.
+            channel_count (int): Number of channels in the pool.
+            batch_size (int): Maximum number of messages per confirm batch.
+            batch_delay (float): Maximum time (seconds) a message waits for its batch.
+        """
+        self.url = url
+        self.channel_count = max(1, channel_count)
+        self._batcher = MicroBatcher(self._flush, batch_size, batch_delay)
+        self._connection = None
+        self._channels = []
+        self._next_channel = None
+        self._start_lock = None
+
+    @property
+    def started(self) -> bool:
+        """True once the connection and the channel pool are open."""
+        return self._connection is not None
+
+    async def start(self):
+        """
+        Opens the connection, the channel pool and declares the output queue.
+
+        Safe to call several times: only the first call connects.
+        """
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+
+        async with self._start_lock:
+            if self.started:
+                return
+
+            connection = await aio_pika.connect_robust(self.url)
+            channels = [
+                await connection.channel(publisher_confirms=True)
+                for _ in range(self.channel_count)
+            ]
+            await channels[0].declare_queue(OUTPUT_QUEUE, durable=True)
+
+            self._channels = channels
+            self._next_channel = cycle(channels)
+            self._connection = connection
+            logger.info(
+                f"Publisher connecté ({len(channels)} canaux, file '{OUTPUT_QUEUE}')"
+            )
+
+    async def close(self):
+        """
+        Flushes the pending messages, then closes the connection.
+        """
+        await self._batcher.close()
+        if self._connection is not None:
+            await self._connection.close()
+            logger.info("Publisher fermé.")
+
+        self._connection = None
+        self._channels = []
+        self._next_channel = None
+
+    async def publish(self, message: aio_pika.Message, routing_key: str):
+        """
+        Publishes a message and waits for the broker confirm.
+
+        Args:
+            message (aio_pika.Message): Message to publish.
+            routing_key (str): Routing key on the default exchange.
+        """
+        if not self.started:
+            await self.start()
+        await self._batcher.submit((message, routing_key))
+
+    async def _flush(self, batch: list) -> list:
+        channel = next(self._next_channel)
+        with PUBLISH_SECONDS.time():
+            return await asyncio.gather(
+                *(
+                    channel.default_exchange.publish(message, routing_key=routing_key)
+                    for message, routing_key in batch
+                ),
+                return_exceptions=True,
+            )
+
+
+publisher = ResultPublisher(AMQP_URL)
 
 
 async def publish_result(result: dict):
     """
     Publishes the final result to the `processed_texts` queue.
 
+    Does nothing when PUBLISH_ENABLED is false, e.g. for a file replay run
+    without any broker.
+
     Args:
         result (dict): Result to send to RabbitMQ.
     """
-    try:
-        connection = await aio_pika.connect_robust(AMQP_URL)
-        channel = await connection.channel()
-        await channel.declare_queue(OUTPUT_QUEUE, durable=True)
+    if not PUBLISH_ENABLED:
+        return
 
+    try:
         message = aio_pika.Message(
             body=json.dumps(result).encode(),
             content_type="application/json",
             delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
         )
 
-        await channel.default_exchange.publish(message, routing_key=OUTPUT_QUEUE)
+        await publisher.publish(message, OUTPUT_QUEUE)
 
         logger.info(f"Message publié dans '{OUTPUT_QUEUE}' : {result.get('msg_id')}")
-        await connection.close()
 
     except Exception as e:
         logger.error(f"Erreur publication message : {e}")
 
 
 async def republish_with_retries(
-    original_message: aio_pika.IncomingMessage, retries: int
-):
+    original_message: aio_pika.IncomingMessage,
+    retries: int,
+    routing_key: str = None,
+    expiration: float = None,
+) -> bool:
     """
     Republishes a message to RabbitMQ with an incremented retry counter.
 
     Args:
         original_message (aio_pika.IncomingMessage): The original message to republish.
         retries (int): Current retry count.
+        routing_key (str, optional): Destination queue. Defaults to the
+            queue the message came from.
+        expiration (float, optional): Per-message TTL, in seconds.
+
+    Returns:
+        bool: True if the broker confirmed the publication.
     """
     try:
-        connection = await aio_pika.connect_robust(AMQP_URL)
-        channel = await connection.channel()
-
-        await channel.default_exchange.publish(
+        await publisher.publish(
             aio_pika.Message(
                 body=original_message.body,
                 content_type="application/json",
                 delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
                 headers={**original_message.headers, "x-retries": retries},
+                expiration=expiration,
             ),
-            routing_key=original_message.routing_key,
+            routing_key=routing_key or original_message.routing_key,
         )
 
         logger.warning(f"Message re-publié (retry={retries})")
-        await connection.close()
+        return True
 
     except Exception as e:
         logger.error(f"Re-publication échouée : {e}")
+        return False
@@ -0,0 +1,107 @@
+import os
+import random
+
+import aio_pika
+from app.publisher import republish_with_retries
+from core.logging_wrapper import LoggerFactory
+from core.metrics import registry
+
+logger = LoggerFactory.get_logger(__name__)
+
+QUEUE_NAME = os.getenv("QUEUE_NAME")
+# Délai (secondes) avant la 1re, 2e, ... tentative ; le dernier palier est réutilisé
+RETRY_DELAYS = tuple(
+    float(delay) for delay in os.getenv("RETRY_DELAYS", "1,5,30,120").split(",")
+)
+RETRY_JITTER = float(os.getenv("RETRY_JITTER", "0.2"))
+
+
+def retry_queue_name(delay: float) -> str:
+    """
+    Returns the name of the delay queue of a tier.
+
+    Args:
+        delay (float): Delay of the tier, in seconds.
+
+    Returns:
+        str: Queue name, e.g. `incoming_texts.retry.5s`.
+    """
+    return f"{QUEUE_NAME}.retry.{delay:g}s"
+
+
+def retry_tier(retries: int, delays: tuple = RETRY_DELAYS) -> float:
+    """
+    Returns the delay tier of a retry.
+
+    Args:
+        retries (int): Retry number, starting at 1.
+        delays (tuple): Delay schedule.
+
+    Returns:
+        float: Delay of the tier, in seconds.
+    """
+    return delays[min(max(retries, 1), len(delays)) - 1]
+
+
+def retry_expiration(delay: float, jitter: float = RETRY_JITTER) -> float:
+    """
+    Returns the per-message expiration of a retry, with jitter.
+
+    The jitter only shortens the delay: the queue TTL is the upper bound, so
+    messages of a tier spread over `[delay * (1 - jitter), delay]` and a
+    message never waits behind another one for more than `delay * jitter`.
+
+    Args:
+        delay (float): Delay of the tier, in seconds.
+        jitter (float): Fraction of the delay, in [0, 1].
+
+    Returns:
+        float: Expiration, in seconds.
+    """
+    return delay * (1 - jitter * random.random())
+
+
+async def declare_retry_queues(channel: aio_pika.abc.AbstractChannel):
+    """
+    Declares one delay queue per tier of the schedule.
+
+    A delay queue has no consumer: its messages expire after the tier TTL and
+    are dead-lettered back to the input queue through the default exchange.
+
+    Args:
+        channel (aio_pika.abc.AbstractChannel): Channel used for the declarations.
+    """
+    for delay in sorted(set(RETRY_DELAYS)):
+        await channel.declare_queue(
+            retry_queue_name(delay),
+            durable=True,
+            arguments={
+                "x-message-ttl": int(delay * 1000),
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": QUEUE_NAME,
+            },
+        )
+    logger.info(f"Files de retry déclarées : {', '.join(map(str, RETRY_DELAYS))}s")
+
+
+async def schedule_retry(message: aio_pika.IncomingMessage, retries: int) -> bool:
+    """
+    Parks a failed message in the delay queue of its tier.
+
+    Args:
+        message (aio_pika.IncomingMessage): The failed message.
+        retries (int): Retry number, starting at 1.
+
+    Returns:
+        bool: True if the message was published to its delay queue.
+    """
+    delay = retry_tier(retries)
+    registry.counter(
+        "worker_retries_total", "Retries scheduled, by delay tier.", delay=f"{delay:g}"
+    ).inc()
+    return await republish_with_retries(
+        message,
+        retries,
+        routing_key=retry_queue_name(delay),
+        expiration=retry_expiration(delay),
+    )
@@ -1,36 +1,248 @@
 import os
+from datetime import datetime, timezone
+from typing import Optional
 
+from app.cache import ANALYSIS_FIELDS
+from app.user_stats import (
+    CONTRIBUTION_FIELDS,
+    USER_STATS_COLLECTION,
+    USER_STATS_ENABLED,
+    USER_STATS_SKIPPED,
+    UserStats,
+)
+from core.batching import MicroBatcher
 from core.logging_wrapper import LoggerFactory
+from core.metrics import stage_histogram
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteOne, ReplaceOne, WriteConcern
+from pymongo.errors import BulkWriteError, WriteError
 
 logger = LoggerFactory.get_logger(__name__)
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://mongodb:27017")
 DB_NAME = os.getenv("MONGO_DB", "text_analysis")
 COLLECTION_NAME = os.getenv("MONGO_COLLECTION", "results")
+MONGO_BATCH_SIZE = int(os.getenv("MONGO_BATCH_SIZE", "500"))
+MONGO_BATCH_DELAY = float(os.getenv("MONGO_BATCH_DELAY", "0.01"))
+MONGO_WRITE_PROFILE = os.getenv("MONGO_WRITE_PROFILE", "default")
+MONGO_LAYOUT = os.getenv("MONGO_LAYOUT", "full")
+MONGO_TTL_FIELD = os.getenv("MONGO_TTL_FIELD", "stored_at")
+MONGO_TTL_SECONDS = int(os.getenv("MONGO_TTL_SECONDS", "0"))
+
+# Profils d'acquittement des écritures : "default" garde celui du serveur
+WRITE_CONCERNS = {
+    "default": None,
+    "durable": WriteConcern(w="majority", j=True),
+    "fast": WriteConcern(w=1, j=False),
+}
+
+# Disposition compacte : seuls les champs interrogés sont stockés
+COMPACT_FIELDS = ("msg_id", "user_id", "timestamp", "content_digest") + ANALYSIS_FIELDS
+
+if MONGO_WRITE_PROFILE not in WRITE_CONCERNS:
+    raise ValueError(
+        f"Profil d'écriture inconnu : {MONGO_WRITE_PROFILE} "
+        f"(attendu : {tuple(WRITE_CONCERNS)})"
+    )
 
 client = AsyncIOMotorClient(MONGO_URL)
 db = client[DB_NAME]
-collection = db[COLLECTION_NAME]
+collection = db.get_collection(
+    COLLECTION_NAME, write_concern=WRITE_CONCERNS[MONGO_WRITE_PROFILE]
+)
+
+user_stats = (
+    UserStats(
+        db.get_collection(
+            USER_STATS_COLLECTION, write_concern=WRITE_CONCERNS[MONGO_WRITE_PROFILE]
+        )
+    )
+    if USER_STATS_ENABLED
+    else None
+)
+
+MONGO_WRITE_SECONDS = stage_histogram("mongo_write")
+
+
+def _split_waves(operations: list) -> list:
+    """
+    Splits a batch so that each `msg_id` appears at most once per wave.
+
+    An unordered `bulk_write` gives no ordering guarantee, so two operations
+    on the same document are sent in successive waves, in arrival order.
+
+    Args:
+        operations (list): `(msg_id, operation, document)` tuples, in
+            arrival order.
+
+    Returns:
+        list: Waves, each one being a list of indexes into `operations`.
+    """
+    waves = []
+    depth = {}
+    for index, (msg_id, *_) in enumerate(operations):
+        level = depth.get(msg_id, 0)
+        depth[msg_id] = level + 1
+        if level == len(waves):
+            waves.append([])
+        waves[level].append(index)
+    return waves
+
+
+async def _previous_documents(operations: list) -> Optional[dict]:
+    """
+    Reads the stored contributions of the documents a batch is about to replace.
+
+    One `$in` query for the whole batch, projected on `CONTRIBUTION_FIELDS`.
+
+    Args:
+        operations (list): `(msg_id, operation, document)` tuples.
+
+    Returns:
+        dict: Stored documents by `msg_id`, or None if they could not be read.
+    """
+    projection = {"_id": 0, "msg_id": 1, **{k: 1 for k in CONTRIBUTION_FIELDS}}
+    msg_ids = list({msg_id for msg_id, *_ in operations})
+    try:
+        cursor = collection.find({"msg_id": {"$in": msg_ids}}, projection)
+        return {document["msg_id"]: document async for document in cursor}
+    except Exception as e:
+        # Les résultats passent avant les agrégats : le lot est écrit sans eux
+        USER_STATS_SKIPPED.inc()
+        logger.warning(f"Contributions précédentes illisibles, agrégats ignorés : {e}")
+        return None
+
+
+async def _flush_operations(operations: list) -> list:
+    """
+    Sends a batch of write operations as unordered `bulk_write` calls.
+
+    With user statistics enabled, the documents being replaced are read
+    first, and every acknowledged write records its delta in `user_stats`.
+
+    Args:
+        operations (list): `(msg_id, operation, document)` tuples, `document`
+            being None for a delete.
+
+    Returns:
+        list: `None` for each successful operation, or the `WriteError`
+        raised by MongoDB for the operation that caused it.
+
+    Raises:
+        BulkWriteError: On write concern errors, which concern the whole batch.
+    """
+    results = [None] * len(operations)
+    previous = None
+    if user_stats is not None:
+        previous = await _previous_documents(operations)
+
+    for wave in _split_waves(operations):
+        try:
+            with MONGO_WRITE_SECONDS.time():
+                await collection.bulk_write(
+                    [operations[index][1] for index in wave], ordered=False
+                )
+        except BulkWriteError as e:
+            if e.details.get("writeConcernErrors"):
+                raise
+
+            for error in e.details.get("writeErrors", []):
+                results[wave[error["index"]]] = WriteError(
+                    error.get("errmsg"), error.get("code"), error
+                )
+
+        if previous is not None:
+            for index in wave:
+                if results[index] is None:
+                    msg_id, _, document = operations[index]
+                    user_stats.record(previous.get(msg_id), document)
+                    previous[msg_id] = document
+
+    return results
+
+
+writer = MicroBatcher(_flush_operations, MONGO_BATCH_SIZE, MONGO_BATCH_DELAY)
+
+
+def to_document(result: dict, layout: str = MONGO_LAYOUT) -> dict:
+    """
+    Shapes a result into the stored document.
+
+    - "full" keeps every field, text and extra fields included.
+    - "compact" keeps only `COMPACT_FIELDS`.
+
+    The TTL date field is added when MONGO_TTL_SECONDS is set.
+
+    Args:
+        result (dict): Result to be stored.
+        layout (str): Document layout, "full" or "compact".
+
+    Returns:
+        dict: Document to write.
+    """
+    if layout == "compact":
+        document = {k: result[k] for k in COMPACT_FIELDS if k in result}
+    else:
+        document = dict(result)
+    if MONGO_TTL_SECONDS:
+        document[MONGO_TTL_FIELD] = datetime.now(timezone.utc)
+    return document
 
 
 async def store_result(result: dict):
     """
     Inserts or updates a document in MongoDB.
 
+    The document is shaped by `to_document()`. The write is grouped with
+    concurrent ones and only returns once its batch has been acknowledged by
+    MongoDB.
+
     Args:
         result (dict): Result to be stored, indexed by `msg_id`.
     """
-    await collection.replace_one({"msg_id": result["msg_id"]}, result, upsert=True)
-    logger.info(f"Résultat stocké pour {result['msg_id']}")
+    msg_id = result["msg_id"]
+    document = to_document(result)
+    await writer.submit(
+        (msg_id, ReplaceOne({"msg_id": msg_id}, document, upsert=True), document)
+    )
+    logger.info(f"Résultat stocké pour {msg_id}")
 
 
 async def delete_result(document_id: str):
     """
     Deletes a document from MongoDB based on its ID.
 
+    The deletion is grouped with concurrent writes and only returns once its
+    batch has been acknowledged by MongoDB.
+
     Args:
         document_id (str): The `msg_id` identifier to delete.
     """
-    await collection.delete_one({"msg_id": document_id})
+    await writer.submit((document_id, DeleteOne({"msg_id": document_id}), None))
     logger.info(f"Résultat supprimé pour {document_id}")
+
+
+async def find_stored(msg_id: str, content_digest: str) -> bool:
+    """
+    Tells whether the stored document of `msg_id` carries a content digest.
+
+    Args:
+        msg_id (str): Message ID.
+        content_digest (str): Digest of the update content.
+
+    Returns:
+        bool: True if the document exists with this digest.
+    """
+    document = await collection.find_one(
+        {"msg_id": msg_id, "content_digest": content_digest}, projection={"_id": 1}
+    )
+    return document is not None
+
+
+async def close_storage():
+    """
+    Flushes the pending writes, then the pending user statistics, before shutdown.
+    """
+    await writer.close()
+    if user_stats is not None:
+        await user_stats.close()
@@ -0,0 +1,197 @@
+import asyncio
+import os
+
+from app import storage
+from app.consumer.shards import SHARDS_ENABLED
+from core.logging_wrapper import LoggerFactory
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = LoggerFactory.get_logger(__name__)
+
+MONGO_INDEXES = os.getenv("MONGO_INDEXES", "")
+MONGO_INIT_STRICT = os.getenv("MONGO_INIT_STRICT", "true").lower() == "true"
+
+MSG_ID_INDEX = "msg_id_unique"
+USER_ID_INDEX = "user_id_unique"
+TTL_INDEX = "ttl"
+
+# Codes MongoDB d'un index existant sous un autre nom ou d'autres options
+INDEX_CONFLICT_CODES = (85, 86)
+
+
+def parse_index_specs(value: str) -> list:
+    """
+    Parses the secondary index setting.
+
+    Indexes are separated by commas, the fields of a compound index by `+`,
+    and a field may end with `:-1` for a descending order, e.g.
+    `user_id,user_id+timestamp:-1`.
+
+    Args:
+        value (str): MONGO_INDEXES setting.
+
+    Returns:
+        list: One list of `(field, direction)` pairs per index.
+    """
+    specs = []
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        keys = []
+        for field in item.split("+"):
+            name, _, direction = field.strip().partition(":")
+            keys.append((name, DESCENDING if direction == "-1" else ASCENDING))
+        specs.append(keys)
+    return specs
+
+
+def _index_name(keys: list) -> str:
+    return "_".join(f"{name}_{direction}" for name, direction in keys)
+
+
+async def _ensure_ttl_index(collection, field: str, seconds: int):
+    try:
+        await collection.create_index(field, name=TTL_INDEX, expireAfterSeconds=seconds)
+    except OperationFailure as e:
+        if e.code not in INDEX_CONFLICT_CODES:
+            raise
+        # Index TTL existant avec un autre délai : modifié sur place
+        await collection.database.command(
+            "collMod",
+            collection.name,
+            index={"keyPattern": {field: ASCENDING}, "expireAfterSeconds": seconds},
+        )
+        logger.info(f"Délai TTL de '{field}' passé à {seconds}s")
+
+
+async def verify_indexes(collection) -> list:
+    """
+    Checks that the indexes the worker relies on exist.
+
+    Args:
+        collection: Motor collection.
+
+    Returns:
+        list: Description of each missing or wrong index, empty if all good.
+    """
+    indexes = await collection.index_information()
+    problems = []
+
+    if not any(
+        index["key"] == [("msg_id", ASCENDING)] and index.get("unique")
+        for index in indexes.values()
+    ):
+        problems.append("index unique sur msg_id absent")
+
+    for keys in parse_index_specs(MONGO_INDEXES):
+        if not any(index["key"] == keys for index in indexes.values()):
+            problems.append(f"index {_index_name(keys)} absent")
+
+    if storage.MONGO_TTL_SECONDS and not any(
+        index.get("expireAfterSeconds") == storage.MONGO_TTL_SECONDS
+        for index in indexes.values()
+    ):
+        problems.append(f"index TTL sur {storage.MONGO_TTL_FIELD} absent")
+
+    return problems
+
+
+async def init_storage(collection=None):
+    """
+    Prepares the results collection before the first write.
+
+    - Creates the unique `msg_id` index: upserts and deletes by `msg_id`
+      no longer scan the collection, and concurrent upserts cannot create
+      duplicates.
+    - Creates the secondary indexes of MONGO_INDEXES.
+    - Creates the TTL index on MONGO_TTL_FIELD when MONGO_TTL_SECONDS is
+      set, or updates its delay.
+    - Verifies the result. Creating an index that already exists is a no-op.
+
+    Args:
+        collection (optional): Motor collection. Defaults to the results
+            collection.
+
+    Raises:
+        RuntimeError: If an index is missing after initialization (e.g.
+            duplicate `msg_id` already stored) and MONGO_INIT_STRICT is set.
+    """
+    collection = collection if collection is not None else storage.collection
+
+    try:
+        await collection.create_index("msg_id", name=MSG_ID_INDEX, unique=True)
+    except OperationFailure as e:
+        # Doublons déjà présents, ou index msg_id existant non unique
+        logger.error(f"Création de l'index unique msg_id impossible : {e}")
+
+    for keys in parse_index_specs(MONGO_INDEXES):
+        await collection.create_index(keys, name=_index_name(keys))
+
+    if storage.MONGO_TTL_SECONDS:
+        await _ensure_ttl_index(
+            collection, storage.MONGO_TTL_FIELD, storage.MONGO_TTL_SECONDS
+        )
+
+    problems = await verify_indexes(collection)
+    if problems and MONGO_INIT_STRICT:
+        raise RuntimeError(f"Collection non conforme : {', '.join(problems)}")
+    for problem in problems:
+        logger.warning(f"Collection non conforme : {problem}")
+
+    logger.info(
+        f"Collection '{collection.name}' prête "
+        f"(écritures : {storage.MONGO_WRITE_PROFILE}, "
+        f"disposition : {storage.MONGO_LAYOUT})"
+    )
+
+
+async def init_user_stats(collection=None):
+    """
+    Prepares the user statistics collection.
+
+    Creates the unique `user_id` index, so that reading the statistics of a
+    user and upserting its deltas are indexed lookups. Warns when several
+    worker processes may write the same `msg_id`.
+
+    Args:
+        collection (optional): Motor collection. Defaults to the collection
+            of `storage.user_stats`.
+    """
+    if collection is None:
+        if storage.user_stats is None:
+            return
+        collection = storage.user_stats.collection
+
+    try:
+        await collection.create_index("user_id", name=USER_ID_INDEX, unique=True)
+    except OperationFailure as e:
+        logger.error(f"Création de l'index unique user_id impossible : {e}")
+        if MONGO_INIT_STRICT:
+            raise RuntimeError(f"Collection '{collection.name}' non conforme") from e
+    if int(os.getenv("WORKER_PROCESSES", "1")) > 1 and not SHARDS_ENABLED:
+        # Deux écrivains d'un même msg_id retireraient deux fois l'ancienne
+        # contribution
+        logger.warning(
+            "Statistiques utilisateur sans shards avec plusieurs processus : "
+            "elles peuvent dériver (SHARDS_ENABLED=true recommandé)"
+        )
+    logger.info(f"Collection '{collection.name}' prête")
+
+
+async def rebuild_user_stats():
+    """
+    Recomputes the user statistics from the results collection.
+
+    Run it with the workers stopped, e.g. after a crash or when
+    `worker_user_stats_skipped_batches_total` moved:
+    `python -m app.storage_init`.
+    """
+    if storage.user_stats is None:
+        logger.warning("Statistiques utilisateur désactivées (USER_STATS_ENABLED)")
+        return
+    await storage.user_stats.rebuild(storage.collection)
+    # `$out` garde les index d'une collection existante, pas d'une nouvelle
+    await init_user_stats()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_user_stats())
@@ -0,0 +1,316 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.consumer.shards import SHARD_ROUTER, SHARDS_ENABLED, child_claim
+from app.executors import EXECUTOR_WORKERS, cpu_limit
+from core.logging_wrapper import LoggerFactory
+from core.metrics import Registry, render_families, start_metrics_server
+
+logger = LoggerFactory.get_logger(__name__)
+
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+RESTART_DELAY = float(os.getenv("RESTART_DELAY", "1"))
+MAX_RESTART_DELAY = float(os.getenv("MAX_RESTART_DELAY", "30"))
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "120"))
+STATS_INTERVAL = float(os.getenv("STATS_INTERVAL", "5"))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+
+def merge_families(snapshots: List[list]) -> list:
+    """
+    Sums the metric families collected in several processes.
+
+    Samples with the same name and labels are added together: counters and
+    histograms become totals, gauges become the sum over the children.
+
+    Args:
+        snapshots (list): One `Registry.collect()` result per child.
+
+    Returns:
+        list: Merged `(name, type, help, samples)` families, sorted by name.
+    """
+    families: Dict[str, tuple] = {}
+    values: Dict[str, Dict[tuple, float]] = {}
+
+    for snapshot in snapshots:
+        for name, type_, help_, samples in snapshot:
+            families.setdefault(name, (type_, help_))
+            family_values = values.setdefault(name, {})
+            for sample, labels, value in samples:
+                key = (sample, tuple(sorted(labels.items())))
+                family_values[key] = family_values.get(key, 0) + value
+
+    return [
+        (
+            name,
+            families[name][0],
+            families[name][1],
+            [(sample, dict(labels), v) for (sample, labels), v in values[name].items()],
+        )
+        for name in sorted(families)
+    ]
+
+
+class _Child:
+    __slots__ = ("index", "process", "restarts", "next_start", "stats", "finished")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.restarts = 0
+        self.next_start = 0.0
+        self.stats = []
+        self.finished = False
+
+
+class Supervisor:
+    """
+    Runs N consumer processes and keeps them alive.
+
+    - Each child gets its own event loop, AMQP connection, Mongo client and a
+      share of the analysis executor (`EXECUTOR_WORKERS / N` processes).
+    - SIGTERM/SIGINT are forwarded to every child as SIGTERM, so that each one
+      drains its active tasks; children still alive after `shutdown_timeout`
+      are killed.
+    - A child exiting with an error outside of a shutdown is restarted, with
+      an exponential backoff if it keeps crashing. A child exiting cleanly
+      (code 0), e.g. at the end of its source, stays stopped; the supervisor
+      stops once every child has.
+    - Children push their metrics periodically; the supervisor serves the sum
+      on the metrics port, plus per-child liveness and restart counters.
+
+    Attributes:
+        processes (int): Number of children.
+    """
+
+    def __init__(
+        self,
+        target: Callable,
+        processes: int = WORKER_PROCESSES,
+        executor_workers: int = EXECUTOR_WORKERS or None,
+        restart_delay: float = RESTART_DELAY,
+        shutdown_timeout: float = SHUTDOWN_TIMEOUT,
+        metrics_port: int = METRICS_PORT,
+        context=None,
+    ):
+        """
+        Initializes the supervisor.
+
+        Args:
+            target (callable): Picklable function run by each child, called
+                with the stats queue.
+            processes (int): Number of children.
+            executor_workers (int, optional): Executor processes shared by the
+                children. Defaults to the CPU limit of the container.
+            restart_delay (float): Initial delay before restarting a child.
+            shutdown_timeout (float): Grace period of the children on shutdown.
+            metrics_port (int): Port of the aggregated metrics (0 disables).
+            context: Multiprocessing context. Defaults to "spawn".
+        """
+        self.processes = max(1, processes)
+        self._target = target
+        self._executor_share = max(
+            1, (executor_workers or cpu_limit()) // self.processes
+        )
+        self._restart_delay = restart_delay
+        self._shutdown_timeout = shutdown_timeout
+        self._metrics_port = metrics_port
+        self._context = context or multiprocessing.get_context("spawn")
+        self._stats_queue = self._context.Queue()
+        self._children = [_Child(i) for i in range(self.processes)]
+        self._stopping = asyncio.Event()
+        self._registry = Registry()
+
+        for child in self._children:
+            labels = {"child": str(child.index)}
+            self._registry.gauge(
+                "worker_child_up",
+                "1 if the child process is alive.",
+                fn=lambda c=child: int(bool(c.process and c.process.is_alive())),
+                **labels,
+            )
+            self._registry.counter(
+                "worker_child_restarts_total",
+                "Restarts of the child process.",
+                fn=lambda c=child: c.restarts,
+                **labels,
+            )
+
+    def render(self) -> str:
+        """
+        Renders the aggregated metrics of the children and the supervisor.
+
+        Returns:
+            str: Prometheus exposition text.
+        """
+        merged = merge_families([c.stats for c in self._children if c.stats])
+        return render_families(merged + self._registry.collect())
+
+    def stop(self):
+        """
+        Requests a graceful shutdown of every child.
+        """
+        self._stopping.set()
+
+    def _start(self, child: _Child):
+        overrides = {
+            "WORKER_INDEX": str(child.index),
+            "EXECUTOR_WORKERS": str(self._executor_share),
+            "METRICS_PORT": "0",
+            "LOG_FILE": _child_log_file(child.index),
+        }
+        cache_path = _child_cache_path(child.index)
+        if cache_path is not None:
+            overrides["CACHE_PATH"] = cache_path
+        if SHARDS_ENABLED:
+            # Chaque enfant consomme ses shards ; seul le premier route
+            overrides["SHARD_CLAIM"] = child_claim(child.index, self.processes)
+            overrides["SHARD_ROUTER"] = str(SHARD_ROUTER and child.index == 0).lower()
+        previous = {key: os.environ.get(key) for key in overrides}
+        os.environ.update(overrides)
+        try:
+            child.process = self._context.Process(
+                target=self._target,
+                args=(self._stats_queue,),
+                name=f"worker-{child.index}",
+            )
+            child.process.start()
+        finally:
+            for key, value in previous.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+        logger.info(f"Processus worker-{child.index} démarré (pid {child.process.pid})")
+
+    def _drain_stats(self):
+        while True:
+            try:
+                index, stats = self._stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            self._children[index].stats = stats
+
+    def _check_children(self):
+        now = time.monotonic()
+        for child in self._children:
+            process = child.process
+            if child.finished or (process is not None and process.is_alive()):
+                continue
+
+            if process is not None and process.exitcode == 0:
+                child.finished = True
+                child.process = None
+                logger.info(f"worker-{child.index} terminé, non redémarré")
+                process.close()
+            elif process is not None:
+                child.restarts += 1
+                delay = min(
+                    MAX_RESTART_DELAY,
+                    self._restart_delay * 2 ** min(child.restarts - 1, 10),
+                )
+                child.next_start = now + delay
+                child.process = None
+                logger.error(
+                    f"worker-{child.index} arrêté (code {process.exitcode}), "
+                    f"redémarrage dans {delay:.1f}s"
+                )
+                process.close()
+            elif now >= child.next_start:
+                self._start(child)
+
+    async def _shutdown_children(self):
+        alive = [
+            c.process for c in self._children if c.process and c.process.is_alive()
+        ]
+        for process in alive:
+            process.terminate()
+
+        deadline = time.monotonic() + self._shutdown_timeout
+        while any(p.is_alive() for p in alive) and time.monotonic() < deadline:
+            self._drain_stats()
+            await asyncio.sleep(0.2)
+
+        for process in alive:
+            if process.is_alive():
+                logger.warning(f"{process.name} ne répond pas, arrêt forcé")
+                process.kill()
+            process.join()
+        self._drain_stats()
+
+    async def run(self):
+        """
+        Starts the children and supervises them until `stop()` is called, or
+        until every child has exited cleanly.
+        """
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+
+        server = None
+        if self._metrics_port:
+            server = await start_metrics_server(
+                METRICS_HOST, self._metrics_port, self.render
+            )
+
+        logger.info(f"Superviseur : {self.processes} processus worker")
+        for child in self._children:
+            self._start(child)
+
+        while not self._stopping.is_set():
+            self._drain_stats()
+            self._check_children()
+            if all(child.finished for child in self._children):
+                logger.info("Tous les processus worker ont terminé.")
+                break
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                pass
+
+        logger.info("Signal reçu. Arrêt des processus worker..")
+        await self._shutdown_children()
+        if server is not None:
+            server.close()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        logger.info("Superviseur arrêté.")
+
+
+def _child_log_file(index: int) -> str:
+    root, ext = os.path.splitext(os.getenv("LOG_FILE", "logs/worker.log"))
+    return f"{root}-{index}{ext}"
+
+
+def _child_cache_path(index: int) -> Optional[str]:
+    # Un fichier SQLite par enfant : un fichier partagé se verrouille entre écrivains
+    path = os.getenv("CACHE_PATH")
+    if not path:
+        return None
+    root, ext = os.path.splitext(path)
+    return f"{root}-{index}{ext}"
+
+
+async def push_stats(stats_queue, collect: Callable[[], list], interval: float):
+    """
+    Periodically sends the metrics of a child to its supervisor.
+
+    Args:
+        stats_queue: Queue shared with the supervisor.
+        collect (callable): Returns the families to send.
+        interval (float): Seconds between two pushes.
+    """
+    index = int(os.getenv("WORKER_INDEX", "0"))
+    while True:
+        try:
+            stats_queue.put_nowait((index, collect()))
+        except queue.Full:
+            pass
+        await asyncio.sleep(interval)
@@ -0,0 +1,254 @@
+import asyncio
+import os
+from typing import Optional
+
+from core.logging_wrapper import LoggerFactory
+from core.metrics import registry, stage_histogram
+from pymongo import UpdateOne
+
+logger = LoggerFactory.get_logger(__name__)
+
+# Coûte une lecture par lot d'écritures et suppose un seul écrivain par msg_id
+USER_STATS_ENABLED = os.getenv("USER_STATS_ENABLED", "false").lower() == "true"
+USER_STATS_COLLECTION = os.getenv("USER_STATS_COLLECTION", "user_stats")
+USER_STATS_INTERVAL = float(os.getenv("USER_STATS_INTERVAL", "1"))
+USER_STATS_MAX_USERS = int(os.getenv("USER_STATS_MAX_USERS", "1000"))
+
+# Champs d'un résultat stocké qui contribuent aux agrégats
+CONTRIBUTION_FIELDS = ("user_id", "score", "timestamp")
+
+USER_STATS_FLUSH_SECONDS = stage_histogram("user_stats_flush")
+USER_STATS_SKIPPED = registry.counter(
+    "worker_user_stats_skipped_batches_total",
+    "Write batches whose previous contributions could not be read.",
+)
+
+
+def contribution(document: Optional[dict]) -> Optional[tuple]:
+    """
+    Returns what a stored result contributes to the aggregates of its user.
+
+    Args:
+        document (dict, optional): Stored document, or None if there is none.
+
+    Returns:
+        tuple: `(user_id, score, timestamp)`, or None without document or
+        `user_id`.
+    """
+    if not document or document.get("user_id") is None:
+        return None
+    return document["user_id"], document.get("score"), document.get("timestamp")
+
+
+class UserStats:
+    """
+    Per-user aggregates of the stored results, maintained by deltas.
+
+    - Every acknowledged write records a delta: the previous document of its
+      `msg_id` is taken off the aggregates of its user, the new one (if any)
+      is added, so overwrites and deletes reverse the old contribution.
+    - Deltas are combined in memory per user and flushed every `interval`
+      seconds, or once `max_users` users are pending, as one unordered
+      `bulk_write` of `$inc`/`$max` upserts: one update per user and flush,
+      whatever the number of results written.
+    - A user document holds `count`, `score_sum`, `scored` (results with a
+      score) and `last_activity` (latest result timestamp), so reading the
+      statistics of a user is a single indexed lookup.
+    - The previous document is read before the write, not atomically with
+      it: each `msg_id` must have a single writer (one worker process, or
+      shards). Drift from lost or skipped deltas is repaired by `rebuild`.
+
+    Attributes:
+        collection: Motor collection of the aggregates.
+        interval (float): Maximum time (seconds) a delta waits in memory.
+        max_users (int): Pending users triggering an early flush.
+    """
+
+    def __init__(
+        self,
+        collection,
+        interval: float = USER_STATS_INTERVAL,
+        max_users: int = USER_STATS_MAX_USERS,
+    ):
+        self.collection = collection
+        self.interval = interval
+        self.max_users = max(1, max_users)
+        self._deltas = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight = set()
+        self._lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of users with deltas waiting to be flushed."""
+        return len(self._deltas)
+
+    def record(self, previous: Optional[dict], current: Optional[dict]):
+        """
+        Records the replacement of a stored document.
+
+        Args:
+            previous (dict, optional): Document stored before the write.
+            current (dict, optional): Document written, None for a delete.
+        """
+        old, new = contribution(previous), contribution(current)
+        if old == new:
+            return
+        if old is not None:
+            self._add(old, -1)
+        if new is not None:
+            self._add(new, +1)
+        self._schedule()
+
+    def _add(self, item: tuple, sign: int):
+        user_id, score, timestamp = item
+        delta = self._deltas.setdefault(user_id, [0, 0, 0, None])
+        delta[0] += sign
+        if isinstance(score, (int, float)):
+            delta[1] += sign * score
+            delta[2] += sign
+        # L'activité ne recule pas : seul un ajout la fait avancer
+        if sign > 0 and timestamp is not None:
+            delta[3] = timestamp if delta[3] is None else max(delta[3], timestamp)
+
+    def _merge(self, deltas: dict):
+        for user_id, (count, score_sum, scored, last) in deltas.items():
+            delta = self._deltas.setdefault(user_id, [0, 0, 0, None])
+            delta[0] += count
+            delta[1] += score_sum
+            delta[2] += scored
+            if last is not None:
+                delta[3] = last if delta[3] is None else max(delta[3], last)
+
+    def _schedule(self):
+        if len(self._deltas) >= self.max_users:
+            self._start_flush()
+        elif self._timer is None and self._deltas:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.interval, self._start_flush)
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    @staticmethod
+    def _update(user_id, count, score_sum, scored, last) -> Optional[UpdateOne]:
+        increments = {
+            field: value
+            for field, value in (
+                ("count", count),
+                ("score_sum", score_sum),
+                ("scored", scored),
+            )
+            if value
+        }
+        update = {}
+        if increments:
+            update["$inc"] = increments
+        if last is not None:
+            update["$max"] = {"last_activity": last}
+        if not update:
+            return None
+        return UpdateOne({"user_id": user_id}, update, upsert=True)
+
+    async def flush(self):
+        """
+        Writes the pending deltas. On failure they are kept for the next flush.
+        """
+        async with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            requests = [
+                request
+                for request in (
+                    self._update(user_id, *delta) for user_id, delta in deltas.items()
+                )
+                if request is not None
+            ]
+            if not requests:
+                return
+            try:
+                with USER_STATS_FLUSH_SECONDS.time():
+                    await self.collection.bulk_write(requests, ordered=False)
+            except Exception as e:
+                # Deltas remis en attente : ils seront renvoyés au prochain flush
+                self._merge(deltas)
+                logger.warning(f"Écriture des statistiques utilisateur échouée : {e}")
+                self._schedule()
+                return
+        logger.debug(f"Statistiques de {len(requests)} utilisateurs mises à jour")
+
+    async def close(self):
+        """
+        Flushes the pending deltas and waits for every running flush.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        await self.flush()
+
+    async def rebuild(self, results) -> int:
+        """
+        Recomputes every user document from the results collection.
+
+        Replaces the aggregates with one `$group` over `results`, written
+        with `$out`; the pending deltas are dropped, as the results already
+        include them. Meant to run while the workers are stopped: a write
+        during the rebuild may be counted twice or not at all.
+
+        Args:
+            results: Motor collection of the stored results.
+
+        Returns:
+            int: Number of user documents written.
+        """
+        is_number = {"$isNumber": "$score"}
+        pipeline = [
+            {"$match": {"user_id": {"$ne": None}}},
+            {
+                "$group": {
+                    "_id": "$user_id",
+                    "count": {"$sum": 1},
+                    "score_sum": {"$sum": {"$cond": [is_number, "$score", 0]}},
+                    "scored": {"$sum": {"$cond": [is_number, 1, 0]}},
+                    "last_activity": {"$max": "$timestamp"},
+                }
+            },
+            {"$set": {"user_id": "$_id"}},
+            {"$unset": "_id"},
+            {"$out": self.collection.name},
+        ]
+        async with self._lock:
+            self._deltas = {}
+            async for _ in results.aggregate(pipeline):
+                pass
+        users = await self.collection.count_documents({})
+        logger.info(f"Statistiques utilisateur reconstruites ({users} utilisateurs)")
+        return users
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        """
+        Returns the statistics of a user.
+
+        Args:
+            user_id (str): User ID.
+
+        Returns:
+            dict: `count`, `average_score` and `last_activity`, or None if
+            the user has no stored result.
+        """
+        document = await self.collection.find_one({"user_id": user_id})
+        if not document or document.get("count", 0) <= 0:
+            return None
+        scored = document.get("scored", 0)
+        return {
+            "user_id": user_id,
+            "count": document["count"],
+            "average_score": document.get("score_sum", 0) / scored if scored else None,
+            "last_activity": document.get("last_activity"),
+        }
@@ -0,0 +1,81 @@
+"""
+Microbenchmark of the message decoding path.
+
+Compares the previous path (`json.loads` + dict scanning in `MessageData`)
+with `decode_message`.
+
+Usage (from `worker/`):
+    python -m benchmarks.bench_decode [--count 100000]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from app.models.decoder import DECODER_BACKEND, decode_message
+
+
+class LegacyMessageData:
+    __slots__ = ("msg_id", "user_id", "text", "type", "timestamp", "_extra")
+
+    def __init__(self, raw_dict: dict):
+        self.msg_id = raw_dict["msg_id"]
+        self.user_id = raw_dict.get("user_id")
+        self.text = raw_dict.get("text")
+        self.type = raw_dict["type"]
+        self.timestamp = raw_dict.get("timestamp")
+        known_keys = {"msg_id", "user_id", "text", "type", "timestamp"}
+        self._extra = {k: v for k, v in raw_dict.items() if k not in known_keys}
+
+
+def make_bodies(count: int) -> list:
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+    bodies = []
+    for i in range(count):
+        msg = {"msg_id": f"msg_{i}", "type": "update" if i % 4 else "delete"}
+        if msg["type"] == "update":
+            msg.update(
+                {
+                    "user_id": f"u_{random.randint(1, 2_499_999)}",
+                    "text": " ".join(random.choices(words, k=random.randint(3, 25))),
+                    "timestamp": "2025-07-06T13:35:15.598473",
+                }
+            )
+        if i % 10 == 0:
+            msg["source"] = "mobile"
+        bodies.append(json.dumps(msg).encode())
+    return bodies
+
+
+def bench(name: str, func, bodies: list, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(bodies)
+        best = min(best, time.perf_counter() - start)
+    per_message = best / len(bodies) * 1e9
+    print(f"{name:<32} {len(bodies) / best:>12,.0f} msg/s {per_message:>8.0f} ns/msg")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    bodies = make_bodies(args.count)
+    print(f"Décodeur : {DECODER_BACKEND}, {args.count} messages")
+
+    legacy = bench(
+        "json.loads + MessageData (avant)",
+        lambda bs: [LegacyMessageData(json.loads(b)) for b in bs],
+        bodies,
+    )
+    single = bench("decode_message", lambda bs: [decode_message(b) for b in bs], bodies)
+
+    print(f"Gain decode_message : x{legacy / single:.2f}")
+
+
+if __name__ == "__main__":
+    main()
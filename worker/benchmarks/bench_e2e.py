@@ -0,0 +1,348 @@
+"""
+End-to-end throughput benchmark of the worker, without RabbitMQ nor MongoDB.
+
+Runs the real `consume_messages` -> `handle_message` -> `process_message` ->
+`store_result` / `publish_result` path against the in-memory stand-ins of
+`benchmarks.fakes`, for a set of scenarios. Each scenario publishes its
+messages at once and reports messages/s, the p50/p95/p99 end-to-end latency
+(publication to final ack or dead-lettering) and the peak RSS.
+
+Every scenario runs `--runs` times and reports the median of each metric,
+with the spread of the runs (`(max - min) / median`) as its noise.
+
+Usage (from `worker/`):
+    python -m benchmarks.bench_e2e [--scenarios baseline hot_keys] [--check]
+    python -m benchmarks.bench_e2e --save    # records the current baseline
+
+`--check` exits with status 1 if a scenario's throughput is below the stored
+baseline, or its p99 latency above it, by more than `--tolerance` plus the
+noise of both measures. The figures depend on the machine: the baseline is
+not versioned and must be recorded with `--save` on the machine that runs
+`--check`, before the change being measured.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from benchmarks.fakes import FakeBroker, FakeCollection
+
+BASELINE_PATH = Path(__file__).with_name("baseline_e2e.json")
+
+WORDS = (
+    "good bad great terrible happy sad the and of bonjour merci mauvais "
+    "service product delivery quality price support order refund"
+).split()
+
+SCENARIOS = {
+    "baseline": {"messages": 5000, "mongo_latency": 0.001},
+    "slow_mongo": {"messages": 5000, "mongo_latency": 0.02},
+    "hot_keys": {"messages": 5000, "mongo_latency": 0.001, "keys": 50},
+    "io_wait": {"messages": 5000, "mongo_latency": 0.001, "io_delay": 0.05},
+    "flaky_mongo": {"messages": 2000, "mongo_latency": 0.001, "failure_rate": 0.05},
+}
+
+DEFAULTS = {
+    "update_ratio": 0.7,
+    "keys": None,
+    "io_delay": 0.0,
+    "failure_rate": 0.0,
+    "concurrency": 256,
+}
+
+# Métriques comparées à la référence, et leur bruit
+COMPARED = ("msgs_per_s", "p99_ms")
+# Écart médian absolu -> écart-type d'une loi normale
+MAD_TO_STDEV = 1.4826
+NOISE_SIGMAS = 2
+
+# Configuration du worker, appliquée avant l'import de `app`
+WORKER_ENV = {
+    "AMQP_URL": "amqp://bench/",
+    "QUEUE_NAME": "incoming_texts",
+    "OUTPUT_QUEUE": "processed_texts",
+    "MAX_RETRIES": "5",
+    "MAX_CONCURRENT_TASKS": "256",
+    "RETRY_DELAYS": "0.05,0.1,0.2",
+    "CACHE_ENABLED": "false",
+    "LOG_FILE": os.devnull,
+    "LOG_LEVEL": "WARNING",
+}
+
+
+def load_worker():
+    """
+    Imports the worker modules with the benchmark configuration.
+
+    Returns:
+        dict: The imported modules, by name.
+    """
+    for key, value in WORKER_ENV.items():
+        os.environ.setdefault(key, value)
+
+    from app import consumer, executors, processing, publisher, storage
+
+    return {
+        "consumer": consumer,
+        "executors": executors,
+        "processing": processing,
+        "publisher": publisher,
+        "storage": storage,
+    }
+
+
+def make_bodies(count: int, update_ratio: float, keys: int = None) -> list:
+    bodies = []
+    for i in range(count):
+        msg_id = f"msg_{random.randrange(keys) if keys else i}"
+        if random.random() < update_ratio:
+            msg = {
+                "msg_id": msg_id,
+                "type": "update",
+                "user_id": f"u_{random.randint(1, 2_499_999)}",
+                "text": " ".join(random.choices(WORDS, k=random.randint(3, 200))),
+                "timestamp": "2025-07-06T13:35:15.598473",
+            }
+        else:
+            msg = {"msg_id": msg_id, "type": "delete"}
+        bodies.append(json.dumps(msg).encode())
+    return bodies
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss est en Ko sous Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_pipeline(processing, io_delay: float) -> tuple:
+    async def io_wait(data):
+        await asyncio.sleep(io_delay)
+        return {"duration": io_delay}
+
+    analysis = processing.Stage(
+        "analysis", processing.analyze_messages, processing.CPU_BOUND, batched=True
+    )
+    if not io_delay:
+        return (analysis,)
+    return (processing.Stage("io_wait", io_wait, processing.IO_BOUND), analysis)
+
+
+async def run_scenario(worker: dict, name: str, config: dict) -> dict:
+    import aio_pika
+
+    consumer, processing = worker["consumer"], worker["processing"]
+    config = {**DEFAULTS, **config}
+
+    broker = FakeBroker(terminal={"failed_texts", worker["publisher"].OUTPUT_QUEUE})
+    collection = FakeCollection(config["mongo_latency"], config["failure_rate"])
+    storage = worker["storage"]
+    user_stats = None
+    if storage.user_stats is not None:
+        user_stats = storage.UserStats(
+            FakeCollection(config["mongo_latency"], key="user_id")
+        )
+    bodies = make_bodies(config["messages"], config["update_ratio"], config["keys"])
+    consumer.semaphore.set_limit(config["concurrency"])
+
+    with patch("aio_pika.connect_robust", broker.connect), patch.object(
+        storage, "collection", collection
+    ), patch.object(storage, "user_stats", user_stats), patch.object(
+        processing, "ANALYSIS_PIPELINE", make_pipeline(processing, config["io_delay"])
+    ):
+        consuming = asyncio.create_task(consumer.consume_messages())
+        queue = None
+        while queue is None or not queue.consumed:
+            await asyncio.sleep(0.01)
+            queue = broker.queues.get(consumer.QUEUE_NAME)
+
+        start = time.perf_counter()
+        for body in bodies:
+            broker.publish(aio_pika.Message(body, headers={}), consumer.QUEUE_NAME)
+        await broker.wait_done(len(bodies))
+        elapsed = time.perf_counter() - start
+
+        consuming.cancel()
+        await asyncio.gather(consuming, return_exceptions=True)
+        await asyncio.gather(*consumer.active_tasks, return_exceptions=True)
+        await storage.close_storage()
+        await worker["publisher"].publisher.close()
+
+    latencies = broker.latencies
+    return {
+        "messages": len(bodies),
+        "msgs_per_s": round(len(bodies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "mongo_calls": collection.calls,
+        "dead_lettered": broker.settled["dead_letter"],
+    }
+
+
+def summarize(runs: list) -> dict:
+    """
+    Combines the runs of a scenario into their medians and noise.
+
+    The noise of a metric is its median absolute deviation, scaled to a
+    standard deviation and relative to the median: unlike the range, one
+    outlier run does not inflate it.
+
+    Args:
+        runs (list): Results of `run_scenario`, one per run.
+
+    Returns:
+        dict: Median of each metric, the number of runs and, under `noise`,
+        the relative deviation of the compared metrics.
+    """
+    summary = {
+        key: round(statistics.median(run[key] for run in runs), 2) for key in runs[0]
+    }
+    summary["runs"] = len(runs)
+    summary["noise"] = {}
+    for key in COMPARED:
+        values = [run[key] for run in runs]
+        median = statistics.median(values)
+        deviation = statistics.median(abs(value - median) for value in values)
+        summary["noise"][key] = (
+            round(MAD_TO_STDEV * deviation / median, 3) if median else 0.0
+        )
+    return summary
+
+
+def machine() -> dict:
+    """
+    Describes the machine the figures were measured on.
+    """
+    return {
+        "host": platform.node(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def compare(name: str, result: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns the regressions of a scenario against its baseline.
+
+    A metric regresses when it is worse than the baseline by more than
+    `tolerance` plus `NOISE_SIGMAS` times the combined noise of the baseline
+    and of the result, so that a noisy scenario needs a larger gap to fail.
+    """
+    reference = baseline.get(name)
+    if reference is None:
+        return []
+
+    def margin(key: str) -> float:
+        noise = math.hypot(
+            reference.get("noise", {}).get(key, 0.0),
+            result.get("noise", {}).get(key, 0.0),
+        )
+        return tolerance + NOISE_SIGMAS * noise
+
+    failures = []
+    if result["msgs_per_s"] < reference["msgs_per_s"] * (1 - margin("msgs_per_s")):
+        failures.append(
+            f"{name}: {result['msgs_per_s']} msg/s < {reference['msgs_per_s']} msg/s "
+            f"(marge {margin('msgs_per_s'):.0%})"
+        )
+    if result["p99_ms"] > reference["p99_ms"] * (1 + margin("p99_ms")):
+        failures.append(
+            f"{name}: p99 {result['p99_ms']} ms > {reference['p99_ms']} ms "
+            f"(marge {margin('p99_ms'):.0%})"
+        )
+    return failures
+
+
+async def run(args) -> dict:
+    worker = load_worker()
+    await worker["executors"].start_executor()
+    # Préchauffe l'exécuteur et les imports hors mesure
+    await run_scenario(worker, "warmup", {"messages": 200, "mongo_latency": 0})
+
+    results = {}
+    print(
+        f"{'scénario':<12} {'msg/s':>10} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'RSS Mo':>8} {'bruit':>6}"
+    )
+    for name in args.scenarios:
+        runs = [
+            await run_scenario(worker, name, SCENARIOS[name])
+            for _ in range(max(1, args.runs))
+        ]
+        result = results[name] = summarize(runs)
+        noise = max(result["noise"].values())
+        print(
+            f"{name:<12} {result['msgs_per_s']:>10,.0f} {result['p50_ms']:>9.1f} "
+            f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+            f"{result['peak_rss_mb']:>8.1f} {noise:>6.0%}"
+        )
+
+    worker["executors"].shutdown_executor()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS)
+    )
+    parser.add_argument("--save", action="store_true", help="record the baseline")
+    parser.add_argument("--check", action="store_true", help="compare to baseline")
+    parser.add_argument("--runs", type=int, default=5, help="runs per scenario")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.save:
+        baseline = (
+            json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        )
+        baseline.update(results)
+        baseline["machine"] = machine()
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Référence enregistrée : {args.baseline}")
+
+    if args.check:
+        if not args.baseline.exists():
+            print(
+                f"Aucune référence : lancer --save sur cette machine ({args.baseline})"
+            )
+            sys.exit(2)
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("machine") != machine():
+            print(
+                "ATTENTION : référence mesurée sur une autre machine, à réenregistrer"
+            )
+        failures = [
+            failure
+            for name, result in results.items()
+            for failure in compare(name, result, baseline, args.tolerance)
+        ]
+        for failure in failures:
+            print(f"RÉGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+        print("Aucune régression.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark of the analysis execution backends.
+
+Runs the same workload (the CPU-bound analysis stage of the pipeline, fed by
+concurrent messages) through each backend of `app.executors`.
+
+Usage (from `worker/`):
+    python -m benchmarks.bench_executors [--count 20000] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from app.executors import BACKENDS, create_executor, warm_up
+from app.models.message_data import MessageData
+from app.processing import CPU_BOUND, Stage, analyze_messages, run_pipeline
+
+WORDS = (
+    "good bad great terrible happy sad the and of bonjour merci mauvais "
+    "service product delivery quality price support order refund"
+).split()
+
+STAGES = (Stage("analysis", analyze_messages, CPU_BOUND, batched=True),)
+
+
+def make_messages(count: int) -> list:
+    return [
+        MessageData(
+            {
+                "msg_id": f"msg_{i}",
+                "type": "update",
+                "text": " ".join(random.choices(WORDS, k=random.randint(20, 200))),
+            }
+        )
+        for i in range(count)
+    ]
+
+
+async def bench(backend: str, workers: int, messages: list) -> float:
+    pool = create_executor(backend, workers)
+    try:
+        await warm_up(pool)
+        start = time.perf_counter()
+        await asyncio.gather(*(run_pipeline(data, STAGES, pool) for data in messages))
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+    print(f"{backend:<10} {len(messages) / elapsed:>12,.0f} msg/s {elapsed:>8.2f} s")
+    return elapsed
+
+
+async def run(args):
+    messages = make_messages(args.count)
+    print(f"{args.count} messages, {args.workers} workers")
+    for backend in args.backends:
+        await bench(backend, args.workers, messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark of the MongoDB write latency against the collection size.
+
+Grows a scratch collection step by step and, at each size, times batches of
+`msg_id` upserts and deletes, as `app.storage` sends them. Each variant runs
+on its own collection:
+
+- `bare`: no index, full documents, server write concern (the former setup).
+- `indexed`: unique `msg_id` index from `init_storage()`.
+- `compact`: index, compact layout and the `fast` write profile.
+
+Needs a running MongoDB (MONGO_URL); the scratch collections are dropped.
+
+Usage (from `worker/`):
+    python -m benchmarks.bench_storage [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from app import storage
+from app.storage_init import init_storage
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteOne, InsertOne, ReplaceOne
+
+VARIANTS = ("bare", "indexed", "compact")
+
+WORDS = (
+    "good bad great terrible happy sad the and of bonjour merci mauvais "
+    "service product delivery quality price support order refund"
+).split()
+
+
+def make_result(i: int) -> dict:
+    return {
+        "msg_id": f"msg_{i}",
+        "user_id": f"u_{random.randint(1, 100_000)}",
+        "text": " ".join(random.choices(WORDS, k=random.randint(20, 400))),
+        "timestamp": "2025-07-06T13:35:15.598473",
+        "token_count": 120,
+        "char_count": 700,
+        "sentiment": "positive",
+        "score": 0.42,
+        "keywords": ["service", "price", "quality"],
+        "language": "en",
+        "source": "bench",
+        "campaign": "bench",
+    }
+
+
+async def grow(collection, layout: str, start: int, end: int, chunk: int = 10_000):
+    for first in range(start, end, chunk):
+        await collection.bulk_write(
+            [
+                InsertOne(storage.to_document(make_result(i), layout))
+                for i in range(first, min(first + chunk, end))
+            ],
+            ordered=False,
+        )
+
+
+async def time_writes(collection, layout: str, size: int, batches: int, batch: int):
+    """
+    Returns the median and p95 latency (ms) of mixed upsert/delete batches.
+    """
+    latencies = []
+    for _ in range(batches):
+        requests = []
+        for i in random.sample(range(size), batch):
+            if random.random() < 0.75:
+                document = storage.to_document(make_result(i), layout)
+                requests.append(
+                    ReplaceOne({"msg_id": f"msg_{i}"}, document, upsert=True)
+                )
+            else:
+                requests.append(DeleteOne({"msg_id": f"msg_{i}"}))
+        start = time.perf_counter()
+        await collection.bulk_write(requests, ordered=False)
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    return (
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.95)] * 1000,
+    )
+
+
+async def run(args):
+    client = AsyncIOMotorClient(storage.MONGO_URL)
+    db = client[args.database]
+    collections = {
+        "bare": db["bench_bare"],
+        "indexed": db["bench_indexed"],
+        "compact": db.get_collection(
+            "bench_compact", write_concern=storage.WRITE_CONCERNS["fast"]
+        ),
+    }
+    layouts = {"bare": "full", "indexed": "full", "compact": "compact"}
+
+    for collection in collections.values():
+        await collection.drop()
+    await init_storage(collections["indexed"])
+    await init_storage(collections["compact"])
+
+    print(f"Lots de {args.batch} écritures, {args.batches} lots par mesure")
+    print(f"{'taille':>10} " + " ".join(f"{v + ' p50/p95 ms':>22}" for v in VARIANTS))
+    size = 0
+    for target in sorted(args.sizes):
+        for variant, collection in collections.items():
+            await grow(collection, layouts[variant], size, target)
+        size = target
+
+        cells = []
+        for variant, collection in collections.items():
+            p50, p95 = await time_writes(
+                collection, layouts[variant], size, args.batches, args.batch
+            )
+            cells.append(f"{p50:>10.1f} / {p95:>9.1f}")
+        print(f"{size:>10,} " + " ".join(f"{cell:>22}" for cell in cells))
+
+    if not args.keep:
+        for collection in collections.values():
+            await collection.drop()
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--batch", type=int, default=500, help="writes per batch")
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--database", default=os.getenv("MONGO_DB", "text_analysis"))
+    parser.add_argument("--keep", action="store_true", help="keep the collections")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
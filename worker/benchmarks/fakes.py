@@ -0,0 +1,331 @@
+"""
+In-memory stand-ins for RabbitMQ and MongoDB, used by the benchmarks.
+
+They implement the subset of the aio-pika and motor APIs the worker uses, so
+the real consumer, storage and publisher code runs unchanged:
+
+- `FakeBroker`: queues, default and direct exchanges, ack/nack, headers,
+  dead-lettering (`x-dead-letter-*`), queue TTL and per-message expiration.
+- `FakeCollection`: `bulk_write` of `ReplaceOne`/`DeleteOne` and of the
+  `$inc`/`$max` upserts of the user statistics, `find` by `$in` and
+  `find_one`, with an injected latency and failure rate.
+"""
+
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Optional
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from pymongo.errors import AutoReconnect
+
+TRACE_HEADER = "x-bench-id"
+
+
+class FakeIncomingMessage:
+    """
+    Delivery of the fake broker, with the `aio_pika.IncomingMessage` API.
+    """
+
+    def __init__(self, broker, queue, message, routing_key: str):
+        self._broker = broker
+        self._queue = queue
+        self.message = message
+        self.body = message.body
+        self.headers = dict(message.headers or {})
+        self.routing_key = routing_key
+        self.redelivered = False
+        self.processed = False
+
+    async def ack(self):
+        self._settle()
+        self._broker.settled["ack"] += 1
+        self._broker.track(self.message, -1)
+
+    async def nack(self, requeue: bool = True):
+        self._settle()
+        if requeue:
+            self._broker.settled["requeue"] += 1
+            self._queue.put(self.message, self.routing_key, redelivered=True)
+        else:
+            self._broker.settled["dead_letter"] += 1
+            self._queue.dead_letter(self.message, self.routing_key)
+            self._broker.track(self.message, -1)
+
+    async def reject(self, requeue: bool = False):
+        await self.nack(requeue=requeue)
+
+    def _settle(self):
+        if self.processed:
+            raise RuntimeError("Message déjà acquitté")
+        self.processed = True
+
+
+class FakeQueue:
+    """
+    Queue of the fake broker.
+
+    Messages of a queue with a TTL (or an expiration) and no consumer are
+    dead-lettered when they expire, which is how the retry delay queues work.
+    """
+
+    def __init__(self, broker, name: str, arguments: Optional[dict] = None):
+        self.name = name
+        self.arguments = arguments or {}
+        self.consumed = False
+        self._broker = broker
+        self._messages = asyncio.Queue()
+
+    def __len__(self) -> int:
+        return self._messages.qsize()
+
+    def put(self, message, routing_key: str, redelivered: bool = False):
+        ttl = self.arguments.get("x-message-ttl")
+        expiration = getattr(message, "expiration", None)
+        delays = [d for d in (ttl and ttl / 1000, expiration) if d is not None]
+        if delays and not self.consumed:
+            loop = asyncio.get_running_loop()
+            loop.call_later(min(delays), self._expire, message, routing_key)
+            return
+        self._messages.put_nowait((message, routing_key, redelivered))
+
+    def _expire(self, message, routing_key: str):
+        self.dead_letter(message, routing_key)
+        self._broker.track(message, -1)
+
+    def dead_letter(self, message, routing_key: str):
+        exchange = self.arguments.get("x-dead-letter-exchange")
+        if exchange is None:
+            return
+        routing_key = self.arguments.get("x-dead-letter-routing-key", routing_key)
+        # RabbitMQ retire l'expiration d'un message dead-letteré
+        message.expiration = None
+        self._broker.route(exchange, message, routing_key)
+
+    async def bind(self, exchange, routing_key: str):
+        self._broker.bindings[exchange.name][routing_key].add(self.name)
+
+    def iterator(self):
+        self.consumed = True
+        return _QueueIterator(self)
+
+    async def get_delivery(self) -> FakeIncomingMessage:
+        message, routing_key, redelivered = await self._messages.get()
+        delivery = FakeIncomingMessage(self._broker, self, message, routing_key)
+        delivery.redelivered = redelivered
+        return delivery
+
+
+class _QueueIterator:
+    def __init__(self, queue: FakeQueue):
+        self._queue = queue
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> FakeIncomingMessage:
+        return await self._queue.get_delivery()
+
+
+class FakeExchange:
+    def __init__(self, broker, name: str):
+        self.name = name
+        self._broker = broker
+
+    async def publish(self, message, routing_key: str):
+        self._broker.route(self.name, message, routing_key)
+
+
+class FakeChannel:
+    def __init__(self, broker):
+        self._broker = broker
+        self.default_exchange = FakeExchange(broker, "")
+        self.is_closed = False
+        self.prefetch_count = None
+
+    async def set_qos(self, prefetch_count: int):
+        self.prefetch_count = prefetch_count
+
+    async def declare_exchange(self, name: str, type=None, durable: bool = False):
+        return FakeExchange(self._broker, name)
+
+    async def declare_queue(
+        self, name: str, durable: bool = False, arguments: Optional[dict] = None
+    ) -> FakeQueue:
+        return self._broker.declare_queue(name, arguments)
+
+    async def close(self):
+        self.is_closed = True
+
+
+class FakeConnection:
+    def __init__(self, broker):
+        self._broker = broker
+
+    async def channel(self, publisher_confirms: bool = False) -> FakeChannel:
+        return FakeChannel(self._broker)
+
+    async def close(self):
+        pass
+
+
+class FakeBroker:
+    """
+    In-memory broker.
+
+    Every message published with `publish` carries a trace header, kept by
+    the worker when it schedules a retry. A traced message is done once no
+    copy of it is left in a consumed or delay queue: its latency is then the
+    time since its first publication.
+
+    Attributes:
+        queues (dict): Queues by name.
+        bindings (dict): `exchange -> routing key -> queue names`.
+        terminal (set): Queues where a traced message ends (DLQ, output).
+        settled (dict): Number of deliveries per outcome.
+        latencies (list): End-to-end latency of each done message, in seconds.
+    """
+
+    def __init__(self, terminal=()):
+        self.queues = {}
+        self.bindings = defaultdict(lambda: defaultdict(set))
+        self.terminal = set(terminal)
+        self.settled = defaultdict(int)
+        self.latencies = []
+        self._published_at = {}
+        self._copies = defaultdict(int)
+        self._next_id = 0
+        self._done = None
+        self._expected = 0
+
+    async def connect(self, url: str = None, **kwargs) -> FakeConnection:
+        return FakeConnection(self)
+
+    def declare_queue(self, name: str, arguments: Optional[dict] = None) -> FakeQueue:
+        if name not in self.queues:
+            self.queues[name] = FakeQueue(self, name, arguments)
+        return self.queues[name]
+
+    def route(self, exchange: str, message, routing_key: str):
+        if exchange == "":
+            names = {routing_key}
+        else:
+            names = self.bindings[exchange][routing_key]
+        for name in names:
+            if name not in self.terminal:
+                self.track(message, +1)
+            self.declare_queue(name).put(message, routing_key)
+
+    def publish(self, message, routing_key: str):
+        """
+        Publishes a traced message on the default exchange.
+
+        Args:
+            message (aio_pika.Message): Message to publish.
+            routing_key (str): Destination queue.
+        """
+        self._next_id += 1
+        message.headers[TRACE_HEADER] = self._next_id
+        self._published_at[self._next_id] = time.perf_counter()
+        self.route("", message, routing_key)
+
+    def track(self, message, delta: int):
+        """
+        Counts the live copies of a traced message.
+        """
+        trace_id = (message.headers or {}).get(TRACE_HEADER)
+        if trace_id is None:
+            return
+
+        copies = self._copies[trace_id] + delta
+        if copies > 0:
+            self._copies[trace_id] = copies
+            return
+
+        del self._copies[trace_id]
+        published_at = self._published_at.pop(trace_id)
+        self.latencies.append(time.perf_counter() - published_at)
+        if self._done is not None and len(self.latencies) >= self._expected:
+            if not self._done.done():
+                self._done.set_result(None)
+
+    async def wait_done(self, count: int):
+        """
+        Waits until `count` traced messages are done.
+
+        Args:
+            count (int): Number of messages.
+        """
+        self._expected = count
+        self._done = asyncio.get_running_loop().create_future()
+        if len(self.latencies) >= count:
+            self._done.set_result(None)
+        await self._done
+
+
+class FakeCollection:
+    """
+    In-memory collection with the `bulk_write`, `find` and `find_one` API of
+    motor.
+
+    Attributes:
+        documents (dict): Stored documents, by the value of their key field.
+        key (str): Field the requests filter on, `msg_id` or `user_id`.
+        latency (float): Delay added to each call, in seconds.
+        failure_rate (float): Probability that a call fails with `AutoReconnect`.
+        calls (int): Number of `bulk_write` calls.
+    """
+
+    def __init__(
+        self, latency: float = 0.0, failure_rate: float = 0.0, key: str = "msg_id"
+    ):
+        self.documents = {}
+        self.key = key
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+
+    async def find_one(self, filter: dict, projection: dict = None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        document = self.documents.get(filter[self.key])
+        if document is None or any(document.get(k) != v for k, v in filter.items()):
+            return None
+        return document
+
+    async def find(self, filter: dict, projection: dict = None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for key in filter[self.key]["$in"]:
+            if key in self.documents:
+                yield dict(self.documents[key])
+
+    async def bulk_write(self, requests: list, ordered: bool = True):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise AutoReconnect("fake collection failure")
+
+        for request in requests:
+            key = request._filter[self.key]
+            if isinstance(request, ReplaceOne):
+                self.documents[key] = dict(request._doc)
+            elif isinstance(request, DeleteOne):
+                self.documents.pop(key, None)
+            elif isinstance(request, UpdateOne):
+                document = self.documents.setdefault(key, {self.key: key})
+                for field, value in request._doc.get("$inc", {}).items():
+                    document[field] = document.get(field, 0) + value
+                for field, value in request._doc.get("$max", {}).items():
+                    if document.get(field) is None or value > document[field]:
+                        document[field] = value
+            else:
+                raise NotImplementedError(type(request).__name__)
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional
+
+FlushFunction = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+class MicroBatcher:
+    """
+    Groups items submitted by concurrent coroutines into batches.
+
+    A batch is flushed as soon as it reaches `max_size` items or `max_delay`
+    seconds after its first item, whichever comes first. Each caller awaits
+    the result of its own item only.
+
+    The flush function receives the list of items and must return a list of
+    the same length. An `Exception` instance in that list is raised to the
+    matching caller; any other value is returned to it. If the flush function
+    itself raises, every caller of the batch receives the exception.
+
+    Attributes:
+        max_size (int): Maximum number of items per batch.
+        max_delay (float): Maximum time (seconds) an item waits for its batch.
+    """
+
+    def __init__(self, flush_fn: FlushFunction, max_size: int, max_delay: float):
+        """
+        Initializes the batcher.
+
+        Args:
+            flush_fn (FlushFunction): Coroutine function processing one batch.
+            max_size (int): Maximum number of items per batch.
+            max_delay (float): Maximum waiting time (seconds) before a flush.
+        """
+        self.max_size = max(1, max_size)
+        self.max_delay = max_delay
+        self._flush_fn = flush_fn
+        self._pending = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight = set()
+
+    @property
+    def pending(self) -> int:
+        """Number of items waiting for their batch to be flushed."""
+        return len(self._pending)
+
+    @property
+    def inflight(self) -> int:
+        """Number of batches currently being flushed."""
+        return len(self._inflight)
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Adds an item to the current batch and waits for its result.
+
+        Args:
+            item (Any): Item to process.
+
+        Returns:
+            Any: Result returned by the flush function for this item.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush_pending)
+
+        return await future
+
+    async def close(self):
+        """
+        Flushes the pending items and waits for every running batch.
+        """
+        self._flush_pending()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: list):
+        futures = [future for _, future in batch]
+        try:
+            results = await self._flush_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"Flush returned {len(results)} results for {len(batch)} items"
+                )
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,90 @@
+import asyncio
+from collections import deque
+
+
+class AdjustableSemaphore:
+    """
+    Asyncio semaphore whose limit can be changed at runtime.
+
+    Lowering the limit never interrupts the holders: new acquisitions simply
+    wait until enough permits have been released. Raising it wakes up the
+    waiters immediately. Waiters are served in FIFO order.
+
+    Attributes:
+        limit (int): Maximum number of permits held at once.
+        in_use (int): Number of permits currently held.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Initializes the semaphore.
+
+        Args:
+            limit (int): Initial number of permits (at least 1).
+        """
+        self._limit = max(1, limit)
+        self._in_use = 0
+        self._waiters = deque()
+
+    @property
+    def limit(self) -> int:
+        """Maximum number of permits held at once."""
+        return self._limit
+
+    @property
+    def in_use(self) -> int:
+        """Number of permits currently held."""
+        return self._in_use
+
+    @property
+    def waiting(self) -> int:
+        """Number of coroutines waiting for a permit."""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def set_limit(self, limit: int):
+        """
+        Changes the number of permits.
+
+        Args:
+            limit (int): New number of permits (at least 1).
+        """
+        self._limit = max(1, limit)
+        self._wake()
+
+    async def acquire(self):
+        """
+        Waits for a permit.
+        """
+        if self._in_use < self._limit and not self._waiters:
+            self._in_use += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Permis accordé juste avant l'annulation : on le rend
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """
+        Returns a permit.
+        """
+        self._in_use -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self._in_use < self._limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_use += 1
+                waiter.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
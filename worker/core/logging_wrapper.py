@@ -1,22 +1,141 @@
-import json
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import time
+from json.encoder import encode_basestring_ascii
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from core.metrics import registry
+
+SAMPLED_OUT = registry.counter(
+    "worker_log_dropped_total", "Log records dropped, by reason.", reason="sampled"
+)
+RATE_LIMITED = registry.counter(
+    "worker_log_dropped_total", "Log records dropped, by reason.", reason="rate_limited"
+)
 
 
 class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record, with the same fields as `json.dumps`.
+
+    The timestamp prefix is formatted once per second and the level and
+    logger fields once per pair: only the message is escaped per record.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._second = None
+        self._second_prefix = ""
+        self._fields = {}
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        if second != self._second:
+            self._second = second
+            self._second_prefix = time.strftime(
+                "%Y-%m-%d %H:%M:%S", self.converter(second)
+            )
+        return f"{self._second_prefix},{int(record.msecs):03d}"
+
     def format(self, record):
-        log_record = {
-            "timestamp": self.formatTime(record),
-            "level": record.levelname,
-            "logger": record.name,
-            "message": record.getMessage(),
-        }
-        return json.dumps(log_record)
+        key = (record.levelname, record.name)
+        fields = self._fields.get(key)
+        if fields is None:
+            fields = self._fields[key] = (
+                f'"level": {encode_basestring_ascii(record.levelname)}, '
+                f'"logger": {encode_basestring_ascii(record.name)}, '
+            )
+        return (
+            f'{{"timestamp": "{self.formatTime(record)}", {fields}'
+            f'"message": {encode_basestring_ascii(record.getMessage())}}}'
+        )
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one record out of `1 / rate` below WARNING.
+
+    Attributes:
+        every (int): Records kept are one in `every`; 0 drops them all.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = round(1 / rate) if rate > 0 else 0
+        self._count = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        self._count += 1
+        if self.every and self._count >= self.every:
+            self._count = 0
+            return True
+        SAMPLED_OUT.inc()
+        return False
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket of `per_second` records below WARNING, bursts included.
+
+    Attributes:
+        per_second (float): Records allowed per second.
+    """
+
+    def __init__(self, per_second: float):
+        super().__init__()
+        self.per_second = per_second
+        self._tokens = per_second
+        self._last = time.monotonic()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        self._tokens = min(
+            self.per_second, self._tokens + (now - self._last) * self.per_second
+        )
+        self._last = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        RATE_LIMITED.inc()
+        return False
+
+
+def parse_logger_rates(value: str) -> dict:
+    """
+    Parses a `logger=value,...` setting, e.g. `app.consumer=0.01`.
+
+    Args:
+        value (str): Comma-separated `logger=number` pairs.
+
+    Returns:
+        dict: Number per logger name prefix.
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def _matching(rates: dict, name: str) -> list:
+    return [
+        rate
+        for prefix, rate in rates.items()
+        if name == prefix or name.startswith(prefix + ".")
+    ]
 
 
 class LoggerFactory:
     _configured = False
+    _listener = None
+    _sampling = {}
+    _rate_limits = {}
 
     @classmethod
     def _configure(cls):
@@ -26,6 +145,10 @@ class LoggerFactory:
         log_level = os.getenv("LOG_LEVEL", "INFO").upper()
         log_format = os.getenv("LOG_FORMAT", "text").lower()
         log_file = os.getenv("LOG_FILE", "logs/worker.log")
+        log_async = os.getenv("LOG_ASYNC", "true").lower() == "true"
+        log_lean = os.getenv("LOG_LEAN_RECORDS", "false").lower() == "true"
+        cls._sampling = parse_logger_rates(os.getenv("LOG_SAMPLING"))
+        cls._rate_limits = parse_logger_rates(os.getenv("LOG_RATE_LIMIT"))
 
         if log_format == "json":
             formatter = JsonFormatter()
@@ -42,13 +165,62 @@ class LoggerFactory:
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
 
-        logging.basicConfig(
-            level=log_level, handlers=[file_handler, console_handler], force=True
-        )
+        handlers = [file_handler, console_handler]
+        if log_async:
+            # Écritures et rotation dans un thread dédié, hors boucle asyncio
+            records = queue.SimpleQueue()
+            cls._listener = QueueListener(
+                records, *handlers, respect_handler_level=True
+            )
+            cls._listener.start()
+            queue_handler = QueueHandler(records)
+            # Le message seul : la mise en forme complète se fait à l'écriture
+            queue_handler.setFormatter(logging.Formatter("%(message)s"))
+            handlers = [queue_handler]
+            if log_lean:
+                cls._lean_records()
+
+        logging.basicConfig(level=log_level, handlers=handlers, force=True)
 
         cls._configured = True
 
+    @staticmethod
+    def _lean_records():
+        # Réglages globaux du module logging : tout le processus perd
+        # %(funcName)s, %(lineno)d, %(thread)d et %(process)d
+        logging._srcfile = None
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+
     @classmethod
     def get_logger(cls, name: str) -> logging.Logger:
         cls._configure()
-        return logging.getLogger(name)
+        logger = logging.getLogger(name)
+        if not logger.filters:
+            for rate in _matching(cls._sampling, name):
+                logger.addFilter(SamplingFilter(rate))
+            for per_second in _matching(cls._rate_limits, name):
+                logger.addFilter(RateLimitFilter(per_second))
+        return logger
+
+    @classmethod
+    def shutdown(cls):
+        """
+        Stops the writer thread once every queued record is written.
+        """
+        listener, cls._listener = cls._listener, None
+        if listener is not None:
+            listener.stop()
+            logging.root.handlers = list(listener.handlers)
+
+    @classmethod
+    def _after_fork(cls):
+        # Le thread d'écriture n'existe pas dans l'enfant : écritures directes
+        listener, cls._listener = cls._listener, None
+        if listener is not None:
+            logging.root.handlers = list(listener.handlers)
+
+
+atexit.register(LoggerFactory.shutdown)
+os.register_at_fork(after_in_child=LoggerFactory._after_fork)
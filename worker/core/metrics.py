@@ -0,0 +1,365 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+STAGE_METRIC = "worker_stage_duration_seconds"
+STAGE_HELP = "Duration of each processing stage, in seconds."
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(ABC):
+    """
+    Base class of the metrics.
+
+    Attributes:
+        name (str): Metric name.
+        help (str): Description shown in the exposition.
+        labels (dict): Constant labels of this metric.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: dict):
+        self.name = name
+        self.help = help
+        self.labels = labels
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, dict, float]]:
+        """
+        Returns the exposed samples as `(name, labels, value)` tuples.
+        """
+
+
+class Counter(Metric):
+    """
+    Monotonic counter, incremented directly or read from a callback.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: dict, fn: Callable = None):
+        super().__init__(name, help, labels)
+        self.value = 0
+        self._fn = fn
+
+    def inc(self, amount: float = 1):
+        """
+        Increments the counter.
+
+        Args:
+            amount (float): Increment, must be positive.
+        """
+        self.value += amount
+
+    def samples(self):
+        value = self._fn() if self._fn is not None else self.value
+        return [(self.name, self.labels, value)]
+
+
+class Gauge(Metric):
+    """
+    Instant value, set directly or read from a callback at scrape time.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labels: dict, fn: Callable = None):
+        super().__init__(name, help, labels)
+        self.value = 0
+        self._fn = fn
+
+    def set(self, value: float):
+        """
+        Sets the gauge value.
+
+        Args:
+            value (float): New value.
+        """
+        self.value = value
+
+    def samples(self):
+        value = self._fn() if self._fn is not None else self.value
+        return [(self.name, self.labels, value)]
+
+
+class Histogram(Metric):
+    """
+    Latency histogram with fixed buckets.
+
+    Attributes:
+        buckets (tuple): Upper bounds of the buckets, in seconds.
+        counts (list): Observation count per bucket (not cumulative), the
+            last one being the `+Inf` bucket.
+        sum (float): Sum of the observations.
+        count (int): Number of observations.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: dict, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """
+        Records an observation.
+
+        Args:
+            value (float): Observed value, in seconds.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        """
+        Context manager observing the duration of its block.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """
+        Returns a copy of the current state, for windowed computations.
+
+        Returns:
+            tuple: `(counts, sum, count)`.
+        """
+        return list(self.counts), self.sum, self.count
+
+    def samples(self):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            labels = {**self.labels, "le": _format_value(bound)}
+            samples.append((f"{self.name}_bucket", labels, cumulative))
+        samples.append((f"{self.name}_sum", self.labels, self.sum))
+        samples.append((f"{self.name}_count", self.labels, self.count))
+        return samples
+
+
+def quantile(buckets: tuple, counts: List[int], q: float) -> Optional[float]:
+    """
+    Estimates a quantile from histogram bucket counts.
+
+    The value is interpolated linearly inside the bucket holding the quantile;
+    observations above the last bound are reported at that bound.
+
+    Args:
+        buckets (tuple): Upper bounds of the buckets.
+        counts (list): Non-cumulative counts, the last one being `+Inf`.
+        q (float): Quantile in [0, 1].
+
+    Returns:
+        float: Estimated quantile, or None without observations.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            if index == len(buckets):
+                return buckets[-1]
+            lower = buckets[index - 1] if index else 0.0
+            fraction = (rank - cumulative) / count
+            return lower + (buckets[index] - lower) * fraction
+        cumulative += count
+    return buckets[-1]
+
+
+class Registry:
+    """
+    Collection of metrics, rendered in the Prometheus text format.
+
+    Metrics sharing a name form a family and differ by their labels. The
+    getters return the existing metric when called again with the same name
+    and labels, so modules can declare their metrics independently.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, tuple], Metric] = {}
+
+    def _get(self, cls, name: str, help: str, labels: dict, **kwargs) -> Metric:
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            metric = self._metrics[key] = cls(name, help, labels, **kwargs)
+        return metric
+
+    def counter(self, name: str, help: str, fn: Callable = None, **labels) -> Counter:
+        """
+        Returns the counter of a name and label set, creating it if needed.
+        """
+        return self._get(Counter, name, help, labels, fn=fn)
+
+    def gauge(self, name: str, help: str, fn: Callable = None, **labels) -> Gauge:
+        """
+        Returns the gauge of a name and label set, creating it if needed.
+        """
+        return self._get(Gauge, name, help, labels, fn=fn)
+
+    def histogram(
+        self, name: str, help: str, buckets=DEFAULT_BUCKETS, **labels
+    ) -> Histogram:
+        """
+        Returns the histogram of a name and label set, creating it if needed.
+        """
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def collect(self) -> List[Tuple[str, str, str, list]]:
+        """
+        Returns every family with its samples.
+
+        Returns:
+            list: `(name, type, help, samples)` tuples, sorted by name.
+        """
+        families = {}
+        for metric in self._metrics.values():
+            family = families.setdefault(
+                metric.name, (metric.name, metric.type, metric.help, [])
+            )
+            family[3].extend(metric.samples())
+        return [families[name] for name in sorted(families)]
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text.
+        """
+        return render_families(self.collect())
+
+
+def render_families(families: list) -> str:
+    """
+    Renders collected families in the Prometheus text exposition format.
+
+    Args:
+        families (list): `(name, type, help, samples)` tuples.
+
+    Returns:
+        str: Exposition text.
+    """
+    lines = []
+    for name, type_, help_, samples in families:
+        lines.append(f"# HELP {name} {help_}")
+        lines.append(f"# TYPE {name} {type_}")
+        for sample, labels, value in samples:
+            lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def stage_histogram(stage: str) -> Histogram:
+    """
+    Returns the latency histogram of a processing stage.
+
+    Args:
+        stage (str): Stage name (decode, mongo_write, publish...).
+
+    Returns:
+        Histogram: Histogram labelled with the stage.
+    """
+    return registry.histogram(STAGE_METRIC, STAGE_HELP, stage=stage)
+
+
+async def _handle_request(reader, writer, render: Callable[[], str]):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()).strip():
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].startswith("/metrics"):
+            status, body = "200 OK", render().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            status, body, content_type = "404 Not Found", b"not found\n", "text/plain"
+
+        writer.write(
+            (
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+            + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(
+    host: str, port: int, render: Callable[[], str] = None
+) -> asyncio.AbstractServer:
+    """
+    Serves the metrics over HTTP from the running event loop.
+
+    Args:
+        host (str): Listening address.
+        port (int): Listening port.
+        render (callable, optional): Returns the exposition text.
+            Defaults to the module registry.
+
+    Returns:
+        asyncio.AbstractServer: The started server.
+    """
+    render = render or registry.render
+    return await asyncio.start_server(
+        lambda r, w: _handle_request(r, w, render), host, port
+    )
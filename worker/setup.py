@@ -7,9 +7,13 @@ setup(
     install_requires=[
         'aio-pika',
         'motor',
+        'numpy',
         'black',
         'isort',
     ],
+    extras_require={
+        'fast': ['orjson'],
+    },
     entry_points={
         'console_scripts': [
         ]
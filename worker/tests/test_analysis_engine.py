@@ -0,0 +1,84 @@
+from app.analysis.engine import AnalysisEngine, normalize_text, token_id
+from app.models.message_data import MessageData
+from app.processing import analyze_messages
+
+
+def test_token_ids_are_stable():
+    assert token_id("hello") == 907060870
+    assert token_id("hello") != token_id("world")
+
+
+def test_normalize_text_collapses_whitespace():
+    assert normalize_text("  hello \n\t world  ") == "hello world"
+
+
+def test_sentiment_and_language():
+    engine = AnalysisEngine()
+    positive, negative = engine.analyze_batch(
+        [
+            "I love this great product and the support was excellent",
+            "Le service est nul et très lent, je suis déçu",
+        ]
+    )
+
+    assert positive["sentiment"] > 0.5 and positive["score"] > 50
+    assert positive["language"] == "en"
+    assert negative["sentiment"] < -0.5 and negative["score"] < 50
+    assert negative["language"] == "fr"
+
+
+def test_counts_and_keywords():
+    result = AnalysisEngine().analyze("the cache cache  cache of data data and 2024")
+
+    assert result["token_count"] == 9
+    assert result["char_count"] == len("the cache cache cache of data data and 2024")
+    assert result["keywords"] == ["cache", "data"]
+
+
+def test_batch_matches_single_analysis():
+    engine = AnalysisEngine()
+    texts = ["good day", None, "bad bad day", "", "neutral words only"]
+
+    assert engine.analyze_batch(texts) == [engine.analyze(t) for t in texts]
+
+
+def test_empty_text_has_no_score():
+    result = AnalysisEngine().analyze(None)
+    assert result["score"] is None
+    assert result["token_count"] == 0
+
+
+def test_whitespace_only_text_is_empty():
+    engine = AnalysisEngine()
+    empty = engine.analyze(None)
+
+    assert engine.analyze_batch(["", " \n\t ", "good"])[:2] == [empty, empty]
+    pieces = [engine.analyze_partial(p) for p in ("  ", "\n \t")]
+    assert engine.merge_partials(pieces) == empty
+
+
+def test_analyze_messages_keeps_message_fields():
+    items = [
+        MessageData({"msg_id": "a", "type": "update", "text": "great", "lang": "x"}),
+        MessageData({"msg_id": "b", "type": "update"}),
+    ]
+    first, second = analyze_messages(items)
+
+    assert first["msg_id"] == "a" and first["lang"] == "x"
+    assert first["status"] == "done" and first["score"] > 50
+    assert second["msg_id"] == "b" and second["score"] is None
+
+
+def test_merged_partials_match_single_analysis():
+    engine = AnalysisEngine()
+    text = (
+        "Great  service, bad delivery.\nLe produit est très bien mais cher. "
+        "data cache data Σοφίας cache 2024 quality price price quality good "
+    ) * 7
+    cuts = [m for m in range(len(text)) if text[m] in " \n"][3::11]
+    pieces = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+    merged = engine.merge_partials([engine.analyze_partial(p) for p in pieces])
+
+    assert len(pieces) > 5
+    assert merged == engine.analyze(text)
@@ -0,0 +1,85 @@
+import sqlite3
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from app.cache import AnalysisCache, LRUTier, cache_key
+from app.models.message_data import MessageData
+from app.processing import CACHE_ERRORS, analyze
+
+
+def test_cache_key_ignores_whitespace_only_differences():
+    assert cache_key("hello  world\n") == cache_key(" hello world")
+    assert cache_key("hello world") != cache_key("Hello world")
+
+
+def test_lru_tier_evicts_least_recently_used():
+    tier = LRUTier(max_bytes=30)
+    tier.put("a", {"v": 1}, 10)
+    tier.put("b", {"v": 2}, 10)
+    tier.put("c", {"v": 3}, 10)
+    tier.get("a")
+    tier.put("d", {"v": 4}, 10)
+
+    assert tier.get("b") is None
+    assert tier.get("a") == {"v": 1}
+    assert tier.evictions == 1
+    assert tier.size == 30
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = AnalysisCache(max_bytes=1024, path=path)
+    await cache.put("some text", {"score": 42})
+    cache.close()
+
+    restarted = AnalysisCache(max_bytes=1024, path=path)
+    assert await restarted.get("some   text") == {"score": 42}
+    assert await restarted.get("other text") is None
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.stats()["misses"] == 1
+    restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_duplicate_text_skips_the_pipeline():
+    cache = AnalysisCache(max_bytes=1024 * 1024)
+    pipeline = AsyncMock(
+        return_value={"msg_id": "m1", "status": "done", "score": 70, "keywords": []}
+    )
+
+    with patch("app.processing.analysis_cache", cache), patch(
+        "app.processing.run_pipeline", pipeline
+    ):
+        first = await analyze(
+            MessageData({"msg_id": "m1", "type": "update", "text": "x y"})
+        )
+        second = await analyze(
+            MessageData({"msg_id": "m2", "type": "update", "text": "x  y"})
+        )
+
+    pipeline.assert_awaited_once()
+    assert first["score"] == second["score"] == 70
+    assert second["msg_id"] == "m2" and second["status"] == "done"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_errors_fall_back_to_the_pipeline(tmp_path):
+    cache = AnalysisCache(max_bytes=1024 * 1024, path=str(tmp_path / "cache.db"))
+    cache.disk.get = Mock(side_effect=sqlite3.OperationalError("database is locked"))
+    cache.disk.put = Mock(side_effect=sqlite3.OperationalError("database is locked"))
+    pipeline = AsyncMock(return_value={"msg_id": "m1", "status": "done", "score": 70})
+    errors = CACHE_ERRORS.value
+
+    with patch("app.processing.analysis_cache", cache), patch(
+        "app.processing.run_pipeline", pipeline
+    ):
+        result = await analyze(
+            MessageData({"msg_id": "m1", "type": "update", "text": "x y"})
+        )
+
+    pipeline.assert_awaited_once()
+    assert result["score"] == 70
+    assert CACHE_ERRORS.value == errors + 2
+    cache.close()
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from app.coalescer import KeyedCoalescer
+from app.models.message_data import MessageData
+
+
+def msg(msg_id, type_, text=None):
+    return MessageData({"msg_id": msg_id, "type": type_, "text": text})
+
+
+class Recorder:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.started = []
+        self.finished = []
+
+    async def __call__(self, data):
+        self.started.append((data.msg_id, data.type, data.text))
+        await asyncio.sleep(self.delay)
+        if data.text == "boom":
+            raise ValueError("boom")
+        self.finished.append((data.msg_id, data.type, data.text))
+
+
+async def submit_all(coalescer, *messages):
+    tasks = []
+    for data in messages:
+        tasks.append(asyncio.create_task(coalescer.submit(data.msg_id, data)))
+        await asyncio.sleep(0)
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_delete_cancels_running_update():
+    runner = Recorder()
+    coalescer = KeyedCoalescer(runner)
+
+    results = await submit_all(coalescer, msg("a", "update"), msg("a", "delete"))
+
+    assert results == [False, True]
+    assert runner.finished == [("a", "delete", None)]
+    assert coalescer.cancelled == 1
+    assert len(coalescer) == 0
+
+
+@pytest.mark.asyncio
+async def test_later_update_replaces_queued_one():
+    runner = Recorder()
+    coalescer = KeyedCoalescer(runner)
+
+    results = await submit_all(
+        coalescer,
+        msg("a", "update", "v1"),
+        msg("a", "update", "v2"),
+        msg("a", "update", "v3"),
+    )
+
+    assert results == [True, False, True]
+    assert [text for _, _, text in runner.finished] == ["v1", "v3"]
+    assert coalescer.superseded == 1
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_in_parallel():
+    runner = Recorder(delay=0.1)
+    coalescer = KeyedCoalescer(runner)
+
+    start = asyncio.get_running_loop().time()
+    results = await submit_all(coalescer, *(msg(f"k{i}", "update") for i in range(5)))
+
+    assert results == [True] * 5
+    assert asyncio.get_running_loop().time() - start < 0.3
+
+
+@pytest.mark.asyncio
+async def test_error_is_raised_to_its_submitter_only():
+    runner = Recorder()
+    coalescer = KeyedCoalescer(runner)
+
+    failed, ok = await submit_all(
+        coalescer, msg("a", "update", "boom"), msg("a", "update", "fine")
+    )
+
+    assert isinstance(failed, ValueError)
+    assert ok is True
@@ -0,0 +1,80 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from app.controller import ConcurrencyController
+from core.concurrency import AdjustableSemaphore
+from core.metrics import Histogram
+
+
+def make_controller(limiter, histogram=None, backlog=0, completions=None):
+    completions = completions or [0]
+    return ConcurrencyController(
+        limiter,
+        AsyncMock(),
+        [histogram or Histogram("io_seconds", "I/O.", {})],
+        lambda: backlog,
+        lambda: completions[0],
+        backlog_target=100,
+        latency_target=0.5,
+        min_limit=2,
+        max_limit=20,
+        increase_step=2,
+        decrease_factor=0.5,
+    )
+
+
+def test_decide_is_aimd():
+    controller = make_controller(AdjustableSemaphore(10))
+
+    assert controller.decide(10, 0.1, 0, saturated=True, completion_rate=50) == 12
+    assert controller.decide(12, 0.1, 0, saturated=True, completion_rate=60) == 14
+    assert controller.decide(14, 2.0, 0, saturated=True, completion_rate=60) == 7
+    assert controller.decide(7, 0.1, 500, saturated=True, completion_rate=60) == 3
+    assert controller.decide(3, 0.1, 0, saturated=False, completion_rate=60) == 3
+    assert controller.decide(3, 9.0, 0, saturated=True, completion_rate=60) == 2
+
+
+def test_increase_stops_when_throughput_drops():
+    controller = make_controller(AdjustableSemaphore(10))
+
+    assert controller.decide(10, 0.1, 0, saturated=True, completion_rate=100) == 12
+    assert controller.decide(12, 0.1, 0, saturated=True, completion_rate=80) == 12
+    assert controller.decide(12, 0.1, 0, saturated=True, completion_rate=80) == 14
+
+
+@pytest.mark.asyncio
+async def test_tick_resizes_limiter_and_prefetch():
+    limiter = AdjustableSemaphore(10)
+    histogram = Histogram("io_seconds", "I/O.", {})
+    controller = make_controller(limiter, histogram)
+    for _ in range(20):
+        histogram.observe(3.0)
+
+    await controller.tick()
+
+    assert limiter.limit == 5
+    controller._apply_prefetch.assert_awaited_once_with(5)
+
+
+@pytest.mark.asyncio
+async def test_semaphore_limit_changes_at_runtime():
+    limiter = AdjustableSemaphore(1)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done() and limiter.waiting == 1
+
+    limiter.set_limit(2)
+    await asyncio.sleep(0)
+    assert waiter.done() and limiter.in_use == 2
+
+    limiter.set_limit(1)
+    limiter.release()
+    blocked = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not blocked.done()
+
+    limiter.release()
+    await asyncio.sleep(0)
+    assert blocked.done() and limiter.in_use == 1
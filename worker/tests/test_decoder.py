@@ -0,0 +1,25 @@
+import pytest
+from app.models.decoder import decode_message
+from app.models.message_data import MessageData
+
+
+def test_decode_message_from_bytes():
+    data = decode_message(
+        b'{"msg_id": "m1", "type": "update", "text": "hi", "lang": "fr"}'
+    )
+
+    assert isinstance(data, MessageData)
+    assert data.msg_id == "m1" and data.text == "hi"
+    assert data.get_extra() == {"lang": "fr"}
+
+
+def test_decode_message_keeps_key_error_semantics():
+    with pytest.raises(KeyError):
+        decode_message(b'{"msg_id": "m1"}')
+
+
+def test_decode_message_rejects_non_objects():
+    with pytest.raises(TypeError):
+        decode_message(b"[1, 2]")
+    with pytest.raises(ValueError):
+        decode_message(b"{not json")
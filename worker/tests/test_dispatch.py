@@ -0,0 +1,54 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from app.models.message_data import MessageData
+from app.processing import BatchDispatcher, heavy_analysis
+
+
+def failing_analysis(data: MessageData) -> dict:
+    if data.msg_id == "bad":
+        raise ValueError("analyse impossible")
+    return heavy_analysis(data)
+
+
+def make_messages(*ids):
+    return [MessageData({"msg_id": i, "type": "update", "text": "t"}) for i in ids]
+
+
+@pytest.mark.asyncio
+async def test_messages_are_sent_to_executor_in_chunks():
+    loop = asyncio.get_running_loop()
+    calls = []
+
+    async def fake_executor(executor, func, *args):
+        calls.append(len(args[1]))
+        return func(*args)
+
+    dispatcher = BatchDispatcher(heavy_analysis, None, max_size=4, max_delay=0.01)
+    messages = make_messages(*(f"msg_{i}" for i in range(10)))
+
+    with patch.object(loop, "run_in_executor", side_effect=fake_executor):
+        results = await asyncio.gather(*(dispatcher.submit(m) for m in messages))
+
+    assert calls == [4, 4, 2]
+    assert [r["msg_id"] for r in results] == [m.msg_id for m in messages]
+
+
+@pytest.mark.asyncio
+async def test_error_only_fails_its_message():
+    loop = asyncio.get_running_loop()
+
+    async def fake_executor(executor, func, *args):
+        return func(*args)
+
+    dispatcher = BatchDispatcher(failing_analysis, None, max_size=8, max_delay=0.01)
+
+    with patch.object(loop, "run_in_executor", side_effect=fake_executor):
+        ok, failed = await asyncio.gather(
+            *(dispatcher.submit(m) for m in make_messages("good", "bad")),
+            return_exceptions=True,
+        )
+
+    assert ok["msg_id"] == "good"
+    assert isinstance(failed, ValueError)
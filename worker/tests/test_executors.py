@@ -0,0 +1,64 @@
+import asyncio
+import os
+
+import pytest
+from app import executors
+from app.executors import INLINE, PREFORK, InlineExecutor, cpu_limit, create_executor
+from app.models.message_data import MessageData
+from app.processing import CPU_BOUND, Stage, analyze_messages, run_pipeline
+
+
+def test_cpu_limit_follows_cgroup_v2_quota(tmp_path, monkeypatch):
+    cpu_max = tmp_path / "cpu.max"
+    cpu_max.write_text("150000 100000\n")
+    monkeypatch.setattr(executors, "CGROUP_V2_CPU_MAX", str(cpu_max))
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(32)))
+    assert cpu_limit() == 2
+
+    cpu_max.write_text("max 100000\n")
+    assert cpu_limit() == 32
+
+
+def test_cpu_limit_follows_cgroup_v1_quota(tmp_path, monkeypatch):
+    quota, period = tmp_path / "quota", tmp_path / "period"
+    quota.write_text("300000")
+    period.write_text("100000")
+    monkeypatch.setattr(executors, "CGROUP_V2_CPU_MAX", str(tmp_path / "missing"))
+    monkeypatch.setattr(executors, "CGROUP_V1_QUOTA", str(quota))
+    monkeypatch.setattr(executors, "CGROUP_V1_PERIOD", str(period))
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)))
+    assert cpu_limit() == 3
+
+    quota.write_text("-1")
+    assert cpu_limit() == 8
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_executor("gpu", 1)
+
+
+@pytest.mark.asyncio
+async def test_inline_executor_runs_the_pipeline():
+    pool = create_executor(INLINE, 1)
+    assert isinstance(pool, InlineExecutor)
+
+    data = MessageData({"msg_id": "msg_1", "type": "update", "text": "good day"})
+    stages = (Stage("analysis", analyze_messages, CPU_BOUND, batched=True),)
+    result = await run_pipeline(data, stages, pool)
+
+    assert result["status"] == "done"
+    assert result["token_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_prefork_pool_recycles_processes():
+    pool = create_executor(PREFORK, 1, max_tasks_per_child=1)
+    loop = asyncio.get_running_loop()
+    try:
+        await executors.warm_up(pool)
+        pids = {await loop.run_in_executor(pool, os.getpid) for _ in range(3)}
+    finally:
+        pool.shutdown()
+
+    assert len(pids) == 3
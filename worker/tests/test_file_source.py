@@ -0,0 +1,68 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from app import consumer
+from app.consumer import FileSource
+
+
+def write_jsonl(path, count, broken=()):
+    lines = []
+    for i in range(count):
+        body = json.dumps({"msg_id": f"msg_{i}", "type": "delete"})
+        lines.append(body[:10] if i in broken else body)
+    path.write_text("\n".join(lines) + "\n")
+    return lines
+
+
+async def replay(source):
+    submit = AsyncMock(return_value=True)
+    with patch.object(consumer.coalescer, "submit", submit), patch(
+        "app.consumer.handler.source"
+    ):
+        await consumer.consume_messages(source)
+    await source.close()
+    return [call.args[0] for call in submit.call_args_list]
+
+
+@pytest.mark.asyncio
+async def test_file_source_replays_every_line(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    write_jsonl(path, 50, broken={7})
+    source = FileSource(str(path), max_inflight=4, chunk_bytes=64)
+
+    msg_ids = await replay(source)
+
+    assert sorted(msg_ids) == sorted(f"msg_{i}" for i in range(50) if i != 7)
+    assert source.offset == path.stat().st_size
+    assert (tmp_path / "requests.jsonl.offset").read_text() == str(source.offset)
+
+
+@pytest.mark.asyncio
+async def test_file_source_resumes_from_checkpoint(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    lines = write_jsonl(path, 10)
+    checkpoint = tmp_path / "replay.offset"
+    checkpoint.write_text(str(sum(len(line) + 1 for line in lines[:6])))
+
+    msg_ids = await replay(FileSource(str(path), str(checkpoint)))
+
+    assert sorted(msg_ids) == [f"msg_{i}" for i in range(6, 10)]
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_waits_for_the_oldest_line_in_flight(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    write_jsonl(path, 3)
+    source = FileSource(str(path), checkpoint_interval=0)
+    await source.open()
+    records = source.__aiter__()
+    first, second = await records.__anext__(), await records.__anext__()
+
+    await source.ack(second)
+    assert source.offset == first.offset
+
+    await source.ack(first)
+    assert source.offset == second.end
+    await records.aclose()
+    await source.close()
@@ -0,0 +1,87 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from app.idempotency import BloomFilter, IdempotencyGuard, content_digest
+from app.models.message_data import MessageData
+from app.processing import process_message
+
+
+def update(msg_id="msg_1", text="hello"):
+    return MessageData({"msg_id": msg_id, "type": "update", "text": text})
+
+
+def test_bloom_filter_has_no_false_negative():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"key_{i}")
+
+    assert all(f"key_{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other_{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_content_digest_changes_with_content():
+    assert content_digest(update()) == content_digest(update())
+    assert content_digest(update()) != content_digest(update(text="hello!"))
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "idempotency.bloom")
+    guard = IdempotencyGuard(capacity=100, error_rate=0.01, path=path)
+    guard.add("msg_1", "abc")
+    guard.save()
+
+    restored = IdempotencyGuard(capacity=100, error_rate=0.01, path=path)
+    restored.load()
+    assert restored.seen("msg_1", "abc")
+    assert not restored.seen("msg_2", "abc")
+
+
+@pytest.mark.asyncio
+async def test_stored_duplicate_skips_the_analysis():
+    guard = IdempotencyGuard(capacity=100, error_rate=0.01)
+    data = update()
+    guard.add(data.msg_id, content_digest(data))
+    analyze, publish = AsyncMock(), AsyncMock()
+
+    with patch("app.processing.idempotency_guard", guard), patch(
+        "app.idempotency.find_stored", AsyncMock(return_value=True)
+    ), patch("app.processing.analyze", analyze), patch(
+        "app.processing.publish_result", publish
+    ):
+        await process_message(data)
+
+    analyze.assert_not_called()
+    assert publish.call_args.args[0] == {
+        "msg_id": "msg_1",
+        "type": "update",
+        "status": "done",
+    }
+
+
+@pytest.mark.asyncio
+async def test_false_positive_is_processed():
+    guard = IdempotencyGuard(capacity=100, error_rate=0.01)
+    data = update()
+    guard.add(data.msg_id, content_digest(data))
+
+    with patch("app.idempotency.find_stored", AsyncMock(return_value=False)):
+        assert not await guard.is_duplicate(data.msg_id, content_digest(data))
+
+
+@pytest.mark.asyncio
+async def test_no_digest_without_the_guard():
+    store, digest = AsyncMock(), AsyncMock()
+    result = {"msg_id": "msg_1", "type": "update", "status": "done", "score": 50}
+
+    with patch("app.processing.idempotency_guard", None), patch(
+        "app.processing.content_digest", digest
+    ), patch("app.processing.analyze", AsyncMock(return_value=result)), patch(
+        "app.processing.store_result", store
+    ), patch(
+        "app.processing.publish_result", AsyncMock()
+    ):
+        await process_message(update())
+
+    digest.assert_not_called()
+    assert "content_digest" not in store.call_args.args[0]
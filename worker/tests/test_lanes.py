@@ -0,0 +1,113 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from app.consumer import handler
+from app.consumer.lanes import UPDATE_QUEUE, PendingKeys
+from app.consumer.sources import MessageSource
+
+
+class StubSource(MessageSource):
+    def __init__(self, routes=False):
+        self.routes = routes
+        self.acked = []
+        self.routed = []
+
+    async def open(self):
+        pass
+
+    async def __aiter__(self):
+        for delivery in ():
+            yield delivery
+
+    async def ack(self, delivery):
+        self.acked.append(delivery)
+
+    async def fail(self, delivery, error):
+        pass
+
+    async def route(self, delivery, queue_name):
+        self.routed.append((delivery, queue_name))
+
+
+def delivery(msg_id, type_):
+    message = MagicMock()
+    message.body = json.dumps({"msg_id": msg_id, "type": type_, "text": "t"})
+    message.headers = {}
+    return message
+
+
+async def saturate_update_lane(source, release):
+    async def submit(key, data):
+        if data.type == "update":
+            await release.wait()
+        return True
+
+    patcher = patch.object(handler.coalescer, "submit", submit)
+    patcher.start()
+    tasks = [
+        asyncio.create_task(handler.handle_message(delivery(f"u{i}", "update"), source))
+        for i in range(handler.semaphore.limit)
+    ]
+    await asyncio.sleep(0)
+    return patcher, tasks
+
+
+@pytest.mark.asyncio
+async def test_delete_does_not_wait_behind_updates():
+    source, release = StubSource(), asyncio.Event()
+    patcher, updates = await saturate_update_lane(source, release)
+    try:
+        deleted = delivery("d1", "delete")
+        await asyncio.wait_for(handler.handle_message(deleted, source), 1)
+        assert source.acked == [deleted]
+    finally:
+        release.set()
+        await asyncio.gather(*updates)
+        patcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_full_update_lane_overflows_and_keeps_key_order():
+    source, release = StubSource(routes=True), asyncio.Event()
+    patcher, updates = await saturate_update_lane(source, release)
+    try:
+        with patch.object(handler, "LANES_OVERFLOW", True), patch.object(
+            handler, "pending_keys", PendingKeys()
+        ), patch.object(handler.update_lane, "backlog", 0):
+            routed = delivery("k1", "update")
+            await handler.handle_message(routed, source)
+            follower = delivery("k1", "delete")
+            await handler.handle_message(follower, source)
+            other = delivery("k2", "delete")
+            await handler.handle_message(other, source)
+
+            assert source.routed == [(routed, UPDATE_QUEUE), (follower, UPDATE_QUEUE)]
+            assert "k1" in handler.pending_keys
+            assert source.acked == [other]
+    finally:
+        release.set()
+        await asyncio.gather(*updates)
+        patcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_updates_wait_for_their_lane_without_overflow():
+    source, release = StubSource(routes=True), asyncio.Event()
+    patcher, updates = await saturate_update_lane(source, release)
+    try:
+        waiting = asyncio.create_task(
+            handler.handle_message(delivery("k1", "update"), source)
+        )
+        await asyncio.sleep(0)
+        deleted = delivery("k2", "delete")
+        await asyncio.wait_for(handler.handle_message(deleted, source), 1)
+
+        assert source.routed == []
+        assert source.acked == [deleted]
+        assert not waiting.done()
+    finally:
+        release.set()
+        await asyncio.gather(*updates, waiting)
+        patcher.stop()
@@ -0,0 +1,62 @@
+import json
+import logging
+
+from core.logging_wrapper import (
+    JsonFormatter,
+    RateLimitFilter,
+    SamplingFilter,
+    parse_logger_rates,
+)
+
+
+def make_record(level=logging.INFO, msg='[REÇU] msg_1 "update"'):
+    return logging.LogRecord("app.consumer", level, __file__, 1, msg, None, None)
+
+
+def test_json_formatter_matches_json_dumps():
+    formatter = JsonFormatter()
+    record = make_record()
+
+    expected = json.dumps(
+        {
+            "timestamp": logging.Formatter().formatTime(record),
+            "level": "INFO",
+            "logger": "app.consumer",
+            "message": record.getMessage(),
+        }
+    )
+    assert formatter.format(record) == expected
+    assert formatter.format(record) == expected
+
+
+def test_sampling_keeps_one_record_in_n_but_every_warning():
+    sampler = SamplingFilter(0.1)
+
+    kept = [sampler.filter(make_record()) for _ in range(100)]
+    assert sum(kept) == 10
+    assert all(sampler.filter(make_record(logging.WARNING)) for _ in range(10))
+    assert not SamplingFilter(0).filter(make_record())
+
+
+def test_rate_limit_drops_records_over_budget():
+    limiter = RateLimitFilter(5)
+
+    kept = [limiter.filter(make_record()) for _ in range(50)]
+    assert sum(kept) == 5
+    assert limiter.filter(make_record(logging.ERROR))
+
+
+def test_parse_logger_rates():
+    assert parse_logger_rates("app.consumer=0.01, app.storage=0.5") == {
+        "app.consumer": 0.01,
+        "app.storage": 0.5,
+    }
+    assert parse_logger_rates(None) == {}
+
+
+def test_records_keep_their_caller_by_default():
+    from core.logging_wrapper import LoggerFactory
+
+    LoggerFactory.get_logger("app.test")
+    assert logging._srcfile is not None
+    assert logging.logThreads and logging.logProcesses
@@ -22,3 +22,10 @@ def test_message_data_with_extra_fields():
     data = MessageData(raw)
     assert "lang" in data._extra
     assert "source" in data._extra
+
+
+def test_extra_fields_keep_their_input_order():
+    raw = {"msg_id": "m", "zeta": 1, "type": "update", "alpha": 2, "mid": 3}
+    data = MessageData(raw)
+    assert list(data.get_extra()) == ["zeta", "alpha", "mid"]
+    assert list(data.to_dict())[-3:] == ["zeta", "alpha", "mid"]
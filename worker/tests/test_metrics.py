@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from core.metrics import Registry, quantile, start_metrics_server
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    registry.counter("jobs_total", "Jobs.", outcome="ok").inc(3)
+    registry.gauge("queue_size", "Queue.", fn=lambda: 7)
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = registry.render()
+
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{outcome="ok"} 3' in text
+    assert "queue_size 7" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+
+
+def test_same_name_and_labels_return_same_metric():
+    registry = Registry()
+    first = registry.histogram("stage_seconds", "Stages.", stage="decode")
+    assert registry.histogram("stage_seconds", "Stages.", stage="decode") is first
+    assert registry.histogram("stage_seconds", "Stages.", stage="ack") is not first
+    assert registry.render().count("# TYPE stage_seconds histogram") == 1
+
+
+def test_quantile_interpolates_inside_bucket():
+    buckets = (0.1, 0.2, 0.4)
+    assert quantile(buckets, [0, 0, 0, 0], 0.5) is None
+    assert quantile(buckets, [0, 10, 0, 0], 0.5) == pytest.approx(0.15)
+    assert quantile(buckets, [0, 0, 0, 4], 0.99) == 0.4
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_registry():
+    registry = Registry()
+    registry.counter("hits_total", "Hits.").inc()
+    server = await start_metrics_server("127.0.0.1", 0, registry.render)
+    port = server.sockets[0].getsockname()[1]
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    response = (await reader.read()).decode()
+    writer.close()
+    server.close()
+
+    assert response.startswith("HTTP/1.1 200 OK")
+    assert "hits_total 1" in response
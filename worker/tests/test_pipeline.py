@@ -0,0 +1,111 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from app import processing
+from app.models.message_data import MessageData
+from app.processing import (
+    CPU_BOUND,
+    IO_BOUND,
+    Stage,
+    analyze_split,
+    heavy_analysis,
+    run_pipeline,
+)
+
+IO_DELAY = 0.3
+
+
+def blocking_io_wait(data: MessageData) -> dict:
+    time.sleep(IO_DELAY)
+    return {"duration": IO_DELAY}
+
+
+async def async_io_wait(data: MessageData) -> dict:
+    await asyncio.sleep(IO_DELAY)
+    return {"duration": IO_DELAY}
+
+
+async def run_batch(stages, pool, count: int) -> float:
+    messages = [
+        MessageData({"msg_id": f"msg_{i}", "type": "update", "text": "hello"})
+        for i in range(count)
+    ]
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_pipeline(data, stages, pool) for data in messages)
+    )
+    assert all(result["status"] == "done" for result in results)
+    return time.perf_counter() - start
+
+
+def test_unknown_stage_kind_is_rejected():
+    with pytest.raises(ValueError):
+        Stage("bad", heavy_analysis, "gpu")
+
+
+@pytest.mark.asyncio
+async def test_io_stage_outside_pool_increases_throughput():
+    count = 8
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        # Préchauffe les processus pour ne pas mesurer leur démarrage
+        await run_batch((Stage("analysis", heavy_analysis, CPU_BOUND),), pool, 2)
+
+        in_pool = await run_batch(
+            (
+                Stage("io_wait", blocking_io_wait, CPU_BOUND),
+                Stage("analysis", heavy_analysis, CPU_BOUND),
+            ),
+            pool,
+            count,
+        )
+        split = await run_batch(
+            (
+                Stage("io_wait", async_io_wait, IO_BOUND),
+                Stage("analysis", heavy_analysis, CPU_BOUND),
+            ),
+            pool,
+            count,
+        )
+
+    # 8 attentes sur 2 processus : ~4 x IO_DELAY contre ~1 x IO_DELAY
+    assert in_pool >= count * IO_DELAY / 2
+    assert split < in_pool / 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_merges_stage_outputs():
+    data = MessageData({"msg_id": "msg_1", "type": "update", "text": "hello"})
+    result = await run_pipeline(
+        data,
+        (
+            Stage("io_wait", async_io_wait, IO_BOUND),
+            Stage("analysis", heavy_analysis, CPU_BOUND),
+        ),
+        None,
+    )
+    assert result["duration"] == IO_DELAY
+    assert result["msg_id"] == "msg_1"
+
+
+@pytest.mark.asyncio
+async def test_large_text_is_split_across_the_pool(monkeypatch):
+    monkeypatch.setattr(processing, "ANALYSIS_SPLIT_THRESHOLD", 1000)
+    monkeypatch.setattr(processing, "ANALYSIS_SPLIT_CHUNK", 200)
+    text = "good service, très bien mais la livraison était lente. " * 100
+    data = MessageData({"msg_id": "msg_1", "type": "update", "text": text})
+    payload = text.encode("utf-8")
+
+    ranges = processing.split_offsets(payload, 4)
+    assert len(ranges) == 4
+    assert b"".join(payload[a:b] for a, b in ranges) == payload
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        result = await run_pipeline(
+            data,
+            (Stage("analysis", heavy_analysis, CPU_BOUND, split=analyze_split),),
+            pool,
+        )
+
+    assert result == heavy_analysis(data)
@@ -1,7 +1,8 @@
+import asyncio
 from unittest.mock import AsyncMock, patch
 
 import pytest
-from app.publisher import publish_result
+from app.publisher import ResultPublisher, publish_result, publisher
 
 
 @pytest.mark.asyncio
@@ -14,6 +15,28 @@ async def test_publish_result_success(mock_connect):
 
     payload = {"msg_id": "msg_001", "status": "done", "type": "update"}
     await publish_result(payload)
+    await publisher.close()
 
     mock_channel.default_exchange.publish.assert_called_once()
     mock_connect.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch("app.publisher.aio_pika.connect_robust")
+async def test_publisher_reuses_connection_and_batches(mock_connect):
+    mock_channel = AsyncMock()
+    mock_connection = AsyncMock()
+    mock_connection.channel.return_value = mock_channel
+    mock_connect.return_value = mock_connection
+
+    pool = ResultPublisher("amqp://test", channel_count=2, batch_size=5)
+    await pool.start()
+    await asyncio.gather(
+        *(pool.publish(AsyncMock(), routing_key="out") for _ in range(10))
+    )
+    await pool.close()
+
+    mock_connect.assert_called_once()
+    assert mock_connection.channel.call_count == 2
+    mock_channel.declare_queue.assert_called_once()
+    assert mock_channel.default_exchange.publish.call_count == 10
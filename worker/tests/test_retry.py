@@ -0,0 +1,90 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app import consumer
+from app.retry import (
+    QUEUE_NAME,
+    declare_retry_queues,
+    retry_expiration,
+    retry_queue_name,
+    retry_tier,
+)
+
+
+def make_message(retries=0):
+    message = MagicMock()
+    message.body = b'{"msg_id": "msg_1", "type": "update", "text": "hello"}'
+    message.headers = {"x-retries": retries} if retries else {}
+    message.routing_key = QUEUE_NAME
+    message.ack = AsyncMock()
+    message.nack = AsyncMock()
+    return message
+
+
+def test_retry_tier_follows_schedule():
+    delays = (1.0, 5.0, 30.0)
+    assert [retry_tier(n, delays) for n in (1, 2, 3, 4, 10)] == [1, 5, 30, 30, 30]
+
+
+def test_retry_expiration_jitter_stays_below_tier_ttl():
+    values = [retry_expiration(10.0, 0.2) for _ in range(1000)]
+    assert all(8.0 <= value <= 10.0 for value in values)
+    assert retry_expiration(10.0, 0) == 10.0
+
+
+@pytest.mark.asyncio
+async def test_delay_queues_dead_letter_back_to_input_queue():
+    channel = AsyncMock()
+    await declare_retry_queues(channel)
+
+    (name,) = channel.declare_queue.call_args_list[0].args
+    arguments = channel.declare_queue.call_args_list[0].kwargs["arguments"]
+    assert name == retry_queue_name(1.0)
+    assert arguments["x-message-ttl"] == 1000
+    assert arguments["x-dead-letter-exchange"] == ""
+    assert arguments["x-dead-letter-routing-key"] == QUEUE_NAME
+
+
+@pytest.mark.asyncio
+async def test_failed_message_is_parked_in_its_delay_queue():
+    message = make_message(retries=1)
+    publish = AsyncMock()
+
+    with patch.object(
+        consumer.coalescer, "submit", AsyncMock(side_effect=RuntimeError("down"))
+    ), patch("app.publisher.publisher.publish", publish):
+        await consumer.handle_message(message)
+
+    (published,) = publish.call_args.args
+    assert publish.call_args.kwargs["routing_key"] == retry_queue_name(retry_tier(2))
+    assert published.headers["x-retries"] == 2
+    assert published.expiration is not None
+    message.ack.assert_awaited_once()
+    message.nack.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_message_is_requeued_when_retry_cannot_be_published():
+    message = make_message()
+
+    with patch.object(
+        consumer.coalescer, "submit", AsyncMock(side_effect=RuntimeError("down"))
+    ), patch(
+        "app.publisher.publisher.publish", AsyncMock(side_effect=ConnectionError())
+    ):
+        await consumer.handle_message(message)
+
+    message.ack.assert_not_called()
+    message.nack.assert_awaited_once_with(requeue=True)
+
+
+@pytest.mark.asyncio
+async def test_message_is_dead_lettered_after_max_retries():
+    message = make_message(retries=consumer.MAX_RETRIES)
+
+    with patch.object(
+        consumer.coalescer, "submit", AsyncMock(side_effect=RuntimeError("down"))
+    ):
+        await consumer.handle_message(message)
+
+    message.nack.assert_awaited_once_with(requeue=False)
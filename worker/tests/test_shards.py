@@ -0,0 +1,164 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.consumer import handler
+from app.consumer.amqp import AmqpSource
+from app.consumer.shards import child_claim, parse_claim, shard_of, shard_queue
+from app.consumer.sources import MessageSource
+
+
+class StubSource(MessageSource):
+    def __init__(self, routes=False, shard=None):
+        self.routes = routes
+        self.shard = shard
+        self.acked = []
+        self.routed = []
+
+    async def open(self):
+        pass
+
+    async def __aiter__(self):
+        for delivery in ():
+            yield delivery
+
+    async def ack(self, delivery):
+        self.acked.append(delivery)
+
+    async def fail(self, delivery, error):
+        pass
+
+    async def route(self, delivery, queue_name):
+        self.routed.append((delivery, queue_name))
+
+
+def delivery(msg_id, type_):
+    message = MagicMock()
+    message.body = json.dumps({"msg_id": msg_id, "type": type_, "text": "t"}).encode()
+    message.headers = {}
+    message.redelivered = False
+    message.ack = AsyncMock()
+    message.nack = AsyncMock()
+    return message
+
+
+class SlowChannel:
+    """
+    Publishing channel recording the bodies in their arrival order; the
+    first publication is the slowest, and `failing` ones are not confirmed.
+    """
+
+    def __init__(self, failing=()):
+        self.received = []
+        self.calls = 0
+        self.failing = set(failing)
+        self.is_closed = False
+        self.default_exchange = self
+
+    async def publish(self, message, routing_key):
+        self.calls += 1
+        await asyncio.sleep(0.05 if self.calls == 1 else 0)
+        if message.body in self.failing:
+            raise ConnectionError("nack")
+        self.received.append((json.loads(message.body)["type"], routing_key))
+
+
+def routing_source(channel):
+    source = AmqpSource(url="amqp://test/")
+    source._route_channel = channel
+    # Un message par lot : l'update et le delete sont confirmés séparément
+    source._router.max_size = 1
+    return source
+
+
+def test_shard_of_is_stable_and_consistent():
+    keys = [f"msg_{i}" for i in range(5000)]
+    before = [shard_of(key, 8) for key in keys]
+    after = [shard_of(key, 9) for key in keys]
+
+    assert before == [shard_of(key, 8) for key in keys]
+    assert set(before) == set(range(8))
+    moved = [new for old, new in zip(before, after) if old != new]
+    # Seules les clés de la nouvelle shard bougent (~1/9)
+    assert set(moved) == {8}
+    assert 0.08 < len(moved) / len(keys) < 0.15
+
+
+def test_parse_claim():
+    assert parse_claim("all", 4) == [0, 1, 2, 3]
+    assert parse_claim("0-2, 5", 8) == [0, 1, 2, 5]
+    assert parse_claim("1/3", 8) == [1, 4, 7]
+    with pytest.raises(ValueError):
+        parse_claim("6-9", 8)
+
+
+def test_child_processes_split_the_claim():
+    assert [child_claim(i, 3, "all") for i in range(3)] == [
+        "0,3,6,9,12,15",
+        "1,4,7,10,13",
+        "2,5,8,11,14",
+    ]
+    assert child_claim(1, 2, "4-7") == "5,7"
+    # Plus de processus que de shards : le surnuméraire attend en secours
+    assert child_claim(2, 3, "0-1") == "0,1"
+
+
+@pytest.mark.asyncio
+async def test_routed_copies_keep_their_order_across_batches():
+    channel = SlowChannel()
+    source = routing_source(channel)
+    target = shard_queue(shard_of("k1"))
+    update, delete = delivery("k1", "update"), delivery("k1", "delete")
+
+    await asyncio.gather(source.route(update, target), source.route(delete, target))
+
+    assert channel.received == [("update", target), ("delete", target)]
+    update.ack.assert_awaited_once()
+    delete.ack.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_route_requeues_the_later_deliveries():
+    update, delete = delivery("k1", "update"), delivery("k1", "delete")
+    channel = SlowChannel(failing={update.body})
+    source = routing_source(channel)
+    target = shard_queue(shard_of("k1"))
+
+    outcomes = await asyncio.gather(
+        source.route(update, target),
+        source.route(delete, target),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(outcome, Exception) for outcome in outcomes)
+    assert channel.received == []
+    update.nack.assert_awaited_once_with(requeue=True)
+    delete.nack.assert_awaited_once_with(requeue=True)
+
+    # La remise en file les rend dans l'ordre : le routage reprend
+    channel.failing.clear()
+    update.redelivered = delete.redelivered = True
+    await source.route(update, target)
+    await source.route(delete, target)
+    assert channel.received == [("update", target), ("delete", target)]
+
+
+@pytest.mark.asyncio
+async def test_input_queue_only_routes_to_the_shard_of_the_key():
+    router, shard = StubSource(routes=True), StubSource(shard=3)
+    submit = AsyncMock(return_value=True)
+
+    with patch.object(handler, "SHARDS_ENABLED", True), patch.object(
+        handler.coalescer, "submit", submit
+    ):
+        first, second = delivery("k1", "update"), delivery("k1", "delete")
+        await handler.handle_message(first, router)
+        await handler.handle_message(second, router)
+        await handler.handle_message(first, shard)
+
+    target = shard_queue(shard_of("k1"))
+    assert router.routed == [(first, target), (second, target)]
+    assert router.acked == []
+    submit.assert_called_once()
+    assert shard.acked == [first]
@@ -0,0 +1,76 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from app.storage import delete_result, store_result, to_document
+from pymongo.errors import BulkWriteError, WriteError
+
+
+@pytest.mark.asyncio
+@patch("app.storage.collection")
+async def test_concurrent_writes_share_one_bulk_write(mock_collection):
+    mock_collection.bulk_write = AsyncMock()
+
+    await asyncio.gather(
+        store_result({"msg_id": "msg_1", "score": 1}),
+        store_result({"msg_id": "msg_2", "score": 2}),
+        delete_result("msg_3"),
+    )
+
+    mock_collection.bulk_write.assert_called_once()
+    requests = mock_collection.bulk_write.call_args[0][0]
+    assert len(requests) == 3
+    assert mock_collection.bulk_write.call_args[1] == {"ordered": False}
+
+
+@pytest.mark.asyncio
+@patch("app.storage.collection")
+async def test_same_msg_id_is_written_in_order(mock_collection):
+    mock_collection.bulk_write = AsyncMock()
+
+    await asyncio.gather(
+        store_result({"msg_id": "msg_1", "score": 1}),
+        delete_result("msg_1"),
+    )
+
+    assert mock_collection.bulk_write.call_count == 2
+    first, second = (call[0][0] for call in mock_collection.bulk_write.call_args_list)
+    assert type(first[0]).__name__ == "ReplaceOne"
+    assert type(second[0]).__name__ == "DeleteOne"
+
+
+@pytest.mark.asyncio
+@patch("app.storage.collection")
+async def test_write_error_only_fails_its_message(mock_collection):
+    mock_collection.bulk_write = AsyncMock(
+        side_effect=BulkWriteError(
+            {"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate"}]}
+        )
+    )
+
+    ok, failed = await asyncio.gather(
+        store_result({"msg_id": "msg_1"}),
+        store_result({"msg_id": "msg_2"}),
+        return_exceptions=True,
+    )
+
+    assert ok is None
+    assert isinstance(failed, WriteError)
+    assert failed.code == 11000
+
+
+def test_compact_layout_keeps_only_queried_fields():
+    result = {
+        "msg_id": "msg_1",
+        "user_id": "u_1",
+        "text": "long text",
+        "score": 0.5,
+        "source": "extra",
+    }
+
+    assert to_document(result, "full") == result
+    assert to_document(result, "compact") == {
+        "msg_id": "msg_1",
+        "user_id": "u_1",
+        "score": 0.5,
+    }
@@ -0,0 +1,42 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.storage_init import MSG_ID_INDEX, init_storage, parse_index_specs
+from pymongo import ASCENDING, DESCENDING
+
+
+def make_collection(indexes):
+    collection = MagicMock()
+    collection.name = "results"
+    collection.create_index = AsyncMock()
+    collection.index_information = AsyncMock(return_value=indexes)
+    return collection
+
+
+def test_parse_index_specs():
+    assert parse_index_specs("user_id, user_id+timestamp:-1") == [
+        [("user_id", ASCENDING)],
+        [("user_id", ASCENDING), ("timestamp", DESCENDING)],
+    ]
+    assert parse_index_specs("") == []
+
+
+@pytest.mark.asyncio
+async def test_init_creates_unique_msg_id_index():
+    collection = make_collection(
+        {MSG_ID_INDEX: {"key": [("msg_id", 1)], "unique": True}}
+    )
+
+    await init_storage(collection)
+
+    collection.create_index.assert_any_call("msg_id", name=MSG_ID_INDEX, unique=True)
+
+
+@pytest.mark.asyncio
+async def test_init_fails_when_msg_id_index_is_missing():
+    collection = make_collection({"msg_id_1": {"key": [("msg_id", 1)]}})
+
+    with patch("app.storage_init.MONGO_INIT_STRICT", True), pytest.raises(
+        RuntimeError, match="msg_id"
+    ):
+        await init_storage(collection)
@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+import os
+
+import pytest
+from app.supervisor import Supervisor, _child_cache_path, merge_families
+from core.metrics import Registry
+
+
+def _crashing_child(stats_queue):
+    registry = Registry()
+    registry.counter("jobs_total", "Jobs.").inc(2)
+    stats_queue.put((int(os.environ["WORKER_INDEX"]), registry.collect()))
+    raise SystemExit(1)
+
+
+def _finishing_child(stats_queue):
+    pass
+
+
+def test_merge_families_sums_samples_by_labels():
+    first, second = Registry(), Registry()
+    first.counter("jobs_total", "Jobs.", outcome="ok").inc(3)
+    second.counter("jobs_total", "Jobs.", outcome="ok").inc(4)
+    second.counter("jobs_total", "Jobs.", outcome="failed").inc(1)
+    first.histogram("latency_seconds", "Latency.", buckets=(1.0,)).observe(0.5)
+    second.histogram("latency_seconds", "Latency.", buckets=(1.0,)).observe(2)
+
+    merged = {
+        (sample, tuple(sorted(labels.items()))): value
+        for _, _, _, samples in merge_families([first.collect(), second.collect()])
+        for sample, labels, value in samples
+    }
+
+    assert merged[("jobs_total", (("outcome", "ok"),))] == 7
+    assert merged[("jobs_total", (("outcome", "failed"),))] == 1
+    assert merged[("latency_seconds_bucket", (("le", "1"),))] == 1
+    assert merged[("latency_seconds_bucket", (("le", "+Inf"),))] == 2
+    assert merged[("latency_seconds_count", ())] == 2
+
+
+@pytest.mark.asyncio
+async def test_supervisor_restarts_crashed_children():
+    supervisor = Supervisor(
+        _crashing_child,
+        processes=2,
+        restart_delay=0.01,
+        shutdown_timeout=1,
+        metrics_port=0,
+        context=multiprocessing.get_context("fork"),
+    )
+    run = asyncio.create_task(supervisor.run())
+    await asyncio.sleep(1.5)
+    supervisor.stop()
+    await run
+
+    text = supervisor.render()
+    assert "jobs_total 4" in text
+    assert 'worker_child_restarts_total{child="0"} 0' not in text
+    assert 'worker_child_restarts_total{child="1"} 0' not in text
+
+
+def test_children_get_their_own_cache_file(monkeypatch):
+    monkeypatch.setenv("CACHE_PATH", "/data/cache.db")
+    assert _child_cache_path(0) == "/data/cache-0.db"
+    assert _child_cache_path(1) == "/data/cache-1.db"
+
+    monkeypatch.delenv("CACHE_PATH")
+    assert _child_cache_path(0) is None
+
+
+@pytest.mark.asyncio
+async def test_supervisor_stops_once_every_child_finished():
+    supervisor = Supervisor(
+        _finishing_child,
+        processes=2,
+        restart_delay=0.01,
+        shutdown_timeout=1,
+        metrics_port=0,
+        context=multiprocessing.get_context("fork"),
+    )
+    await asyncio.wait_for(supervisor.run(), 10)
+
+    text = supervisor.render()
+    assert 'worker_child_restarts_total{child="0"} 0' in text
+    assert 'worker_child_restarts_total{child="1"} 0' in text
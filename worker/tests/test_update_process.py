@@ -3,7 +3,7 @@ from unittest.mock import patch
 
 import pytest
 from app.models.message_data import MessageData
-from app.processing import process_message
+from app.processing import CPU_BOUND, Stage, process_message
 
 
 @pytest.mark.asyncio
@@ -37,7 +37,11 @@ async def test_process_message_update(mock_analysis, mock_store, mock_publish):
     async def fake_executor(executor, func, *args):
         return func(*args)
 
-    with patch.object(loop, "run_in_executor", side_effect=fake_executor):
+    pipeline = (Stage("analysis", mock_analysis, CPU_BOUND),)
+
+    with patch.object(loop, "run_in_executor", side_effect=fake_executor), patch(
+        "app.processing.ANALYSIS_PIPELINE", pipeline
+    ):
         await process_message(data)
 
     mock_store.assert_called_once()
@@ -51,3 +55,26 @@ async def test_process_message_update(mock_analysis, mock_store, mock_publish):
     assert published["msg_id"] == "msg_123"
     assert published["status"] == "done"
     assert "text" not in published
+
+
+@pytest.mark.asyncio
+@patch("app.processing.publish_result")
+@patch("app.processing.analyze")
+async def test_cancel_during_commit_waits_for_storage(mock_analyze, mock_publish):
+    mock_analyze.return_value = {"msg_id": "msg_1", "type": "update", "status": "done"}
+    stored = asyncio.Event()
+
+    async def slow_store(payload):
+        await asyncio.sleep(0.05)
+        stored.set()
+
+    data = MessageData({"msg_id": "msg_1", "type": "update", "text": "Hello"})
+    with patch("app.processing.store_result", side_effect=slow_store):
+        task = asyncio.create_task(process_message(data))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert stored.is_set()
+    mock_publish.assert_called_once()
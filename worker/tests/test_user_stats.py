@@ -0,0 +1,106 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.storage import delete_result, store_result
+from app.user_stats import UserStats
+
+
+def make_stats():
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock()
+    return UserStats(collection, interval=60)
+
+
+@pytest.mark.asyncio
+async def test_deltas_are_combined_per_user():
+    stats = make_stats()
+    stats.record(None, {"user_id": "u_1", "score": 80, "timestamp": "2025-01-02"})
+    stats.record(None, {"user_id": "u_1", "score": 40, "timestamp": "2025-01-01"})
+    stats.record(
+        {"user_id": "u_1", "score": 40, "timestamp": "2025-01-01"},
+        {"user_id": "u_2", "score": None, "timestamp": "2025-01-03"},
+    )
+
+    await stats.close()
+
+    stats.collection.bulk_write.assert_called_once()
+    requests = {
+        r._filter["user_id"]: r._doc
+        for r in stats.collection.bulk_write.call_args[0][0]
+    }
+    assert requests == {
+        "u_1": {
+            "$inc": {"count": 1, "score_sum": 80, "scored": 1},
+            "$max": {"last_activity": "2025-01-02"},
+        },
+        "u_2": {"$inc": {"count": 1}, "$max": {"last_activity": "2025-01-03"}},
+    }
+    assert stats.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_the_deltas():
+    stats = make_stats()
+    stats.collection.bulk_write.side_effect = RuntimeError("down")
+    stats.record(None, {"user_id": "u_1", "score": 10})
+
+    await stats.flush()
+
+    assert stats.pending == 1
+
+
+@pytest.mark.asyncio
+@patch("app.storage.collection")
+async def test_overwrite_and_delete_reverse_the_stored_contribution(mock_collection):
+    stored = {"msg_id": "msg_1", "user_id": "u_old", "score": 30, "timestamp": "t1"}
+
+    async def find(filter, projection):
+        assert filter == {"msg_id": {"$in": ["msg_1"]}}
+        yield stored
+
+    mock_collection.find = find
+    mock_collection.bulk_write = AsyncMock()
+    stats = make_stats()
+
+    with patch("app.storage.user_stats", stats):
+        await asyncio.gather(
+            store_result(
+                {"msg_id": "msg_1", "user_id": "u_new", "score": 70, "timestamp": "t2"}
+            ),
+            delete_result("msg_1"),
+        )
+        await stats.close()
+
+    requests = {
+        r._filter["user_id"]: r._doc
+        for r in stats.collection.bulk_write.call_args[0][0]
+    }
+    # L'ancienne contribution est retirée, la nouvelle ajoutée puis supprimée ;
+    # seule l'activité du nouvel utilisateur subsiste
+    assert requests["u_new"] == {"$max": {"last_activity": "t2"}}
+    del requests["u_new"]
+    assert requests == {
+        "u_old": {"$inc": {"count": -1, "score_sum": -30, "scored": -1}}
+    }
+
+
+@pytest.mark.asyncio
+async def test_rebuild_replaces_the_aggregates_from_the_results():
+    stats = make_stats()
+    stats.collection.name = "user_stats"
+    stats.collection.count_documents = AsyncMock(return_value=2)
+    stats.record(None, {"user_id": "u_1", "score": 10})
+    pipelines = []
+
+    async def aggregate(pipeline):
+        pipelines.append(pipeline)
+        return
+        yield
+
+    results = MagicMock()
+    results.aggregate = aggregate
+
+    assert await stats.rebuild(results) == 2
+    assert pipelines[0][-1] == {"$out": "user_stats"}
+    assert stats.pending == 0